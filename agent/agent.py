@@ -1,4 +1,5 @@
-import requests
+import asyncio
+import httpx
 import json
 from uagents_core.contrib.protocols.chat import (
     chat_protocol_spec,
@@ -6,12 +7,13 @@ from uagents_core.contrib.protocols.chat import (
     ChatAcknowledgement,
     TextContent,
     StartSessionContent,
+    EndSessionContent,
 )
 from uagents import Agent, Context, Protocol
 from datetime import datetime, timezone, timedelta
 from uuid import uuid4
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 # Import our existing models and utilities
 from models import FarmerReport, EnrichmentResult, ChainWriteAck, OperatorQuery, AgentResponse
@@ -20,7 +22,13 @@ from utils import (
     get_resource_request_type, create_audit_event, load_seed_data,
     group_incidents_by_category, format_incident_summary
 )
-from icp_client import icp_client
+from icp_client import icp_client, HIGH_SEVERITY
+from geocode import canonical_location
+from executor import io_executor
+from intents import intent_router, render_reply
+from sessions import Session, session_store
+from work_queue import chat_queue
+from maintenance import maintenance, MAINTENANCE_TICK_SECONDS
 
 # ASI:One API settings
 ASI1_API_KEY=os.getenv("ASI1_API_KEY", "")  # Set your ASI1 key
@@ -29,11 +37,29 @@ ASI1_HEADERS = {
     "Authorization": f"Bearer {ASI1_API_KEY}",
     "Content-Type": "application/json"
 }
+# One pooled keep-alive client is shared by all chat turns
+ASI1_TIMEOUT = httpx.Timeout(
+    float(os.getenv("ASI1_TIMEOUT", "30")), connect=float(os.getenv("ASI1_CONNECT_TIMEOUT", "5"))
+)
+ASI1_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("ASI1_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(os.getenv("ASI1_MAX_KEEPALIVE", "10")),
+    keepalive_expiry=30.0
+)
 
 # ICP Canister settings
 CANISTER_ID = os.getenv("CANISTER_ID", "uxrrr-q7777-77774-qaaaq-cai")
 BASE_URL = os.getenv("ICP_BASE_URL", "http://127.0.0.1:4943")
 
+# High severity incidents listed individually in an LGA query result; the summary covers all of them
+OPERATOR_QUERY_MAX_INCIDENTS = int(os.getenv("OPERATOR_QUERY_MAX_INCIDENTS", "25"))
+
+# Sent instead of queueing a chat message when the agent is overloaded
+BUSY_REPLY = "I'm handling a lot of requests right now. Please try again in a minute."
+
+# Seconds between sweeps of idle sessions and expired cache entries
+CACHE_PURGE_INTERVAL = float(os.getenv("AGENT_CACHE_PURGE_INTERVAL", "60"))
+
 # Function definitions for ASI:One function calling
 tools = [
     {
@@ -198,7 +224,7 @@ async def call_agricultural_function(func_name: str, args: dict):
             
         elif func_name == "get_incident_details":
             # Get incident from ICP canister
-            incident = icp_client.get_incident(args["incident_id"])
+            incident = await io_executor.run(icp_client.get_incident, args["incident_id"])
             if incident:
                 return {
                     "success": True,
@@ -232,14 +258,18 @@ async def call_agricultural_function(func_name: str, args: dict):
                 source="agent_recommendation",
                 created_at=datetime.utcnow().isoformat() + "Z"
             )
-            result = icp_client.add_recommendation(args["incident_id"], recommendation)
+            result = await io_executor.run(icp_client.add_recommendation, args["incident_id"], recommendation)
+            if not result:
+                return {"success": False, "message": f"Could not add the recommendation to incident {args['incident_id']}"}
             return {"success": True, "message": "Recommendation added successfully"}
             
         elif func_name == "update_incident_status":
             # Update incident status
             from models import StatusType
             status = StatusType(args["status"])
-            result = icp_client.set_status(args["incident_id"], status)
+            result = await io_executor.run(icp_client.set_status, args["incident_id"], status)
+            if not result:
+                return {"success": False, "message": f"Could not update the status of incident {args['incident_id']}"}
             return {"success": True, "message": f"Status updated to {args['status']}"}
             
         else:
@@ -260,14 +290,17 @@ async def process_farmer_report(farmer_report: FarmerReport):
         
         # Step 2: Create incident object
         now = datetime.utcnow().isoformat() + "Z"
+        location = canonical_location(
+            farmer_report.lga, farmer_report.state, farmer_report.geo.lat, farmer_report.geo.lon
+        )
         
         from models import Incident, Geo, Enriched, StatusType, ResourceRequest, Audit
         
         incident_obj = Incident(
             incident_id="",  # Will be assigned by canister
             farmer_id=farmer_report.farmer_id,
-            lga=farmer_report.lga,
-            state=farmer_report.state,
+            lga=location.lga,
+            state=location.state,
             geo=Geo(lat=farmer_report.geo.lat, lon=farmer_report.geo.lon),
             crop=farmer_report.crop,
             category=farmer_report.category,
@@ -281,7 +314,7 @@ async def process_farmer_report(farmer_report: FarmerReport):
         )
         
         # Step 3: Store on ICP canister
-        incident_id = icp_client.create_incident(incident_obj)
+        incident_id = await io_executor.run(icp_client.create_incident, incident_obj)
         
         # Step 4: Generate recommendation
         recommendation = generate_recommendation(
@@ -309,10 +342,10 @@ async def process_farmer_report(farmer_report: FarmerReport):
 async def process_operator_query(operator_query: OperatorQuery):
     """Process an operator query for incidents by LGA."""
     try:
-        # Load incidents from ICP canister
-        icp_incidents = icp_client.list_incidents_by_lga(operator_query.lga)
-        
-        if not icp_incidents:
+        # Totals come from the canister's per-LGA counts; only the high
+        # severity incidents the reply lists are transferred, one page
+        summary = await io_executor.run(icp_client.lga_summary, operator_query.lga, HIGH_SEVERITY)
+        if not summary or not summary["total_incidents"]:
             return {
                 "success": True,
                 "message": f"No incidents found for {operator_query.lga}",
@@ -320,34 +353,29 @@ async def process_operator_query(operator_query: OperatorQuery):
                 "summary": {"total": 0}
             }
         
-        # Convert to dict format
-        incidents = []
-        for incident in icp_incidents:
-            incidents.append({
+        page = await io_executor.run(
+            icp_client.list_incidents_page, operator_query.lga, None,
+            OPERATOR_QUERY_MAX_INCIDENTS, HIGH_SEVERITY
+        )
+        incidents = [
+            {
                 "incident_id": incident.incident_id,
                 "farmer_id": incident.farmer_id,
                 "crop": incident.crop.value,
                 "category": incident.category.value,
                 "severity_score": incident.enriched.severity_score,
                 "status": incident.status.value
-            })
-        
-        # Group by category
-        category_counts = group_incidents_by_category(incidents)
-        
-        # Get high severity count
-        high_severity_count = len([inc for inc in incidents if inc["severity_score"] >= 70])
-        
-        summary = {
-            "lga": operator_query.lga,
-            "total_incidents": len(incidents),
-            "category_breakdown": category_counts,
-            "high_severity_count": high_severity_count
-        }
+            }
+            for incident in page.incidents
+        ]
+        incidents.sort(key=lambda incident: -incident["severity_score"])
         
         return {
             "success": True,
-            "message": f"Found {len(incidents)} incidents in {operator_query.lga}. High severity: {high_severity_count}",
+            "message": (
+                f"Found {summary['total_incidents']} incidents in {operator_query.lga}. "
+                f"High severity: {summary['high_severity_count']}"
+            ),
             "incidents": incidents,
             "summary": summary
         }
@@ -355,61 +383,131 @@ async def process_operator_query(operator_query: OperatorQuery):
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-async def process_query(query: str, ctx: Context) -> str:
-    """Process natural language queries using ASI:One."""
+_asi1_client: Optional[httpx.AsyncClient] = None
+
+def get_asi1_client() -> httpx.AsyncClient:
+    """The shared ASI:One HTTP client, created on first use."""
+    global _asi1_client
+    if _asi1_client is None or _asi1_client.is_closed:
+        _asi1_client = httpx.AsyncClient(
+            base_url=ASI1_BASE_URL,
+            headers=ASI1_HEADERS,
+            timeout=ASI1_TIMEOUT,
+            limits=ASI1_LIMITS
+        )
+    return _asi1_client
+
+async def close_asi1_client():
+    global _asi1_client
+    if _asi1_client is not None:
+        await _asi1_client.aclose()
+        _asi1_client = None
+
+async def asi1_chat_completion(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """POST a chat completion request to ASI:One and return the decoded reply."""
+    response = await get_asi1_client().post("/chat/completions", json=payload)
+    response.raise_for_status()
+    return response.json()
+
+async def execute_tool_call(tool_call: Dict[str, Any], ctx: Context) -> Dict[str, Any]:
+    """Run one ASI:One tool call and return the tool result message."""
+    func_name = tool_call["function"]["name"]
     try:
+        arguments = json.loads(tool_call["function"]["arguments"])
+        ctx.logger.info(f"Executing {func_name} with arguments: {arguments}")
+        result = await call_agricultural_function(func_name, arguments)
+        content_to_send = json.dumps(result)
+    except Exception as e:
+        error_content = {
+            "error": f"Tool execution failed: {str(e)}",
+            "status": "failed"
+        }
+        content_to_send = json.dumps(error_content)
+
+    return {
+        "role": "tool",
+        "tool_call_id": tool_call["id"],
+        "content": content_to_send
+    }
+
+async def execute_tool_calls(tool_calls: List[Dict[str, Any]], ctx: Context) -> List[Dict[str, Any]]:
+    """
+    Run tool calls concurrently and return their result messages in call order.
+    
+    Calls that name the same incident are run one after another in the order
+    the model gave them, so e.g. a recommendation and a status change on one
+    incident are applied as requested; everything else runs in parallel.
+    """
+    groups: Dict[Any, List[int]] = {}
+    for position, tool_call in enumerate(tool_calls):
+        try:
+            key = json.loads(tool_call["function"]["arguments"]).get("incident_id") or position
+        except Exception:
+            key = position
+        groups.setdefault(key, []).append(position)
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(tool_calls)
+
+    async def run_group(positions: List[int]):
+        for position in positions:
+            results[position] = await execute_tool_call(tool_calls[position], ctx)
+
+    await asyncio.gather(*(run_group(positions) for positions in groups.values()))
+    return results
+
+def tool_call_lga(tool_calls: List[Dict[str, Any]]) -> Optional[str]:
+    """The last LGA named in a turn's tool calls, for the session to remember."""
+    lga = None
+    for tool_call in tool_calls:
+        try:
+            lga = json.loads(tool_call["function"]["arguments"]).get("lga") or lga
+        except Exception:
+            continue
+    return lga
+
+async def process_query(query: str, ctx: Context, session: Optional[Session] = None) -> str:
+    """
+    Process natural language queries using ASI:One.
+    
+    With a session, the sender's recent turns and a summary of older ones
+    are sent as context, and the completed turn is recorded.
+    """
+    try:
+        # Step 0: Answer common, unambiguous requests without the LLM
+        intent = intent_router.match(query)
+        if intent:
+            ctx.logger.info(f"Fast path {intent.tool} with arguments: {intent.arguments}")
+            result = await call_agricultural_function(intent.tool, intent.arguments)
+            reply = render_reply(intent, result)
+            if session:
+                session.record(query, reply, lga=intent.arguments.get("lga"))
+            return reply
+
         # Step 1: Initial call to ASI:1 with user query and tools
         initial_message = {
             "role": "user",
             "content": query
         }
+        context = session.context_messages() if session else []
         payload = {
             "model": "asi1-mini",
-            "messages": [initial_message],
+            "messages": context + [initial_message],
             "tools": tools,
             "temperature": 0.7,
             "max_tokens": 1024
         }
         
-        response = requests.post(
-            f"{ASI1_BASE_URL}/chat/completions",
-            headers=ASI1_HEADERS,
-            json=payload
-        )
-        response.raise_for_status()
-        response_json = response.json()
+        response_json = await asi1_chat_completion(payload)
 
         # Step 2: Parse tool calls from response
         tool_calls = response_json["choices"][0]["message"].get("tool_calls", [])
-        messages_history = [initial_message, response_json["choices"][0]["message"]]
+        messages_history = context + [initial_message, response_json["choices"][0]["message"]]
 
         if not tool_calls:
             return "I couldn't determine what agricultural information you're looking for. Please try rephrasing your question or ask about reporting incidents, querying by location, or getting incident details."
 
-        # Step 3: Execute tools and format results
-        for tool_call in tool_calls:
-            func_name = tool_call["function"]["name"]
-            arguments = json.loads(tool_call["function"]["arguments"])
-            tool_call_id = tool_call["id"]
-
-            ctx.logger.info(f"Executing {func_name} with arguments: {arguments}")
-
-            try:
-                result = await call_agricultural_function(func_name, arguments)
-                content_to_send = json.dumps(result)
-            except Exception as e:
-                error_content = {
-                    "error": f"Tool execution failed: {str(e)}",
-                    "status": "failed"
-                }
-                content_to_send = json.dumps(error_content)
-
-            tool_result_message = {
-                "role": "tool",
-                "tool_call_id": tool_call_id,
-                "content": content_to_send
-            }
-            messages_history.append(tool_result_message)
+        # Step 3: Execute tools concurrently, keeping results in call order
+        messages_history.extend(await execute_tool_calls(tool_calls, ctx))
 
         # Step 4: Send results back to ASI:1 for final answer
         final_payload = {
@@ -418,16 +516,13 @@ async def process_query(query: str, ctx: Context) -> str:
             "temperature": 0.7,
             "max_tokens": 1024
         }
-        final_response = requests.post(
-            f"{ASI1_BASE_URL}/chat/completions",
-            headers=ASI1_HEADERS,
-            json=final_payload
-        )
-        final_response.raise_for_status()
-        final_response_json = final_response.json()
+        final_response_json = await asi1_chat_completion(final_payload)
 
         # Step 5: Return the model's final answer
-        return final_response_json["choices"][0]["message"]["content"]
+        reply = final_response_json["choices"][0]["message"]["content"]
+        if session:
+            session.record(query, reply, lga=tool_call_lga(tool_calls))
+        return reply
 
     except Exception as e:
         ctx.logger.error(f"Error processing query: {str(e)}")
@@ -445,17 +540,34 @@ chat_proto = Protocol(spec=chat_protocol_spec)
 
 @chat_proto.on_message(model=ChatMessage)
 async def handle_chat_message(ctx: Context, sender: str, msg: ChatMessage):
-    """Handle incoming chat messages using ASI:One for natural language processing."""
-    try:
-        ack = ChatAcknowledgement(
+    """
+    Acknowledge an incoming chat message and queue it for processing.
+    
+    Messages from one sender are processed in order, senders share the
+    worker slots round-robin, and when the queue is overloaded the sender
+    gets an immediate "busy" reply instead of a long wait.
+    """
+    ack = ChatAcknowledgement(
+        timestamp=datetime.now(timezone.utc),
+        acknowledged_msg_id=msg.msg_id
+    )
+    await ctx.send(sender, ack)
+
+    if not chat_queue.submit(sender, lambda: process_chat_message(ctx, sender, msg)):
+        ctx.logger.warning(f"Shedding chat message from {sender}: {chat_queue.stats()}")
+        await ctx.send(sender, ChatMessage(
             timestamp=datetime.now(timezone.utc),
-            acknowledged_msg_id=msg.msg_id
-        )
-        await ctx.send(sender, ack)
+            msg_id=uuid4(),
+            content=[TextContent(type="text", text=BUSY_REPLY)]
+        ))
 
+async def process_chat_message(ctx: Context, sender: str, msg: ChatMessage):
+    """Handle a chat message's content items in order, using ASI:One for natural language processing."""
+    try:
         for item in msg.content:
             if isinstance(item, StartSessionContent):
                 ctx.logger.info(f"Got a start session message from {sender}")
+                session_store.reset(sender)
                 # Send welcome message
                 welcome_response = ChatMessage(
                     timestamp=datetime.now(timezone.utc),
@@ -466,7 +578,7 @@ async def handle_chat_message(ctx: Context, sender: str, msg: ChatMessage):
                 continue
             elif isinstance(item, TextContent):
                 ctx.logger.info(f"Got a message from {sender}: {item.text}")
-                response_text = await process_query(item.text, ctx)
+                response_text = await process_query(item.text, ctx, session_store.get(sender))
                 ctx.logger.info(f"Response text: {response_text}")
                 response = ChatMessage(
                     timestamp=datetime.now(timezone.utc),
@@ -474,6 +586,9 @@ async def handle_chat_message(ctx: Context, sender: str, msg: ChatMessage):
                     content=[TextContent(type="text", text=response_text)]
                 )
                 await ctx.send(sender, response)
+            elif isinstance(item, EndSessionContent):
+                ctx.logger.info(f"Got an end session message from {sender}")
+                session_store.end(sender)
             else:
                 ctx.logger.info(f"Got unexpected content from {sender}")
     except Exception as e:
@@ -495,6 +610,24 @@ async def handle_chat_acknowledgement(ctx: Context, sender: str, msg: ChatAcknow
 # Include the chat protocol in the agent
 agent.include(chat_proto)
 
+@agent.on_interval(period=MAINTENANCE_TICK_SECONDS)
+async def periodic_maintenance(ctx: Context):
+    """Start whichever maintenance tasks are due; they run in the background."""
+    maintenance.tick(ctx)
+
+@maintenance.task("purge_caches", interval=CACHE_PURGE_INTERVAL, run_at_start=False)
+async def purge_caches(ctx: Context, deadline: float) -> int:
+    """Drop idle sessions and expired canister reads so their memory is freed."""
+    purged = session_store.purge_expired() + icp_client.purge_expired()
+    if purged:
+        ctx.logger.debug(f"Purged {purged} expired sessions and cache entries ({len(session_store)} sessions)")
+    return purged
+
+@agent.on_event("shutdown")
+async def shutdown(ctx: Context):
+    """Close pooled connections to ASI:One."""
+    await close_asi1_client()
+
 if __name__ == "__main__":
     print("🌱 Starting Zyra Agricultural Extension Agent with ASI:One Integration")
     print("=" * 70)
@@ -0,0 +1,105 @@
+"""
+Materialized per-LGA incident aggregates.
+
+Operator summaries (totals, category and status breakdowns, the most
+severe incidents) are kept up to date as incidents are recorded instead
+of being recomputed from every stored incident on each query. The index
+is rebuilt from the local store on first use and whenever it is refreshed.
+"""
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils import format_incident_summary
+
+HIGH_SEVERITY = 70
+TOP_HIGH_SEVERITY = 3
+
+
+class LgaAggregate:
+    """Running totals for one LGA."""
+
+    def __init__(self, lga: str):
+        self.lga = lga
+        self.total = 0
+        self.by_category: Dict[str, int] = {}
+        self.by_status: Dict[str, int] = {}
+        self.high_severity = 0
+        self.last_reported_at = ""
+        # (severity, incident_id, summary line), most severe first
+        self.top: List[Tuple[int, str, str]] = []
+
+    def add(self, incident: Dict[str, Any]):
+        severity = incident["enriched"]["severity_score"]
+        self.total += 1
+        self.by_category[incident["category"]] = self.by_category.get(incident["category"], 0) + 1
+        self.by_status[incident["status"]] = self.by_status.get(incident["status"], 0) + 1
+        self.last_reported_at = max(self.last_reported_at, incident.get("reported_at", ""))
+        if severity >= HIGH_SEVERITY:
+            self.high_severity += 1
+            self.top.append((severity, incident["incident_id"], format_incident_summary(incident)))
+            self.top.sort(key=lambda entry: -entry[0])
+            del self.top[TOP_HIGH_SEVERITY:]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "lga": self.lga,
+            "total_incidents": self.total,
+            "category_breakdown": dict(self.by_category),
+            "status_breakdown": dict(self.by_status),
+            "high_severity_count": self.high_severity,
+            "top_high_severity": [line for _, _, line in self.top],
+            "last_reported_at": self.last_reported_at or None,
+        }
+
+
+class AggregateIndex:
+    """Thread-safe map of LGA to LgaAggregate, fed by the local incident store."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_lga: Dict[str, LgaAggregate] = {}
+        self._seen: set = set()
+        self.loaded = False
+
+    def rebuild(self, incidents: Iterable[Dict[str, Any]]):
+        """Recompute every aggregate; a repeated incident_id counts once (last record wins)."""
+        latest = {incident["incident_id"]: incident for incident in incidents if incident.get("incident_id")}
+        by_lga: Dict[str, LgaAggregate] = {}
+        for incident in latest.values():
+            by_lga.setdefault(incident["lga"], LgaAggregate(incident["lga"])).add(incident)
+        with self._lock:
+            self._by_lga = by_lga
+            self._seen = set(latest)
+            self.loaded = True
+
+    def add_many(self, incidents: Iterable[Dict[str, Any]]):
+        """Count newly recorded incidents; ones already counted wait for the next rebuild."""
+        with self._lock:
+            for incident in incidents:
+                incident_id = incident.get("incident_id")
+                if not incident_id or incident_id in self._seen:
+                    continue
+                self._seen.add(incident_id)
+                aggregate = self._by_lga.get(incident["lga"])
+                if aggregate is None:
+                    aggregate = self._by_lga[incident["lga"]] = LgaAggregate(incident["lga"])
+                aggregate.add(incident)
+
+    def summary(self, lga: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            aggregate = self._by_lga.get(lga)
+            return aggregate.summary() if aggregate else None
+
+    def lgas(self) -> List[str]:
+        with self._lock:
+            return sorted(self._by_lga)
+
+    def busiest_lgas(self, limit: int) -> List[str]:
+        """The `limit` LGAs with the most incidents, busiest first."""
+        with self._lock:
+            ranked = sorted(self._by_lga.values(), key=lambda aggregate: (-aggregate.total, aggregate.lga))
+            return [aggregate.lga for aggregate in ranked[:limit]]
+
+
+# Global aggregate index
+aggregates = AggregateIndex()
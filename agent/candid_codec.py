@@ -0,0 +1,426 @@
+"""
+Binary Candid (DIDL) codec for the Zyra canister interface.
+
+Argument signatures are declared once as module constants; each one
+serializes its type table a single time and reuses it for every call, so
+encoding a value is a straight walk over the data with no text formatting
+or parsing on either side of `dfx`.
+"""
+import struct
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+MAGIC = b"DIDL"
+
+# Primitive type opcodes from the Candid specification
+_NULL = -1
+_BOOL = -2
+_NAT = -3
+_INT = -4
+_NAT8 = -5
+_NAT16 = -6
+_NAT32 = -7
+_NAT64 = -8
+_INT8 = -9
+_INT16 = -10
+_INT32 = -11
+_INT64 = -12
+_FLOAT32 = -13
+_FLOAT64 = -14
+_TEXT = -15
+_RESERVED = -16
+_EMPTY = -17
+_OPT = -18
+_VEC = -19
+_RECORD = -20
+_VARIANT = -21
+_PRINCIPAL = -24
+
+_FIXED_WIDTH = {
+    _NAT8: "<B", _NAT16: "<H", _NAT32: "<I", _NAT64: "<Q",
+    _INT8: "<b", _INT16: "<h", _INT32: "<i", _INT64: "<q",
+    _FLOAT32: "<f", _FLOAT64: "<d",
+}
+
+
+class CandidError(ValueError):
+    """Raised when a value cannot be encoded or a message cannot be decoded."""
+
+
+def idl_hash(name: str) -> int:
+    """Candid field-name hash."""
+    h = 0
+    for byte in name.encode("utf-8"):
+        h = (h * 223 + byte) & 0xFFFFFFFF
+    return h
+
+
+def _leb128(value: int, out: bytearray):
+    if value < 0:
+        raise CandidError(f"Cannot LEB128-encode negative value {value}")
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _sleb128(value: int, out: bytearray):
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if (value == 0 and not byte & 0x40) or (value == -1 and byte & 0x40):
+            out.append(byte)
+            return
+        out.append(byte | 0x80)
+
+
+class CandidType:
+    """Base class for Candid types used in signatures."""
+
+    def register(self, table: "_TypeTable") -> int:
+        """Return the type reference (opcode or table index) for this type."""
+        raise NotImplementedError
+
+    def encode_value(self, value: Any, out: bytearray):
+        raise NotImplementedError
+
+    def from_wire(self, value: Any) -> Any:
+        """Convert a generically decoded wire value into its Python form."""
+        return value
+
+
+class Primitive(CandidType):
+    def __init__(self, name: str, code: int):
+        self.name = name
+        self.code = code
+
+    def register(self, table: "_TypeTable") -> int:
+        return self.code
+
+    def encode_value(self, value: Any, out: bytearray):
+        code = self.code
+        if code == _TEXT:
+            data = str.encode(value, "utf-8")
+            _leb128(len(data), out)
+            out += data
+        elif code == _BOOL:
+            out.append(1 if value else 0)
+        elif code == _NAT:
+            _leb128(int(value), out)
+        elif code == _INT:
+            _sleb128(int(value), out)
+        elif code in _FIXED_WIDTH:
+            try:
+                out += struct.pack(_FIXED_WIDTH[code], value)
+            except struct.error as e:
+                raise CandidError(f"Invalid {self.name} value {value!r}: {e}")
+        elif code == _NULL:
+            pass
+        else:
+            raise CandidError(f"Cannot encode values of type {self.name}")
+
+    def __repr__(self):
+        return self.name
+
+
+NULL = Primitive("null", _NULL)
+BOOL = Primitive("bool", _BOOL)
+NAT = Primitive("nat", _NAT)
+INT = Primitive("int", _INT)
+NAT8 = Primitive("nat8", _NAT8)
+NAT16 = Primitive("nat16", _NAT16)
+NAT32 = Primitive("nat32", _NAT32)
+NAT64 = Primitive("nat64", _NAT64)
+FLOAT64 = Primitive("float64", _FLOAT64)
+TEXT = Primitive("text", _TEXT)
+
+
+class Opt(CandidType):
+    def __init__(self, inner: CandidType):
+        self.inner = inner
+
+    def register(self, table: "_TypeTable") -> int:
+        return table.add(self, lambda out: (_sleb128(_OPT, out), _sleb128(self.inner.register(table), out)))
+
+    def encode_value(self, value: Any, out: bytearray):
+        if value is None:
+            out.append(0)
+        else:
+            out.append(1)
+            self.inner.encode_value(value, out)
+
+    def from_wire(self, value: Any) -> Any:
+        return None if value is None else self.inner.from_wire(value)
+
+
+class Vec(CandidType):
+    def __init__(self, inner: CandidType):
+        self.inner = inner
+
+    def register(self, table: "_TypeTable") -> int:
+        return table.add(self, lambda out: (_sleb128(_VEC, out), _sleb128(self.inner.register(table), out)))
+
+    def encode_value(self, value: Any, out: bytearray):
+        if self.inner is NAT8 and isinstance(value, (bytes, bytearray)):
+            _leb128(len(value), out)
+            out += value
+            return
+        _leb128(len(value), out)
+        encode = self.inner.encode_value
+        for item in value:
+            encode(item, out)
+
+    def from_wire(self, value: Any) -> Any:
+        if isinstance(value, (bytes, bytearray)):
+            return bytes(value)
+        convert = self.inner.from_wire
+        return [convert(item) for item in value]
+
+
+BLOB = Vec(NAT8)
+
+
+class Record(CandidType):
+    """Record type; values are dicts keyed by field name."""
+
+    def __init__(self, fields: Sequence[Tuple[str, CandidType]]):
+        self.fields = sorted(((idl_hash(name), name, t) for name, t in fields), key=lambda f: f[0])
+
+    def register(self, table: "_TypeTable") -> int:
+        def write(out: bytearray):
+            refs = [(h, t.register(table)) for h, _, t in self.fields]
+            _sleb128(_RECORD, out)
+            _leb128(len(refs), out)
+            for h, ref in refs:
+                _leb128(h, out)
+                _sleb128(ref, out)
+        return table.add(self, write)
+
+    def encode_value(self, value: Dict[str, Any], out: bytearray):
+        for _, name, t in self.fields:
+            try:
+                field_value = value[name]
+            except KeyError:
+                if isinstance(t, Opt):
+                    field_value = None
+                else:
+                    raise CandidError(f"Missing record field '{name}'")
+            t.encode_value(field_value, out)
+
+    def from_wire(self, value: Dict[int, Any]) -> Dict[str, Any]:
+        return {
+            name: t.from_wire(value.get(h))
+            for h, name, t in self.fields
+        }
+
+
+class Variant(CandidType):
+    """Variant type; values are single-entry dicts {tag: payload}."""
+
+    def __init__(self, cases: Sequence[Tuple[str, CandidType]]):
+        self.cases = sorted(((idl_hash(name), name, t) for name, t in cases), key=lambda c: c[0])
+
+    def register(self, table: "_TypeTable") -> int:
+        def write(out: bytearray):
+            refs = [(h, t.register(table)) for h, _, t in self.cases]
+            _sleb128(_VARIANT, out)
+            _leb128(len(refs), out)
+            for h, ref in refs:
+                _leb128(h, out)
+                _sleb128(ref, out)
+        return table.add(self, write)
+
+    def encode_value(self, value: Dict[str, Any], out: bytearray):
+        (tag, payload), = value.items()
+        for index, (_, name, t) in enumerate(self.cases):
+            if name == tag:
+                _leb128(index, out)
+                t.encode_value(payload, out)
+                return
+        raise CandidError(f"Unknown variant tag '{tag}'")
+
+    def from_wire(self, value: Tuple[int, Any]) -> Dict[str, Any]:
+        h, payload = value
+        for case_hash, name, t in self.cases:
+            if case_hash == h:
+                return {name: t.from_wire(payload)}
+        raise CandidError(f"Unknown variant tag hash {h}")
+
+
+class _TypeTable:
+    def __init__(self):
+        self.entries: List[bytes] = []
+        self._index: Dict[int, int] = {}
+
+    def add(self, t: CandidType, write) -> int:
+        key = id(t)
+        if key in self._index:
+            return self._index[key]
+        # Reserve the slot first so nested types are numbered after it
+        index = len(self.entries)
+        self._index[key] = index
+        self.entries.append(b"")
+        out = bytearray()
+        write(out)
+        self.entries[index] = bytes(out)
+        return index
+
+
+class Signature:
+    """
+    A fixed argument (or result) type list.
+
+    The DIDL header (magic, type table and argument types) is computed once
+    at construction; `encode` only appends the values.
+    """
+
+    def __init__(self, *types: CandidType):
+        self.types = types
+        table = _TypeTable()
+        refs = [t.register(table) for t in types]
+        header = bytearray(MAGIC)
+        _leb128(len(table.entries), header)
+        for entry in table.entries:
+            header += entry
+        _leb128(len(refs), header)
+        for ref in refs:
+            _sleb128(ref, header)
+        self.header = bytes(header)
+
+    def encode(self, *values: Any) -> bytes:
+        if len(values) != len(self.types):
+            raise CandidError(f"Expected {len(self.types)} arguments, got {len(values)}")
+        out = bytearray(self.header)
+        for t, value in zip(self.types, values):
+            t.encode_value(value, out)
+        return bytes(out)
+
+    def encode_vec(self, encoded_items: Sequence[bytes]) -> bytes:
+        """
+        Assemble a message for a single `vec T` argument from items already
+        encoded with `encode_item`, so callers can size chunks without
+        encoding anything twice.
+        """
+        if len(self.types) != 1 or not isinstance(self.types[0], Vec):
+            raise CandidError("encode_vec requires a single vec argument")
+        out = bytearray(self.header)
+        _leb128(len(encoded_items), out)
+        for item in encoded_items:
+            out += item
+        return bytes(out)
+
+    def encoded_size(self, *values: Any) -> int:
+        """Size in bytes of the encoded message, header included."""
+        return len(self.encode(*values))
+
+    def decode(self, data: bytes) -> Tuple[Any, ...]:
+        wire = _Reader(data).read_message()
+        if len(wire) < len(self.types):
+            raise CandidError(f"Expected {len(self.types)} values, got {len(wire)}")
+        return tuple(t.from_wire(v) for t, v in zip(self.types, wire))
+
+
+class _Reader:
+    """Generic DIDL decoder driven by the type table found on the wire."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def _take(self, n: int) -> bytes:
+        end = self.pos + n
+        if end > len(self.data):
+            raise CandidError("Unexpected end of Candid message")
+        chunk = self.data[self.pos:end]
+        self.pos = end
+        return chunk
+
+    def _leb(self) -> int:
+        result = shift = 0
+        while True:
+            byte = self._take(1)[0]
+            result |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                return result
+
+    def _sleb(self) -> int:
+        result = shift = 0
+        while True:
+            byte = self._take(1)[0]
+            result |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                if byte & 0x40:
+                    result -= 1 << shift
+                return result
+
+    def read_message(self) -> List[Any]:
+        if self._take(4) != MAGIC:
+            raise CandidError("Missing DIDL magic bytes")
+        self.table = []
+        for _ in range(self._leb()):
+            code = self._sleb()
+            if code in (_OPT, _VEC):
+                self.table.append((code, self._sleb()))
+            elif code in (_RECORD, _VARIANT):
+                fields = [(self._leb(), self._sleb()) for _ in range(self._leb())]
+                self.table.append((code, fields))
+            else:
+                raise CandidError(f"Unsupported type table entry {code}")
+        arg_types = [self._sleb() for _ in range(self._leb())]
+        return [self._value(ref) for ref in arg_types]
+
+    def _value(self, ref: int) -> Any:
+        if ref >= 0:
+            code, spec = self.table[ref]
+            if code == _OPT:
+                return self._value(spec) if self._take(1)[0] else None
+            if code == _VEC:
+                count = self._leb()
+                if spec == _NAT8:
+                    return self._take(count)
+                return [self._value(spec) for _ in range(count)]
+            if code == _RECORD:
+                return {h: self._value(t) for h, t in spec}
+            index = self._leb()
+            h, t = spec[index]
+            return (h, self._value(t))
+        if ref == _TEXT:
+            return self._take(self._leb()).decode("utf-8")
+        if ref == _BOOL:
+            return self._take(1)[0] == 1
+        if ref == _NAT:
+            return self._leb()
+        if ref == _INT:
+            return self._sleb()
+        if ref in _FIXED_WIDTH:
+            fmt = _FIXED_WIDTH[ref]
+            return struct.unpack(fmt, self._take(struct.calcsize(fmt)))[0]
+        if ref in (_NULL, _RESERVED):
+            return None
+        raise CandidError(f"Unsupported value type {ref}")
+
+
+def encode_item(t: CandidType, value: Any) -> bytes:
+    """Encode a single value of type `t` without a message header."""
+    out = bytearray()
+    t.encode_value(value, out)
+    return bytes(out)
+
+
+def leb128_size(value: int) -> int:
+    """Number of bytes `value` takes as an unsigned LEB128 integer."""
+    size = 1
+    while value >= 0x80:
+        value >>= 7
+        size += 1
+    return size
+
+
+def decode_hex(signature: Signature, text: str) -> Tuple[Any, ...]:
+    """Decode the hex output of `dfx canister call --output raw`."""
+    return signature.decode(bytes.fromhex(text.strip()))
@@ -0,0 +1,66 @@
+"""
+Candid interface of the Zyra canister (icp/src/candid.did).
+
+Shared by ICPClient and the fake dfx used for benchmarks, so both speak
+exactly the same wire format.
+"""
+from candid_codec import Signature, Record, Vec, Opt, TEXT, BOOL, NAT16, NAT32, NAT64, FLOAT64, BLOB
+
+GEO = Record([("lat", FLOAT64), ("lon", FLOAT64)])
+RECOMMENDATION = Record([("step", TEXT), ("source", TEXT), ("created_at", TEXT)])
+AUDIT = Record([("event", TEXT), ("at", TEXT)])
+ENRICHED = Record([("weather_hint", TEXT), ("severity_score", NAT16), ("tags", Vec(TEXT))])
+RESOURCE_REQUEST = Record([
+    ("requested", BOOL), ("type_", TEXT), ("notes", TEXT), ("created_at", Opt(TEXT))
+])
+INCIDENT = Record([
+    ("incident_id", TEXT),
+    ("farmer_id", TEXT),
+    ("lga", TEXT),
+    ("state", TEXT),
+    ("geo", GEO),
+    ("crop", TEXT),
+    ("category", TEXT),
+    ("description", TEXT),
+    ("reported_at", TEXT),
+    ("enriched", ENRICHED),
+    ("status", TEXT),
+    ("recommendations", Vec(RECOMMENDATION)),
+    ("resource_request", RESOURCE_REQUEST),
+    ("audit", Vec(AUDIT)),
+])
+INCIDENT_PAGE_QUERY = Record([
+    ("lga", TEXT),
+    ("cursor", Opt(TEXT)),
+    ("limit", NAT32),
+    ("min_severity", Opt(NAT16)),
+    ("status", Opt(TEXT)),
+    ("reported_after", Opt(TEXT)),
+    ("reported_before", Opt(TEXT)),
+])
+INCIDENT_PAGE = Record([("incidents", Vec(INCIDENT)), ("next_cursor", Opt(TEXT))])
+INCIDENT_DIGEST = Record([("incident_id", TEXT), ("digest", BLOB)])
+CATEGORY_COUNT = Record([("category", TEXT), ("count", NAT64)])
+LGA_SUMMARY = Record([
+    ("lga", TEXT), ("total", NAT64), ("high_severity", NAT64), ("by_category", Vec(CATEGORY_COUNT))
+])
+
+# Method signatures, each with its type table built once at import
+CREATE_INCIDENT_ARGS = Signature(INCIDENT)
+CREATE_INCIDENTS_BATCH_ARGS = Signature(Vec(INCIDENT))
+ADD_RECOMMENDATION_ARGS = Signature(TEXT, RECOMMENDATION)
+SET_STATUS_ARGS = Signature(TEXT, TEXT)
+RESOURCE_REQUEST_ARGS = Signature(TEXT, TEXT, TEXT)
+TEXT_ARG = Signature(TEXT)
+TEXT_RESULT = Signature(TEXT)
+TEXT_LIST_RESULT = Signature(Vec(TEXT))
+OPT_INCIDENT_RESULT = Signature(Opt(INCIDENT))
+INCIDENT_LIST_RESULT = Signature(Vec(INCIDENT))
+INCIDENT_PAGE_ARGS = Signature(INCIDENT_PAGE_QUERY)
+INCIDENT_PAGE_RESULT = Signature(INCIDENT_PAGE)
+LGA_SUMMARY_ARGS = Signature(TEXT, NAT16)
+LGA_SUMMARY_RESULT = Signature(LGA_SUMMARY)
+TEXT_LIST_ARG = Signature(Vec(TEXT))
+BLOB_LIST_RESULT = Signature(Vec(BLOB))
+DIGEST_LIST_RESULT = Signature(Vec(INCIDENT_DIGEST))
+EMPTY_RESULT = Signature()
@@ -0,0 +1,187 @@
+"""
+Bounded worker pools for blocking work done by async handlers.
+
+uAgent handlers share one event loop, so a `dfx` subprocess call, a file
+write or CPU-bound enrichment run inline stalls every other message and
+interval. Handlers hand such work to an executor instead:
+
+    result = await io_executor.run(save_incident_locally, incident_data)
+
+Each executor admits at most `max_workers + max_queue` jobs; further
+callers wait for a slot (backpressure) and get ExecutorBusyError if none
+frees up within `queue_timeout` seconds.
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Coroutine, Dict, Optional, Set
+
+# Blocking I/O: canister calls, local storage writes
+IO_WORKER_THREADS = int(os.getenv("AGENT_WORKER_THREADS", "8"))
+IO_WORKER_QUEUE = int(os.getenv("AGENT_WORKER_QUEUE", "256"))
+# CPU-bound stages (enrichment); "process" sidesteps the GIL for heavy rule sets
+CPU_EXECUTOR_KIND = os.getenv("AGENT_CPU_EXECUTOR", "thread")
+CPU_WORKERS = int(os.getenv("AGENT_CPU_WORKERS", str(os.cpu_count() or 2)))
+CPU_WORKER_QUEUE = int(os.getenv("AGENT_CPU_WORKER_QUEUE", "256"))
+# Seconds a caller waits for a free slot before ExecutorBusyError
+WORKER_QUEUE_TIMEOUT = float(os.getenv("AGENT_WORKER_QUEUE_TIMEOUT", "10"))
+# Farmer reports processed at once by the agri protocol
+MAX_CONCURRENT_REPORTS = int(os.getenv("AGENT_MAX_CONCURRENT_REPORTS", "64"))
+
+
+class ExecutorBusyError(Exception):
+    """Raised when an executor's queue stays full for longer than the caller will wait."""
+
+
+class _LoopSemaphore:
+    """
+    asyncio.Semaphore that is recreated for each event loop, so module-level
+    instances work across repeated `asyncio.run` calls in scripts.
+    """
+
+    def __init__(self, value: int):
+        self.value = value
+        self._loop = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def get(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.value)
+        return self._semaphore
+
+
+class BlockingExecutor:
+    """Thread or process pool with a bounded number of admitted jobs."""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, kind: str = "thread",
+                 queue_timeout: float = WORKER_QUEUE_TIMEOUT):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = _LoopSemaphore(max_workers + max_queue)
+        self._pool: Optional[Executor] = None
+        self._pool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def _executor(self) -> Executor:
+        # Created on first use so importing the module never forks or spawns threads
+        with self._pool_lock:
+            if self._pool is None:
+                if self.kind == "process":
+                    self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix=f"agent-{self.name}"
+                    )
+            return self._pool
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run `fn(*args, **kwargs)` on the pool and return its result. With a
+        process pool, `fn` and its arguments must be picklable.
+        """
+        slots = self._slots.get()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            with self._stats_lock:
+                self.rejected += 1
+            raise ExecutorBusyError(
+                f"{self.name} executor busy ({self.max_workers} workers, {self.max_queue} queued)"
+            )
+
+        with self._stats_lock:
+            self.submitted += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._executor(), functools.partial(fn, *args, **kwargs)
+            )
+            with self._stats_lock:
+                self.completed += 1
+            return result
+        except Exception:
+            with self._stats_lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._stats_lock:
+                self.in_flight -= 1
+            slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "kind": self.kind,
+                "workers": self.max_workers,
+                "queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait)
+                self._pool = None
+
+
+class TaskLimiter:
+    """
+    Runs coroutines as background tasks, at most `limit` at a time.
+
+    `start` waits for a free slot before scheduling, so a burst of messages
+    is processed concurrently but cannot grow the number of live tasks
+    without bound. Strong references are kept until each task finishes.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._slots = _LoopSemaphore(limit)
+        self._tasks: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def start(self, coro: Coroutine) -> asyncio.Task:
+        slots = self._slots.get()
+        await slots.acquire()
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+
+        def _done(finished: asyncio.Task):
+            self._tasks.discard(finished)
+            slots.release()
+
+        task.add_done_callback(_done)
+        return task
+
+    async def join(self):
+        """Wait for every running task to finish."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+# Global executor instances
+io_executor = BlockingExecutor("io", IO_WORKER_THREADS, IO_WORKER_QUEUE)
+cpu_executor = BlockingExecutor("cpu", CPU_WORKERS, CPU_WORKER_QUEUE, kind=CPU_EXECUTOR_KIND)
+report_tasks = TaskLimiter(MAX_CONCURRENT_REPORTS)
@@ -0,0 +1,174 @@
+"""
+Spatial index over incident locations for radius and bounding-box queries.
+
+Incidents are bucketed by category into a uniform grid of lat/lon cells
+(geohash-style buckets), each bucket kept sorted by report time. A query
+visits only the cells overlapping its area, bisects each bucket to the
+time window and checks the exact distance of what remains, so "pest
+incidents within 25 km in the last 7 days" costs the few cells around the
+point plus the incidents returned, not a scan of every incident. Inserts
+are incremental: new incidents go straight into their bucket, and a
+changed record (a status update, say) replaces the one indexed before.
+"""
+import bisect
+import math
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+GEO_INDEX_CELL_DEGREES = float(os.getenv("AGENT_GEO_INDEX_CELL_DEGREES", "0.1"))
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class _Bucket:
+    """Incidents of one category in one cell, ordered by report time."""
+
+    __slots__ = ("times", "incidents")
+
+    def __init__(self):
+        self.times: List[str] = []
+        self.incidents: List[Dict[str, Any]] = []
+
+    def add(self, incident: Dict[str, Any]):
+        reported_at = incident.get("reported_at") or ""
+        position = bisect.bisect_right(self.times, reported_at)
+        self.times.insert(position, reported_at)
+        self.incidents.insert(position, incident)
+
+    def remove(self, incident: Dict[str, Any]):
+        reported_at = incident.get("reported_at") or ""
+        start = bisect.bisect_left(self.times, reported_at)
+        end = bisect.bisect_right(self.times, reported_at)
+        for position in range(start, end):
+            if self.incidents[position]["incident_id"] == incident["incident_id"]:
+                del self.times[position]
+                del self.incidents[position]
+                return
+
+    def since(self, since: Optional[str]) -> List[Dict[str, Any]]:
+        if not since:
+            return self.incidents
+        return self.incidents[bisect.bisect_left(self.times, since):]
+
+
+class GeoIndex:
+    """Thread-safe grid index of incidents by category, location and report time."""
+
+    def __init__(self, cell_degrees: float = GEO_INDEX_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._lock = threading.Lock()
+        # category -> (row, col) -> bucket
+        self._cells: Dict[str, Dict[Tuple[int, int], _Bucket]] = {}
+        # incident_id -> (category, cell, indexed record)
+        self._indexed: Dict[str, Tuple[str, Tuple[int, int], Dict[str, Any]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._indexed)
+
+    def _cell(self, degrees: float) -> int:
+        return math.floor(degrees / self.cell_degrees)
+
+    def add(self, incident: Dict[str, Any]) -> bool:
+        """Index one incident; returns False if it is indexed unchanged or has no location."""
+        return self.add_many([incident]) == 1
+
+    def add_many(self, incidents: Iterable[Dict[str, Any]]) -> int:
+        """
+        Index incidents not seen before and replace changed records of ones
+        that were; returns how many were added or replaced.
+        """
+        added = 0
+        with self._lock:
+            for incident in incidents:
+                incident_id = incident.get("incident_id")
+                geo = incident.get("geo") or {}
+                if not incident_id or geo.get("lat") is None or geo.get("lon") is None:
+                    continue
+                previous = self._indexed.get(incident_id)
+                if previous is not None:
+                    if previous[2] == incident:
+                        continue
+                    self._remove(*previous)
+                category = incident.get("category", "")
+                cell = (self._cell(geo["lat"]), self._cell(geo["lon"]))
+                buckets = self._cells.setdefault(category, {})
+                bucket = buckets.get(cell)
+                if bucket is None:
+                    bucket = buckets[cell] = _Bucket()
+                bucket.add(incident)
+                self._indexed[incident_id] = (category, cell, incident)
+                added += 1
+        return added
+
+    def _remove(self, category: str, cell: Tuple[int, int], incident: Dict[str, Any]):
+        buckets = self._cells[category]
+        buckets[cell].remove(incident)
+        if not buckets[cell].incidents:
+            del buckets[cell]
+
+    def _candidates(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                    category: Optional[str], since: Optional[str]) -> List[Dict[str, Any]]:
+        """Incidents in the cells overlapping the box and the time window."""
+        rows = range(self._cell(min_lat), self._cell(max_lat) + 1)
+        cols = range(self._cell(min_lon), self._cell(max_lon) + 1)
+        with self._lock:
+            if category is not None:
+                categories = [self._cells.get(category, {})]
+            else:
+                categories = list(self._cells.values())
+            found = []
+            for buckets in categories:
+                # Sparse indexes: walk whichever is smaller, the cells of the box or the occupied cells
+                if len(rows) * len(cols) <= len(buckets):
+                    cells = ((row, col) for row in rows for col in cols)
+                    selected = [buckets[cell] for cell in cells if cell in buckets]
+                else:
+                    selected = [bucket for (row, col), bucket in buckets.items() if row in rows and col in cols]
+                for bucket in selected:
+                    found.extend(bucket.since(since))
+            return found
+
+    def within_radius(self, lat: float, lon: float, radius_km: float, category: Optional[str] = None,
+                      since: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        (distance in km, incident) pairs within `radius_km` of the point,
+        nearest first, optionally only one category and reports at or after
+        the ISO timestamp `since`.
+        """
+        lat_span = radius_km / KM_PER_DEGREE_LAT
+        cos_lat = math.cos(math.radians(min(abs(lat) + lat_span, 90.0)))
+        lon_span = 180.0 if cos_lat < 1e-6 else min(radius_km / (KM_PER_DEGREE_LAT * cos_lat), 180.0)
+        candidates = self._candidates(lat - lat_span, lon - lon_span, lat + lat_span, lon + lon_span, category, since)
+        matches = []
+        for incident in candidates:
+            distance = haversine_km(lat, lon, incident["geo"]["lat"], incident["geo"]["lon"])
+            if distance <= radius_km:
+                matches.append((distance, incident))
+        matches.sort(key=lambda match: match[0])
+        return matches[:limit] if limit else matches
+
+    def within_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                    category: Optional[str] = None, since: Optional[str] = None,
+                    limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Incidents inside the box, most recently reported first."""
+        candidates = self._candidates(min_lat, min_lon, max_lat, max_lon, category, since)
+        matches = [
+            incident for incident in candidates
+            if min_lat <= incident["geo"]["lat"] <= max_lat and min_lon <= incident["geo"]["lon"] <= max_lon
+        ]
+        matches.sort(key=lambda incident: incident.get("reported_at") or "", reverse=True)
+        return matches[:limit] if limit else matches
+
+
+# Global incident geo index
+geo_index = GeoIndex()
@@ -0,0 +1,180 @@
+"""
+Offline reverse geocoding of report coordinates to an LGA and state.
+
+Reports name their LGA and state as free text, so typos fragment the
+per-LGA aggregates. When an LGA boundary file (GeoJSON, one feature per
+LGA) is installed at data/lga_boundaries.geojson or AGENT_LGA_BOUNDARIES_PATH,
+incidents are recorded under the LGA whose polygon contains the report's
+coordinates instead.
+
+Polygons are indexed in a uniform grid of cells: each cell lists the LGAs
+whose bounding boxes overlap it, so a lookup tests only a few candidates,
+first by bounding box and then point-in-polygon. Results are kept in an
+LRU keyed by coordinates rounded to about a metre, since farmers report
+repeatedly from the same fields. Without a boundary file resolution is
+disabled and the reported names are kept.
+"""
+import json
+import math
+import os
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from cache import TTLCache, MISSING
+
+LGA_BOUNDARIES_PATH = os.getenv(
+    "AGENT_LGA_BOUNDARIES_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "data", "lga_boundaries.geojson")
+)
+GEOCODE_CELL_DEGREES = float(os.getenv("AGENT_GEOCODE_CELL_DEGREES", "0.25"))
+GEOCODE_CACHE_MAX = int(os.getenv("AGENT_GEOCODE_CACHE_MAX", "100000"))
+# Decimal places of the coordinates cached lookups are keyed by (~1 m)
+CACHE_PRECISION = 5
+
+# Feature properties holding the LGA and state names, first present wins
+LGA_NAME_FIELDS = [os.getenv("AGENT_LGA_NAME_FIELD", "lga"), "lga_name", "LGA", "admin2Name", "NAME_2", "shapeName"]
+STATE_NAME_FIELDS = [os.getenv("AGENT_STATE_NAME_FIELD", "state"), "state_name", "STATE", "admin1Name", "NAME_1"]
+
+
+class LgaMatch(NamedTuple):
+    lga: str
+    state: str
+
+
+class Ring:
+    """One polygon ring as edge arrays for a vectorized crossing-number test."""
+
+    def __init__(self, coordinates: List[List[float]]):
+        points = np.asarray(coordinates, dtype=np.float64)[:, :2]
+        lon, lat = points[:, 0], points[:, 1]
+        next_lon, next_lat = np.roll(lon, -1), np.roll(lat, -1)
+        self.lat, self.next_lat = lat, next_lat
+        self.lon = lon
+        # Longitude change per unit of latitude along each edge (0 for horizontal edges, which never cross)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.slope = np.where(next_lat != lat, (next_lon - lon) / (next_lat - lat), 0.0)
+
+    def contains(self, lat: float, lon: float) -> bool:
+        crosses = (self.lat > lat) != (self.next_lat > lat)
+        crossing_lon = self.lon + (lat - self.lat) * self.slope
+        return bool(np.count_nonzero(crosses & (lon < crossing_lon)) & 1)
+
+
+class Polygon:
+    """Outer ring with optional holes, and its bounding box."""
+
+    def __init__(self, rings: List[List[List[float]]]):
+        self.outer = Ring(rings[0])
+        self.holes = [Ring(ring) for ring in rings[1:]]
+        self.bbox = (
+            float(self.outer.lat.min()), float(self.outer.lon.min()),
+            float(self.outer.lat.max()), float(self.outer.lon.max()),
+        )
+
+    def contains(self, lat: float, lon: float) -> bool:
+        min_lat, min_lon, max_lat, max_lon = self.bbox
+        if not (min_lat <= lat <= max_lat and min_lon <= lon <= max_lon):
+            return False
+        return self.outer.contains(lat, lon) and not any(hole.contains(lat, lon) for hole in self.holes)
+
+
+def _property(properties: Dict[str, Any], fields: List[str]) -> Optional[str]:
+    for field in fields:
+        value = properties.get(field)
+        if value:
+            return str(value).strip()
+    return None
+
+
+class LgaResolver:
+    """Grid-indexed point-in-polygon lookup of LGA boundaries."""
+
+    def __init__(self, features: List[Dict[str, Any]], cell_degrees: float = GEOCODE_CELL_DEGREES,
+                 cache_max: int = GEOCODE_CACHE_MAX):
+        self.cell_degrees = cell_degrees
+        self.lgas: List[LgaMatch] = []
+        self.polygons: List[Tuple[int, Polygon]] = []
+        for feature in features:
+            geometry = feature.get("geometry") or {}
+            properties = feature.get("properties") or {}
+            lga = _property(properties, LGA_NAME_FIELDS)
+            if not lga or geometry.get("type") not in ("Polygon", "MultiPolygon"):
+                continue
+            index = len(self.lgas)
+            self.lgas.append(LgaMatch(lga, _property(properties, STATE_NAME_FIELDS) or ""))
+            parts = [geometry["coordinates"]] if geometry["type"] == "Polygon" else geometry["coordinates"]
+            for rings in parts:
+                if rings and len(rings[0]) >= 3:
+                    self.polygons.append((index, Polygon(rings)))
+
+        # Cell -> positions in self.polygons whose bounding box overlaps the cell
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        for position, (_, polygon) in enumerate(self.polygons):
+            min_lat, min_lon, max_lat, max_lon = polygon.bbox
+            for row in range(self._cell(min_lat), self._cell(max_lat) + 1):
+                for col in range(self._cell(min_lon), self._cell(max_lon) + 1):
+                    self.cells.setdefault((row, col), []).append(position)
+
+        self._cache = TTLCache(cache_max, None)
+        # Canonical spelling of every LGA name, for matching reported names
+        self.canonical_names = {match.lga.lower(): match.lga for match in self.lgas}
+
+    def _cell(self, degrees: float) -> int:
+        return math.floor(degrees / self.cell_degrees)
+
+    def resolve(self, lat: float, lon: float) -> Optional[LgaMatch]:
+        """The LGA containing (lat, lon), or None if it lies outside every boundary."""
+        key = (round(lat, CACHE_PRECISION), round(lon, CACHE_PRECISION))
+        cached = self._cache.get(key)
+        if cached is not MISSING:
+            return cached
+        match = None
+        for position in self.cells.get((self._cell(lat), self._cell(lon)), ()):
+            index, polygon = self.polygons[position]
+            if polygon.contains(lat, lon):
+                match = self.lgas[index]
+                break
+        self._cache.put(key, match)
+        return match
+
+    def stats(self) -> Dict[str, Any]:
+        return {"lgas": len(self.lgas), "polygons": len(self.polygons), "cells": len(self.cells),
+                "cache": self._cache.stats()}
+
+
+def load_lga_resolver(path: str = LGA_BOUNDARIES_PATH) -> Optional[LgaResolver]:
+    """A resolver over the boundary file at `path`, or None if there is none or it is unusable."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            collection = json.load(f)
+        return LgaResolver(collection.get("features", []))
+    except (OSError, ValueError, KeyError, TypeError, IndexError) as e:
+        print(f"Warning: LGA reverse geocoding disabled; could not load {path}: {e}")
+        return None
+
+
+def canonical_location(lga: str, state: str, lat: float, lon: float) -> LgaMatch:
+    """
+    The LGA and state to record for a report: the boundary containing its
+    coordinates when known, otherwise the reported names (in the boundary
+    file's spelling if only the case differs).
+    """
+    if lga_resolver is not None:
+        match = lga_resolver.resolve(lat, lon)
+        if match is not None:
+            return LgaMatch(match.lga, match.state or state)
+    return LgaMatch(canonical_lga_name(lga), state)
+
+
+def canonical_lga_name(lga: str) -> str:
+    """`lga` in the boundary file's spelling if only the case differs."""
+    if lga_resolver is not None:
+        return lga_resolver.canonical_names.get(lga.strip().lower(), lga)
+    return lga
+
+
+# Global LGA resolver, None when no boundary file is installed
+lga_resolver = load_lga_resolver()
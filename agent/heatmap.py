@@ -0,0 +1,154 @@
+"""
+Precomputed heatmap aggregates for the dashboard map.
+
+Incidents are counted into Web Mercator map tiles ("slippy" z/x/y tiles,
+as used by Leaflet and OpenLayers) at every zoom level up to
+HEATMAP_MAX_ZOOM, each tile divided into HEATMAP_TILE_CELLS x
+HEATMAP_TILE_CELLS cells holding the incident count and severity total.
+Aggregates are updated as incidents are added, so serving a tile costs the
+cells in that tile, whatever the total number of incidents. A changed
+record is taken out of its old cells before it is counted again.
+"""
+import math
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+HEATMAP_MAX_ZOOM = int(os.getenv("AGENT_HEATMAP_MAX_ZOOM", "14"))
+# Cells per tile side; a power of two, so a cell at zoom z is a tile at a deeper zoom
+HEATMAP_TILE_CELLS = int(os.getenv("AGENT_HEATMAP_TILE_CELLS", "16"))
+# Latitude limit of the Web Mercator projection
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def mercator(lat: float, lon: float) -> Tuple[float, float]:
+    """Position of (lat, lon) on the Web Mercator square, both in [0, 1)."""
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    x = (lon + 180.0) / 360.0
+    y = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0
+    return min(max(x, 0.0), math.nextafter(1.0, 0.0)), min(max(y, 0.0), math.nextafter(1.0, 0.0))
+
+
+def tile_corner(zoom: float, x: float, y: float) -> Tuple[float, float]:
+    """(lat, lon) of the north-west corner of tile (x, y) at `zoom`; fractional tiles allowed."""
+    scale = 2.0 ** zoom
+    lon = x / scale * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / scale))))
+    return lat, lon
+
+
+class HeatmapTiles:
+    """Thread-safe per-zoom, per-tile cell counts and severity totals, by category."""
+
+    def __init__(self, max_zoom: int = HEATMAP_MAX_ZOOM, tile_cells: int = HEATMAP_TILE_CELLS):
+        if tile_cells < 1 or tile_cells & (tile_cells - 1):
+            raise ValueError(f"Heatmap tile cells must be a power of two, got {tile_cells}")
+        self.max_zoom = max_zoom
+        self.tile_cells = tile_cells
+        self._cell_bits = tile_cells.bit_length() - 1
+        self._lock = threading.Lock()
+        # category -> zoom -> (tile x, tile y) -> (cell col, cell row) -> [count, severity total]
+        self._tiles: Dict[str, List[Dict[Tuple[int, int], Dict[Tuple[int, int], List[float]]]]] = {}
+        # incident_id -> (category, deepest cell col, row, severity, counted record)
+        self._counted: Dict[str, Tuple[str, int, int, float, Dict[str, Any]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._counted)
+
+    def add_many(self, incidents: Iterable[Dict[str, Any]]) -> int:
+        """
+        Count incidents not seen before into every zoom level, moving ones
+        whose record changed; returns how many were added or replaced.
+        """
+        added = 0
+        scale = 1 << (self.max_zoom + self._cell_bits)
+        with self._lock:
+            for incident in incidents:
+                incident_id = incident.get("incident_id")
+                geo = incident.get("geo") or {}
+                if not incident_id or geo.get("lat") is None or geo.get("lon") is None:
+                    continue
+                previous = self._counted.get(incident_id)
+                if previous is not None:
+                    if previous[4] == incident:
+                        continue
+                    self._count(*previous[:4], sign=-1)
+                category = incident.get("category", "")
+                severity = float((incident.get("enriched") or {}).get("severity_score", 0))
+                x, y = mercator(geo["lat"], geo["lon"])
+                # Cell indices at the deepest level; shallower levels drop low bits
+                col, row = int(x * scale), int(y * scale)
+                self._count(category, col, row, severity)
+                self._counted[incident_id] = (category, col, row, severity, incident)
+                added += 1
+        return added
+
+    def _count(self, category: str, col: int, row: int, severity: float, sign: int = 1):
+        """Add (or with sign -1, remove) one incident at deepest cell (col, row) at every zoom."""
+        zooms = self._tiles.get(category)
+        if zooms is None:
+            zooms = self._tiles[category] = [{} for _ in range(self.max_zoom + 1)]
+        for zoom in range(self.max_zoom, -1, -1):
+            shift = self.max_zoom - zoom
+            cell_col, cell_row = col >> shift, row >> shift
+            tile = (cell_col >> self._cell_bits, cell_row >> self._cell_bits)
+            cells = zooms[zoom].get(tile)
+            if cells is None:
+                cells = zooms[zoom][tile] = {}
+            local = (cell_col & (self.tile_cells - 1), cell_row & (self.tile_cells - 1))
+            cell = cells.get(local)
+            if cell is None:
+                cell = cells[local] = [0, 0.0]
+            cell[0] += sign
+            cell[1] += sign * severity
+            if cell[0] <= 0:
+                del cells[local]
+                if not cells:
+                    del zooms[zoom][tile]
+
+    def tile(self, zoom: int, x: int, y: int, category: Optional[str] = None) -> List[Tuple[int, int, int, float]]:
+        """
+        (cell col, cell row, count, mean severity) of the occupied cells of
+        tile (x, y) at `zoom`, cell (0, 0) being the north-west corner.
+        """
+        if not 0 <= zoom <= self.max_zoom:
+            raise ValueError(f"Zoom must be between 0 and {self.max_zoom}")
+        with self._lock:
+            if category is not None:
+                categories = [self._tiles[category]] if category in self._tiles else []
+            else:
+                categories = list(self._tiles.values())
+            merged: Dict[Tuple[int, int], List[float]] = {}
+            for zooms in categories:
+                for local, (count, total) in zooms[zoom].get((x, y), {}).items():
+                    cell = merged.get(local)
+                    if cell is None:
+                        merged[local] = [count, total]
+                    else:
+                        cell[0] += count
+                        cell[1] += total
+        return sorted(
+            (col, row, int(count), round(total / count, 1)) for (col, row), (count, total) in merged.items()
+        )
+
+    def tile_geojson(self, zoom: int, x: int, y: int, category: Optional[str] = None) -> Dict[str, Any]:
+        """The tile's occupied cells as a GeoJSON FeatureCollection of cell polygons."""
+        features = []
+        for col, row, count, mean_severity in self.tile(zoom, x, y, category):
+            cell_zoom = zoom + self._cell_bits
+            cell_x, cell_y = x * self.tile_cells + col, y * self.tile_cells + row
+            north, west = tile_corner(cell_zoom, cell_x, cell_y)
+            south, east = tile_corner(cell_zoom, cell_x + 1, cell_y + 1)
+            features.append({
+                "type": "Feature",
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": [[[west, south], [east, south], [east, north], [west, north], [west, south]]],
+                },
+                "properties": {"count": count, "mean_severity": mean_severity},
+            })
+        return {"type": "FeatureCollection", "features": features}
+
+
+# Global heatmap aggregates
+heatmap = HeatmapTiles()
@@ -1,11 +1,39 @@
 """
 ICP Canister Client for Zyra Agricultural Extension Agent
 """
-import json
 import os
 import subprocess
-from typing import Dict, Any, List, Optional
-from models import Incident, Recommendation, ResourceRequest, Audit, Enriched, Geo
+import time
+from typing import Dict, Any, AsyncIterator, List, Optional
+from models import Incident, IncidentPage, Recommendation, ResourceRequest, Audit, Enriched, Geo
+from cache import TTLCache, MISSING
+from executor import io_executor
+from candid_codec import Signature, decode_hex, encode_item, leb128_size
+from canister_types import (
+    INCIDENT, CREATE_INCIDENT_ARGS, CREATE_INCIDENTS_BATCH_ARGS, ADD_RECOMMENDATION_ARGS,
+    SET_STATUS_ARGS, RESOURCE_REQUEST_ARGS, TEXT_ARG, TEXT_LIST_ARG, INCIDENT_PAGE_ARGS,
+    TEXT_RESULT, TEXT_LIST_RESULT, OPT_INCIDENT_RESULT, INCIDENT_PAGE_RESULT,
+    BLOB_LIST_RESULT, DIGEST_LIST_RESULT, EMPTY_RESULT, LGA_SUMMARY_ARGS, LGA_SUMMARY_RESULT
+)
+
+ICP_DIR = os.path.join(os.path.dirname(__file__), "..", "icp")
+
+# Ingress messages are capped at 2 MiB; leave headroom for the call envelope
+MAX_BATCH_BYTES = int(os.getenv("ICP_MAX_BATCH_BYTES", str(1536 * 1024)))
+# Bound per-call work so a batch stays well inside the instruction limit
+MAX_BATCH_ITEMS = int(os.getenv("ICP_MAX_BATCH_ITEMS", "500"))
+
+# Read-through cache for canister queries; the TTL bounds staleness from other writers
+CACHE_MAX_ENTRIES = int(os.getenv("ICP_CACHE_MAX_ENTRIES", "2048"))
+CACHE_TTL_SECONDS = float(os.getenv("ICP_CACHE_TTL_SECONDS", "30"))
+
+# Page size for LGA listings; the canister caps it at 500
+DEFAULT_PAGE_SIZE = int(os.getenv("ICP_PAGE_SIZE", "100"))
+# Severity counted as high in LGA summaries
+HIGH_SEVERITY = 70
+
+class ICPCallError(Exception):
+    """Raised when a `dfx canister call` exits with an error."""
 
 class ICPClient:
     """Client for interacting with the ICP canister."""
@@ -13,14 +41,20 @@ class ICPClient:
     def __init__(self, canister_id: Optional[str] = None, network: str = "local"):
         self.canister_id = canister_id
         self.network = network
-        self.dfx_path = "dfx"
+        self.dfx_path = os.getenv("ICP_DFX_PATH", "dfx")
+        self.incident_cache = TTLCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+        # Per-LGA reads, keyed by tuples starting with the LGA: (lga, "listing"),
+        # (lga, "summary", threshold) and (lga, "page", cursor, limit, *filters)
+        self.lga_cache = TTLCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+        # incident_id -> lga for every incident seen, so updates by ID can
+        # invalidate the right LGA listing
+        self._incident_lga = TTLCache(CACHE_MAX_ENTRIES * 8, None)
     
     def deploy_canister(self) -> str:
         """Deploy the canister and return the canister ID."""
         try:
             # Change to ICP directory
-            icp_dir = os.path.join(os.path.dirname(__file__), "..", "icp")
-            os.chdir(icp_dir)
+            os.chdir(ICP_DIR)
             
             # Start local replica if not running
             self._start_replica()
@@ -30,7 +64,7 @@ class ICPClient:
                 [self.dfx_path, "deploy", "--network", self.network],
                 capture_output=True,
                 text=True,
-                cwd=icp_dir
+                cwd=ICP_DIR
             )
             
             if result.returncode != 0:
@@ -65,12 +99,44 @@ class ICPClient:
                 print("Starting local ICP replica...")
                 subprocess.run(
                     [self.dfx_path, "start", "--background", "--clean"],
-                    cwd=os.path.join(os.path.dirname(__file__), "..", "icp")
+                    cwd=ICP_DIR
                 )
                 
         except Exception as e:
             print(f"Error starting replica: {e}")
     
+    def _call(self, method: str, signature: Signature, args: tuple,
+              returns: Signature, update: bool = False) -> tuple:
+        """
+        Call a canister method with binary Candid arguments.
+
+        The argument is passed hex-encoded on stdin (`--type raw`) so large
+        payloads are not limited by the command-line length, and the reply
+        is read back with `--output raw` and decoded with `returns`.
+        """
+        return self._call_raw(method, signature.encode(*args), returns, update)
+    
+    def _call_raw(self, method: str, argument: bytes, returns: Signature,
+                  update: bool = False) -> tuple:
+        """Call a canister method with a pre-encoded Candid argument."""
+        command = [self.dfx_path, "canister", "call"]
+        if update:
+            command.append("--update")
+        command += [
+            "--network", self.network, self.canister_id, method,
+            "--type", "raw", "--output", "raw", "--argument-file", "-"
+        ]
+        result = subprocess.run(
+            command,
+            input=argument.hex(),
+            capture_output=True,
+            text=True,
+            cwd=ICP_DIR
+        )
+        if result.returncode != 0:
+            raise ICPCallError(f"{method} failed: {result.stderr.strip()}")
+        return decode_hex(returns, result.stdout)
+    
     def create_incident(self, incident: Incident) -> Optional[str]:
         """Create an incident on the ICP canister."""
         if not self.canister_id:
@@ -78,115 +144,268 @@ class ICPClient:
             return None
         
         try:
-            # Convert incident to canister format
             incident_data = self._incident_to_canister_format(incident)
-            
-            # Convert to Candid format
-            candid_data = self._incident_to_candid_format(incident)
-            
-            # Call canister
-            result = subprocess.run([
-                self.dfx_path, "canister", "call", "--update", "--network", self.network,
-                self.canister_id, "create_incident", candid_data
-            ], capture_output=True, text=True, cwd=os.path.join(os.path.dirname(__file__), "..", "icp"))
-            
-            if result.returncode == 0:
-                incident_id = result.stdout.strip().strip('"')
-                print(f"Incident created on ICP: {incident_id}")
-                return incident_id
-            else:
-                print(f"Error creating incident: {result.stderr}")
-                return None
+            incident_id, = self._call(
+                "create_incident", CREATE_INCIDENT_ARGS, (incident_data,), TEXT_RESULT, update=True
+            )
+            self._invalidate(incident_id, incident.lga)
+            print(f"Incident created on ICP: {incident_id}")
+            return incident_id
                 
         except Exception as e:
             print(f"Error calling canister: {e}")
             return None
     
+    def create_incidents_batch(self, incidents: List[Incident],
+                               max_bytes: int = MAX_BATCH_BYTES,
+                               max_items: int = MAX_BATCH_ITEMS) -> List[Optional[str]]:
+        """
+        Create many incidents with as few update calls as possible.
+        
+        Incidents are packed into chunks that fit within `max_bytes` of
+        encoded Candid and `max_items` entries, one `create_incidents_batch`
+        call per chunk. The result is aligned with `incidents`: each entry is
+        the assigned incident ID, or None if its chunk failed or the incident
+        alone exceeds the message size limit.
+        """
+        results: List[Optional[str]] = [None] * len(incidents)
+        if not self.canister_id:
+            print("No canister ID available. Deploy first.")
+            return results
+        
+        for chunk in self._batch_chunks(incidents, max_bytes, max_items):
+            positions = [position for position, _ in chunk]
+            try:
+                incident_ids, = self._call_raw(
+                    "create_incidents_batch",
+                    CREATE_INCIDENTS_BATCH_ARGS.encode_vec([item for _, item in chunk]),
+                    TEXT_LIST_RESULT,
+                    update=True
+                )
+                if len(incident_ids) != len(positions):
+                    raise ICPCallError(
+                        f"create_incidents_batch returned {len(incident_ids)} IDs for {len(positions)} incidents"
+                    )
+                for position, incident_id in zip(positions, incident_ids):
+                    results[position] = incident_id
+                    self._invalidate(incident_id, incidents[position].lga)
+                print(f"Created {len(incident_ids)} incidents on ICP in one call")
+            except Exception as e:
+                print(f"Error creating incident batch of {len(positions)}: {e}")
+        
+        return results
+    
+    def _batch_chunks(self, incidents: List[Incident], max_bytes: int, max_items: int):
+        """Yield lists of (position, encoded incident) that fit in one call."""
+        budget = max_bytes - len(CREATE_INCIDENTS_BATCH_ARGS.header)
+        chunk, chunk_bytes = [], 0
+        for position, incident in enumerate(incidents):
+            item = encode_item(INCIDENT, self._incident_to_canister_format(incident))
+            if len(item) + leb128_size(1) > budget:
+                print(f"Incident {position} is {len(item)} bytes, over the {max_bytes} byte batch limit; skipping")
+                continue
+            if chunk and (
+                len(chunk) >= max_items
+                or chunk_bytes + len(item) + leb128_size(len(chunk) + 1) > budget
+            ):
+                yield chunk
+                chunk, chunk_bytes = [], 0
+            chunk.append((position, item))
+            chunk_bytes += len(item)
+        if chunk:
+            yield chunk
+    
     def get_incident(self, incident_id: str) -> Optional[Incident]:
         """Get an incident from the ICP canister."""
         if not self.canister_id:
             return None
         
+        cached = self.incident_cache.get(incident_id)
+        if cached is not MISSING:
+            return cached
+        
         try:
-            result = subprocess.run([
-                self.dfx_path, "canister", "call", "--network", self.network,
-                self.canister_id, "get_incident", incident_id
-            ], capture_output=True, text=True, cwd=os.path.join(os.path.dirname(__file__), "..", "icp"))
-            
-            if result.returncode == 0 and result.stdout.strip() != "null":
-                print(f"Raw response: {result.stdout}")
-                # Parse the Candid response format
-                # The response is in format: (opt record { ... })
-                response_text = result.stdout.strip()
-                print(f"Response text: {response_text}")
-                print(f"Contains 'opt record': {'opt record' in response_text}")
-                print(f"Contains 'null': {'null' in response_text}")
-                if "opt record" in response_text:
-                    # Extract the record part
-                    start = response_text.find("record {")
-                    end = response_text.rfind("}") + 1
-                    print(f"Start: {start}, End: {end}")
-                    if start != -1 and end != -1:
-                        record_text = response_text[start:end]
-                        print(f"Record text: {record_text}")
-                        # Convert Candid format to JSON-like format for parsing
-                        # This is a simplified conversion - in production, use a proper Candid parser
-                        incident_data = self._parse_candid_record(record_text)
-                        print(f"Parsed data: {incident_data}")
-                        if incident_data:
-                            return self._canister_to_incident_format(incident_data)
-                        else:
-                            print("Failed to parse record data")
-                            return None
-                    else:
-                        print("Failed to extract record text")
-                        return None
-                else:
-                    print("Response format not recognized")
-                    return None
-            else:
-                print(f"Error: {result.stderr}")
-                return None
+            incident_data, = self._call("get_incident", TEXT_ARG, (incident_id,), OPT_INCIDENT_RESULT)
+            incident = self._canister_to_incident_format(incident_data) if incident_data else None
+            self.incident_cache.put(incident_id, incident)
+            if incident:
+                self._incident_lga.put(incident_id, incident.lga)
+            return incident
                 
         except Exception as e:
             print(f"Error getting incident: {e}")
             return None
     
     def list_incidents_by_lga(self, lga: str) -> List[Incident]:
-        """List incidents by LGA from the ICP canister."""
+        """
+        List all incidents in an LGA from the ICP canister.
+        
+        Fetched page by page so no single reply grows with the LGA's size;
+        prefer `list_incidents_page` or `iter_incidents_by_lga` when only
+        part of the listing is needed.
+        """
         if not self.canister_id:
             return []
         
+        cached = self.lga_cache.get((lga, "listing"))
+        if cached is not MISSING:
+            return list(cached)
+        
         try:
-            result = subprocess.run([
-                self.dfx_path, "canister", "call", "--network", self.network,
-                self.canister_id, "list_incidents_by_lga", lga
-            ], capture_output=True, text=True, cwd=os.path.join(os.path.dirname(__file__), "..", "icp"))
-            
-            if result.returncode == 0:
-                print(f"LGA query response: {result.stdout}")
-                # Parse the Candid response format
-                response_text = result.stdout.strip()
-                if response_text.startswith("(") and "vec" in response_text:
-                    # Extract the vector part
-                    start = response_text.find("vec {")
-                    end = response_text.rfind("}") + 1
-                    if start != -1 and end != -1:
-                        vec_text = response_text[start:end]
-                        print(f"Vector text: {vec_text}")
-                        # Parse individual records in the vector
-                        incidents = []
-                        # For now, return empty list as parsing complex vectors is complex
-                        # In production, use a proper Candid parser
-                        return []
-                return []
-            else:
-                return []
+            incidents, cursor = [], None
+            while True:
+                page = self._fetch_page({"lga": lga, "cursor": cursor, "limit": DEFAULT_PAGE_SIZE})
+                incidents.extend(page.incidents)
+                cursor = page.next_cursor
+                if cursor is None:
+                    break
+            self.lga_cache.put((lga, "listing"), incidents)
+            for incident in incidents:
+                self._incident_lga.put(incident.incident_id, incident.lga)
+            return list(incidents)
                 
         except Exception as e:
             print(f"Error listing incidents: {e}")
             return []
     
+    def warm_first_pages(self, lgas: List[str], page_size: int = DEFAULT_PAGE_SIZE,
+                         deadline: Optional[float] = None) -> int:
+        """
+        Fetch the first unfiltered page of each of `lgas`, as operator
+        queries read it, where it is not already cached; live entries are
+        kept. Stops at the monotonic `deadline`. Returns the pages fetched.
+        """
+        warmed = 0
+        for lga in lgas:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            key = (lga, "page", None, page_size, None, None, None, None)
+            if self.lga_cache.peek(key, MISSING) is not MISSING:
+                continue
+            try:
+                self.list_incidents_page(lga, None, page_size)
+                warmed += 1
+            except ICPCallError as e:
+                print(f"Error warming incident page: {e}")
+        return warmed
+    
+    def purge_expired(self) -> int:
+        """Drop expired entries from the read caches."""
+        return self.incident_cache.purge_expired() + self.lga_cache.purge_expired()
+    
+    def list_incidents_page(self, lga: str, cursor: Optional[str] = None,
+                            limit: int = DEFAULT_PAGE_SIZE,
+                            min_severity: Optional[int] = None,
+                            status: Optional[str] = None,
+                            reported_after: Optional[str] = None,
+                            reported_before: Optional[str] = None) -> IncidentPage:
+        """
+        Fetch one page of an LGA's incidents, in incident ID order.
+        
+        Pass the returned `next_cursor` back as `cursor` for the following
+        page; it is None once the listing is exhausted. A page may hold
+        fewer than `limit` incidents when filters are selective. Raises
+        ICPCallError if the canister call fails, so a failed page is never
+        mistaken for the end of the listing.
+        """
+        if not self.canister_id:
+            return IncidentPage(incidents=[])
+        
+        key = (lga, "page", cursor, limit, min_severity, status, reported_after, reported_before)
+        cached = self.lga_cache.get(key)
+        if cached is not MISSING:
+            return cached
+        
+        page = self._fetch_page({
+            "lga": lga,
+            "cursor": cursor,
+            "limit": limit,
+            "min_severity": min_severity,
+            "status": status,
+            "reported_after": reported_after,
+            "reported_before": reported_before,
+        })
+        self.lga_cache.put(key, page)
+        for incident in page.incidents:
+            self._incident_lga.put(incident.incident_id, incident.lga)
+        return page
+    
+    def lga_summary(self, lga: str, high_severity: int = HIGH_SEVERITY) -> Optional[Dict[str, Any]]:
+        """
+        Total, category breakdown and high severity count of an LGA's
+        incidents, counted by the canister without transferring them. None
+        without a canister; raises ICPCallError if the call fails.
+        """
+        if not self.canister_id:
+            return None
+        
+        key = (lga, "summary", high_severity)
+        cached = self.lga_cache.get(key)
+        if cached is not MISSING:
+            return dict(cached)
+        
+        counts, = self._call("lga_summary", LGA_SUMMARY_ARGS, (lga, high_severity), LGA_SUMMARY_RESULT)
+        summary = {
+            "lga": counts["lga"],
+            "total_incidents": counts["total"],
+            "category_breakdown": {item["category"]: item["count"] for item in counts["by_category"]},
+            "high_severity_count": counts["high_severity"],
+        }
+        self.lga_cache.put(key, summary)
+        return dict(summary)
+    
+    async def iter_incidents_by_lga(self, lga: str, page_size: int = DEFAULT_PAGE_SIZE,
+                                    **filters) -> AsyncIterator[Incident]:
+        """
+        Asynchronously iterate over an LGA's incidents one page at a time.
+        
+        Accepts the same filters as `list_incidents_page`. Each page is
+        fetched off the event loop, and the next one only when the caller
+        has consumed the previous page. A failed page raises ICPCallError
+        out of the iteration rather than ending it early.
+        """
+        cursor = None
+        while True:
+            page = await io_executor.run(
+                self.list_incidents_page, lga, cursor, page_size, **filters
+            )
+            for incident in page.incidents:
+                yield incident
+            cursor = page.next_cursor
+            if cursor is None:
+                return
+    
+    def _fetch_page(self, query: Dict[str, Any]) -> IncidentPage:
+        page, = self._call("list_incidents_page", INCIDENT_PAGE_ARGS, (query,), INCIDENT_PAGE_RESULT)
+        return IncidentPage(
+            incidents=[self._canister_to_incident_format(data) for data in page["incidents"]],
+            next_cursor=page["next_cursor"]
+        )
+    
+    def merkle_nodes(self, prefixes: List[str]) -> Optional[List[bytes]]:
+        """Hashes of the canister's reconciliation tree nodes, by hex prefix."""
+        if not self.canister_id:
+            return None
+        
+        try:
+            hashes, = self._call("merkle_nodes", TEXT_LIST_ARG, (prefixes,), BLOB_LIST_RESULT)
+            return hashes
+        except Exception as e:
+            print(f"Error reading merkle nodes: {e}")
+            return None
+    
+    def merkle_buckets(self, prefixes: List[str]) -> Optional[Dict[str, bytes]]:
+        """incident_id -> digest for every incident in the given leaf buckets."""
+        if not self.canister_id:
+            return None
+        
+        try:
+            digests, = self._call("merkle_buckets", TEXT_LIST_ARG, (prefixes,), DIGEST_LIST_RESULT)
+            return {item["incident_id"]: item["digest"] for item in digests}
+        except Exception as e:
+            print(f"Error reading merkle buckets: {e}")
+            return None
+    
     def add_recommendation(self, incident_id: str, recommendation: Recommendation):
         """Add a recommendation to an incident."""
         if not self.canister_id:
@@ -198,13 +417,11 @@ class ICPClient:
                 "source": recommendation.source,
                 "created_at": recommendation.created_at
             }
-            
-            result = subprocess.run([
-                self.dfx_path, "canister", "call", "--update", "--network", self.network,
-                self.canister_id, "add_recommendation", incident_id, json.dumps(rec_data)
-            ], capture_output=True, text=True, cwd=os.path.join(os.path.dirname(__file__), "..", "icp"))
-            
-            return result.returncode == 0
+            self._call(
+                "add_recommendation", ADD_RECOMMENDATION_ARGS, (incident_id, rec_data), EMPTY_RESULT, update=True
+            )
+            self._invalidate(incident_id)
+            return True
             
         except Exception as e:
             print(f"Error adding recommendation: {e}")
@@ -216,12 +433,9 @@ class ICPClient:
             return False
         
         try:
-            result = subprocess.run([
-                self.dfx_path, "canister", "call", "--update", "--network", self.network,
-                self.canister_id, "set_status", incident_id, status
-            ], capture_output=True, text=True, cwd=os.path.join(os.path.dirname(__file__), "..", "icp"))
-            
-            return result.returncode == 0
+            self._call("set_status", SET_STATUS_ARGS, (incident_id, status), EMPTY_RESULT, update=True)
+            self._invalidate(incident_id)
+            return True
             
         except Exception as e:
             print(f"Error setting status: {e}")
@@ -233,17 +447,35 @@ class ICPClient:
             return False
         
         try:
-            result = subprocess.run([
-                self.dfx_path, "canister", "call", "--update", "--network", self.network,
-                self.canister_id, "raise_resource_request", incident_id, request_type, notes
-            ], capture_output=True, text=True, cwd=os.path.join(os.path.dirname(__file__), "..", "icp"))
-            
-            return result.returncode == 0
+            self._call(
+                "raise_resource_request", RESOURCE_REQUEST_ARGS,
+                (incident_id, request_type, notes), EMPTY_RESULT, update=True
+            )
+            self._invalidate(incident_id)
+            return True
             
         except Exception as e:
             print(f"Error raising resource request: {e}")
             return False
     
+    def _invalidate(self, incident_id: str, lga: Optional[str] = None):
+        """Drop cached reads affected by our own write to `incident_id`."""
+        self.incident_cache.invalidate(incident_id)
+        lga = lga or self._incident_lga.peek(incident_id)
+        if lga:
+            self._incident_lga.put(incident_id, lga)
+            self.lga_cache.invalidate_matching(lambda key: key[0] == lga)
+        else:
+            # Unknown LGA: any cached listing could contain this incident
+            self.lga_cache.clear()
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit-rate metrics for the read-through caches."""
+        return {
+            "incidents": self.incident_cache.stats(),
+            "lga_listings": self.lga_cache.stats(),
+        }
+    
     def _incident_to_canister_format(self, incident: Incident) -> Dict[str, Any]:
         """Convert Incident model to canister format."""
         return {
@@ -286,147 +518,6 @@ class ICPClient:
             ]
         }
     
-    def _incident_to_candid_format(self, incident: Incident) -> str:
-        """Convert Incident model to Candid format."""
-        # Convert recommendations to Candid format
-        recs_candid = "; ".join([
-            f'record {{ step = "{rec.step}"; source = "{rec.source}"; created_at = "{rec.created_at}" }}'
-            for rec in incident.recommendations
-        ])
-        
-        # Convert audit to Candid format
-        audit_candid = "; ".join([
-            f'record {{ event = "{audit.event}"; at = "{audit.at}" }}'
-            for audit in incident.audit
-        ])
-        
-        # Convert tags to Candid format
-        tags_candid = "; ".join([f'"{tag}"' for tag in incident.enriched.tags])
-        
-        # Convert resource request
-        resource_created_at = f'"{incident.resource_request.created_at}"' if incident.resource_request.created_at else "null"
-        
-        return f'''(record {{
-            incident_id = "{incident.incident_id}";
-            farmer_id = "{incident.farmer_id}";
-            lga = "{incident.lga}";
-            state = "{incident.state}";
-            geo = record {{ lat = {incident.geo.lat}; lon = {incident.geo.lon} }};
-            crop = "{incident.crop.value}";
-            category = "{incident.category.value}";
-            description = "{incident.description}";
-            reported_at = "{incident.reported_at}";
-            enriched = record {{
-                weather_hint = "{incident.enriched.weather_hint.value}";
-                severity_score = {incident.enriched.severity_score};
-                tags = vec {{ {tags_candid} }}
-            }};
-            status = "{incident.status.value}";
-            recommendations = vec {{ {recs_candid} }};
-            resource_request = record {{
-                requested = {str(incident.resource_request.requested).lower()};
-                type_ = "{incident.resource_request.type_}";
-                notes = "{incident.resource_request.notes}";
-                created_at = {resource_created_at}
-            }};
-            audit = vec {{ {audit_candid} }}
-        }})'''
-    
-    def _parse_candid_record(self, record_text: str) -> Dict[str, Any]:
-        """Parse Candid record format to dictionary."""
-        # This is a simplified parser - in production, use a proper Candid parser
-        result = {}
-        
-        # Extract basic string fields
-        import re
-        
-        # Extract incident_id
-        match = re.search(r'incident_id = "([^"]*)"', record_text)
-        if match:
-            result["incident_id"] = match.group(1)
-        
-        # Extract farmer_id
-        match = re.search(r'farmer_id = "([^"]*)"', record_text)
-        if match:
-            result["farmer_id"] = match.group(1)
-        
-        # Extract lga
-        match = re.search(r'lga = "([^"]*)"', record_text)
-        if match:
-            result["lga"] = match.group(1)
-        
-        # Extract state
-        match = re.search(r'state = "([^"]*)"', record_text)
-        if match:
-            result["state"] = match.group(1)
-        
-        # Extract description
-        match = re.search(r'description = "([^"]*)"', record_text)
-        if match:
-            result["description"] = match.group(1)
-        
-        # Extract crop
-        match = re.search(r'crop = "([^"]*)"', record_text)
-        if match:
-            result["crop"] = match.group(1)
-        
-        # Extract category
-        match = re.search(r'category = "([^"]*)"', record_text)
-        if match:
-            result["category"] = match.group(1)
-        
-        # Extract status
-        match = re.search(r'status = "([^"]*)"', record_text)
-        if match:
-            result["status"] = match.group(1)
-        
-        # Extract reported_at
-        match = re.search(r'reported_at = "([^"]*)"', record_text)
-        if match:
-            result["reported_at"] = match.group(1)
-        
-        # Extract geo
-        geo_match = re.search(r'geo = record \{ lat = ([^:]+) : float64; lon = ([^:]+) : float64 \}', record_text)
-        if geo_match:
-            result["geo"] = {
-                "lat": float(geo_match.group(1).strip()),
-                "lon": float(geo_match.group(2).strip())
-            }
-        
-        # Extract enriched
-        enriched_match = re.search(r'enriched = record \{ weather_hint = "([^"]*)"; severity_score = (\d+) : nat16', record_text)
-        print(f"Enriched match: {enriched_match}")
-        if enriched_match:
-            result["enriched"] = {
-                "weather_hint": enriched_match.group(1),
-                "severity_score": int(enriched_match.group(2)),
-                "tags": []  # Simplified for now
-            }
-            print(f"Enriched parsed: {result['enriched']}")
-        else:
-            print("Failed to parse enriched field")
-            # Add default enriched data
-            result["enriched"] = {
-                "weather_hint": "unknown",
-                "severity_score": 0,
-                "tags": []
-            }
-        
-        # Add default values for missing fields
-        if "recommendations" not in result:
-            result["recommendations"] = []
-        if "resource_request" not in result:
-            result["resource_request"] = {
-                "requested": False,
-                "type_": "none",
-                "notes": "",
-                "created_at": None
-            }
-        if "audit" not in result:
-            result["audit"] = []
-        
-        return result
-    
     def _canister_to_incident_format(self, data: Dict[str, Any]) -> Incident:
         """Convert canister format to Incident model."""
         from models import CropType, CategoryType, WeatherHint, StatusType, ResourceType
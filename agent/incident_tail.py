@@ -0,0 +1,79 @@
+"""
+Incremental reader for the local incidents file.
+
+The agent and the API both store incidents by rewriting data/incidents.json
+as the previous array plus the new records, with the same `json.dump`
+settings, so the bytes of records already written never change. A reader
+that remembers where the last record it saw ends can therefore parse just
+the records appended after it, instead of the whole file on every change.
+Anything else (a shorter or reformatted file) falls back to a full read.
+"""
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _records_end(data: bytes) -> int:
+    """Offset just past the last record of a JSON array (just past "[" when empty)."""
+    closing = data.rstrip().rfind(b"]")
+    if closing < 0:
+        raise ValueError("Incident file is not a JSON array")
+    return len(data[:closing].rstrip())
+
+
+class IncidentFileTail:
+    """Reads the incidents appended to a JSON-array file since the last read."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # (mtime, size) of the file when last read, and where its last record ends
+        self._stat: Optional[Tuple[float, int]] = None
+        self._offset = 0
+
+    def read_new(self) -> List[Dict[str, Any]]:
+        """
+        Incidents written since the previous call; every incident on the
+        first call, or after the file was rewritten in another layout.
+        A file caught mid-write is left for the next call.
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return []
+            if self._stat == (stat.st_mtime, stat.st_size):
+                return []
+            with open(self.path, "rb") as f:
+                if self._offset and stat.st_size >= self._offset:
+                    f.seek(self._offset)
+                    tail = f.read()
+                    incidents = self._parse_tail(tail)
+                    if incidents is not None:
+                        self._offset += _records_end(tail)
+                        self._stat = (stat.st_mtime, stat.st_size)
+                        return incidents
+                    f.seek(0)
+                data = f.read()
+            try:
+                incidents = json.loads(data)
+                self._offset = _records_end(data)
+            except ValueError:
+                return []
+            self._stat = (stat.st_mtime, stat.st_size)
+            return incidents
+
+    @staticmethod
+    def _parse_tail(tail: bytes) -> Optional[List[Dict[str, Any]]]:
+        """The records in `tail` (the file after the last record read), or None if it does not continue the array."""
+        rest = tail.lstrip()
+        if rest.startswith(b","):
+            rest = rest[1:]
+        elif not rest.startswith(b"]"):
+            return None
+        try:
+            incidents = json.loads(b"[" + rest)
+        except ValueError:
+            return None
+        return incidents if isinstance(incidents, list) else None
@@ -0,0 +1,212 @@
+"""
+Rule-based intent router for chat queries.
+
+Common, unambiguous requests ("incidents in Kano Municipal", "status of
+inc-20250826161054", "mark inc-... as closed") are matched with compiled
+patterns and answered straight from `call_agricultural_function` with a
+templated reply, skipping both ASI:One round trips. LGA queries are only
+matched when they name a known LGA and nothing else, so time ranges,
+categories and other filters always reach the LLM. Anything the rules are
+not confident about returns None and goes to the LLM as before.
+"""
+import csv
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from models import StatusType
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+# Extra LGA names to recognise, comma-separated
+EXTRA_LGAS = [name.strip() for name in os.getenv("AGENT_KNOWN_LGAS", "").split(",") if name.strip()]
+
+INCIDENT_ID = r"(?P<incident_id>inc-[A-Za-z0-9][A-Za-z0-9-]*)"
+STATUSES = "|".join(status.value for status in StatusType)
+# Words that signal the user wants something the rules below do not cover
+WRITE_WORDS = re.compile(
+    r"\b(add|recommend\w*|report(ed|ing)?|create|new|delete|remove|why|how|should|compare)\b",
+    re.IGNORECASE
+)
+
+
+class IntentMatch(NamedTuple):
+    """A confidently recognised request: the tool to call and its arguments."""
+    tool: str
+    arguments: Dict[str, Any]
+
+
+def _anchored(pattern: str) -> "re.Pattern":
+    # Whole-message match, tolerating courtesy words and trailing punctuation
+    return re.compile(
+        r"^\s*(?:please\s+|can you\s+|could you\s+)?" + pattern + r"(?:\s+please)?\s*[?.!]*\s*$",
+        re.IGNORECASE
+    )
+
+
+STATUS_UPDATE_PATTERNS = [
+    _anchored(r"(?:mark|set|update|change|move)\s+(?:incident\s+)?" + INCIDENT_ID
+              + r"(?:'s)?\s+(?:status\s+)?(?:as|to)\s+(?P<status>" + STATUSES + r")"),
+    _anchored(r"(?:close|resolve)\s+(?:incident\s+)?" + INCIDENT_ID),
+]
+INCIDENT_DETAIL_PATTERNS = [
+    _anchored(r"(?:what(?:'s| is)\s+(?:the\s+)?)?(?:status|details?|info(?:rmation)?)\s+(?:of|for|on|about)\s+"
+              r"(?:incident\s+)?" + INCIDENT_ID),
+    _anchored(r"(?:show|get|check|lookup|look up|find|fetch|describe)(?:\s+me)?\s+(?:incident\s+)?" + INCIDENT_ID
+              + r"(?:\s+(?:status|details?))?"),
+    _anchored(r"(?:incident\s+)?" + INCIDENT_ID + r"(?:\s+(?:status|details?))?"),
+]
+LGA_QUERY_PATTERN = _anchored(
+    r"(?:show|list|get|find|any|what are the|what are|are there)?(?:\s+me)?(?:\s+all)?(?:\s+the)?\s*"
+    r"(?:incidents?|reports?|cases?|problems?|issues?)\s+(?:in|for|at|from|around)\s+"
+    r"(?P<lga>[A-Za-z][A-Za-z' -]*?)(?:\s+lga)?"
+)
+# Looser phrasing is only trusted when it names a known LGA
+LGA_KEYWORDS = re.compile(
+    r"\b(incidents?|reports?|cases?|problems?|issues?|outbreaks?|happening|going on|situation)\b",
+    re.IGNORECASE
+)
+# Words a loose LGA query may contain besides the LGA and a keyword; any other
+# word (a crop, category, time range, severity...) is a filter the LLM must see
+LGA_FILLER_WORDS = frozenset("""
+    show list get find tell give me us all the any are there is what what's whats how many in for at from
+    around of on about latest recent current currently going happening situation lga
+    incident incidents report reports case cases problem problems issue issues outbreak outbreaks
+""".split())
+WORD = re.compile(r"[A-Za-z']+")
+
+
+def load_known_lgas() -> List[str]:
+    """LGA names from the farmer registry, seed data and local incidents."""
+    names = set(EXTRA_LGAS)
+    try:
+        with open(os.path.join(DATA_DIR, "farmers.csv"), "r") as f:
+            names.update(row["lga"] for row in csv.DictReader(f) if row.get("lga"))
+    except (OSError, KeyError):
+        pass
+    for filename in ("seed_incidents.json", "incidents.json"):
+        try:
+            with open(os.path.join(DATA_DIR, filename), "r") as f:
+                names.update(incident["lga"] for incident in json.load(f) if incident.get("lga"))
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+    return sorted(names)
+
+
+class IntentRouter:
+    """Compiled pattern and keyword matcher for high-confidence chat intents."""
+
+    def __init__(self, known_lgas: Iterable[str] = ()):
+        self._lgas: Dict[str, str] = {}
+        self._lga_pattern: Optional["re.Pattern"] = None
+        # Incidents are saved from worker threads
+        self._lock = threading.Lock()
+        self.add_lgas(known_lgas)
+
+    def add_lgas(self, names: Iterable[str]):
+        """Recognise more LGA names, e.g. as new incidents arrive."""
+        new = {name.lower(): name for name in names if name and name.lower() not in self._lgas}
+        if not new:
+            return
+        with self._lock:
+            # Readers see either the old or the new set, never one being built
+            lgas = {**new, **self._lgas}
+            # Longest names first so "Kano Municipal" wins over "Kano"
+            alternatives = sorted(lgas, key=len, reverse=True)
+            self._lga_pattern = re.compile(
+                r"\b(" + "|".join(re.escape(name) for name in alternatives) + r")\b", re.IGNORECASE
+            )
+            self._lgas = lgas
+
+    def match(self, text: str) -> Optional[IntentMatch]:
+        """Return the intent for `text`, or None if the LLM should decide."""
+        text = text.strip()
+        if not text or len(text) > 200:
+            return None
+
+        if WRITE_WORDS.search(text):
+            return None
+
+        for pattern in STATUS_UPDATE_PATTERNS:
+            found = pattern.match(text)
+            if found:
+                status = (found.groupdict().get("status") or StatusType.CLOSED.value).lower()
+                return IntentMatch("update_incident_status", {
+                    "incident_id": found.group("incident_id"), "status": status
+                })
+
+        for pattern in INCIDENT_DETAIL_PATTERNS:
+            found = pattern.match(text)
+            if found:
+                return IntentMatch("get_incident_details", {"incident_id": found.group("incident_id")})
+
+        # Only a known LGA with nothing after it; "Ikeja last week" is not an LGA
+        found = LGA_QUERY_PATTERN.match(text)
+        if found:
+            lga = " ".join(found.group("lga").split())
+            if lga.lower() in self._lgas:
+                return IntentMatch("query_incidents_by_lga", {"lga": self._lgas[lga.lower()]})
+
+        if self._lga_pattern is not None and LGA_KEYWORDS.search(text):
+            lgas = {name.lower() for name in self._lga_pattern.findall(text)}
+            if len(lgas) == 1:
+                rest = self._lga_pattern.sub(" ", text)
+                if all(word.lower() in LGA_FILLER_WORDS for word in WORD.findall(rest)):
+                    return IntentMatch("query_incidents_by_lga", {"lga": self._lgas[lgas.pop()]})
+
+        return None
+
+
+def render_reply(intent: IntentMatch, result: Dict[str, Any]) -> str:
+    """Phrase a tool result for the user without calling the LLM."""
+    if not result.get("success"):
+        reason = result.get("message") or result.get("error") or "the request could not be completed"
+        if intent.tool == "get_incident_details":
+            return f"I couldn't find incident {intent.arguments['incident_id']}: {reason}."
+        return f"Sorry, {reason}."
+
+    if intent.tool == "get_incident_details":
+        incident = result["incident"]
+        reply = (
+            f"Incident {incident['incident_id']} ({incident['crop']} {incident['category']}) in "
+            f"{incident['lga']}, {incident['state']} is {incident['status']} with severity "
+            f"{incident['severity_score']}/100."
+        )
+        if incident["recommendations"]:
+            reply += f" Latest recommendation: {incident['recommendations'][-1]['step']}"
+        return reply
+
+    if intent.tool == "query_incidents_by_lga":
+        summary = result.get("summary", {})
+        if not summary.get("total_incidents"):
+            return f"There are no recorded incidents in {intent.arguments['lga']}."
+        categories = ", ".join(
+            f"{category}: {count}" for category, count in sorted(
+                summary["category_breakdown"].items(), key=lambda item: -item[1]
+            )
+        )
+        reply = (
+            f"{summary['total_incidents']} incidents recorded in {summary['lga']} ({categories}). "
+            f"{summary['high_severity_count']} are high severity."
+        )
+        urgent = sorted(
+            (incident for incident in result.get("incidents", []) if incident["severity_score"] >= 70),
+            key=lambda incident: -incident["severity_score"]
+        )[:3]
+        if urgent:
+            reply += " Most urgent: " + "; ".join(
+                f"{incident['incident_id']} ({incident['crop']} {incident['category']}, "
+                f"severity {incident['severity_score']}, {incident['status']})"
+                for incident in urgent
+            ) + "."
+        return reply
+
+    if intent.tool == "update_incident_status":
+        return f"Incident {intent.arguments['incident_id']} is now marked {intent.arguments['status']}."
+
+    return result.get("message", "Done.")
+
+
+# Global router instance
+intent_router = IntentRouter(load_known_lgas())
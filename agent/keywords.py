@@ -0,0 +1,102 @@
+"""
+Single-pass multilingual keyword matching for report descriptions.
+
+Descriptions are scanned once with an Aho-Corasick automaton built from
+every term of the enrichment rules: the English keywords plus their
+Hausa, Yoruba, Igbo and Pidgin equivalents from the rules table. Each
+term maps to its English keyword, so rules are written once in English
+and a scan reports which of those keywords the description mentions in
+any language. The cost of a scan grows with the length of the
+description, not with the number of terms.
+
+Matching is by substring, case-insensitive and ignores diacritics, so
+"òjò" and "ojo" match alike; plain English text is matched exactly as
+`keyword in description.lower()` would.
+"""
+import unicodedata
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Tuple
+
+
+def normalize_text(text: str) -> str:
+    """Lower-case `text` and strip combining diacritics from non-ASCII characters."""
+    text = text.lower()
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize("NFKD", text)
+    return unicodedata.normalize("NFC", "".join(ch for ch in decomposed if not unicodedata.combining(ch)))
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton mapping terms found in a text to their keywords."""
+
+    def __init__(self, keywords: Iterable[str], translations: Mapping[str, Iterable[str]] = None):
+        """
+        `keywords` are matched as themselves; `translations` maps a keyword
+        to further terms that count as mentions of it.
+        """
+        terms: Dict[str, List[str]] = {}
+        for keyword in keywords:
+            keyword = normalize_text(keyword)
+            terms.setdefault(keyword, [keyword])
+        for keyword, extra in (translations or {}).items():
+            keyword = normalize_text(keyword)
+            if keyword not in terms:
+                # Translations of words no rule uses would only slow scans down
+                continue
+            for term in extra:
+                term = normalize_text(term)
+                if term and term not in terms[keyword]:
+                    terms[keyword].append(term)
+
+        self.keywords: Tuple[str, ...] = tuple(sorted(terms))
+        # Every term of each keyword, the keyword itself first
+        self.terms: Dict[str, Tuple[str, ...]] = {keyword: tuple(terms[keyword]) for keyword in self.keywords}
+        self._build(terms)
+
+    def _build(self, terms: Dict[str, List[str]]):
+        # Trie of all terms
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[set] = [set()]
+        for keyword, keyword_terms in terms.items():
+            for term in keyword_terms:
+                state = 0
+                for ch in term:
+                    if ch not in goto[state]:
+                        goto.append({})
+                        outputs.append(set())
+                        goto[state][ch] = len(goto) - 1
+                    state = goto[state][ch]
+                outputs[state].add(keyword)
+
+        # Breadth-first failure links, folded into a full transition table
+        # so scanning never follows a failure link. A missing transition
+        # means the root.
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])]
+        delta.extend({} for _ in range(len(goto) - 1))
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state] |= outputs[fail[state]]
+            transitions = dict(delta[fail[state]])
+            for ch, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(ch, 0)
+                transitions[ch] = child
+                queue.append(child)
+            delta[state] = transitions
+
+        # Bound lookups per state keep the scan loop to one call per character
+        self._step = [transitions.get for transitions in delta]
+        self._outputs: List[FrozenSet[str]] = [frozenset(found) for found in outputs]
+
+    def find(self, text: str) -> FrozenSet[str]:
+        """Keywords mentioned anywhere in `text`, in any of their terms."""
+        step, outputs = self._step, self._outputs
+        found = set()
+        state = 0
+        for ch in normalize_text(text):
+            state = step[state](ch, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return frozenset(found)
@@ -1,10 +1,15 @@
-import asyncio
 import os
 import sys
 from dotenv import load_dotenv
 from uagents import Agent, Context
 from uagents.setup import fund_agent_if_low
-from protocols import agri_protocol
+from protocols import agri_protocol, load_incidents_from_local
+from outbox import outbox_worker, OUTBOX_DRAIN_INTERVAL
+from executor import io_executor, cpu_executor, report_tasks
+from aggregates import aggregates
+from outbreaks import outbreak_engine
+from icp_client import icp_client
+from maintenance import maintenance, MAINTENANCE_TICK_SECONDS
 from models import FarmerReport, OperatorQuery, AgentResponse
 from utils import load_seed_data, enrich_incident, generate_recommendation, should_raise_resource_request, get_resource_request_type
 import json
@@ -12,17 +17,32 @@ import json
 # Load environment variables
 load_dotenv()
 
-# Create the Zyra agent
+# Create the Zyra agent; shards behind router_agent.py each set their own
+# name, seed, port, AGENT_INCIDENTS_PATH and ICP_OUTBOX_PATH
+AGENT_PORT = int(os.getenv("AGENT_PORT", "8001"))
 agent = Agent(
     name=os.getenv("AGENT_NAME", "zyra_agricultural_agent"),
     seed=os.getenv("AGENT_SEED", "zyra_seed_123"),
-    port=8001,
-    endpoint=["http://127.0.0.1:8001/submit"],
+    port=AGENT_PORT,
+    endpoint=[os.getenv("AGENT_ENDPOINT", f"http://127.0.0.1:{AGENT_PORT}/submit")],
 )
 
 # Include the agricultural protocol
 agent.include(agri_protocol)
 
+# Maintenance task intervals and time budgets, in seconds
+HEARTBEAT_INTERVAL = float(os.getenv("AGENT_HEARTBEAT_INTERVAL", "30"))
+OUTBOX_DRAIN_BUDGET = float(os.getenv("AGENT_OUTBOX_DRAIN_BUDGET", "10"))
+OUTBOX_COMPACT_INTERVAL = float(os.getenv("AGENT_OUTBOX_COMPACT_INTERVAL", "60"))
+AGGREGATE_REFRESH_INTERVAL = float(os.getenv("AGENT_AGGREGATE_REFRESH_INTERVAL", "300"))
+AGGREGATE_REFRESH_BUDGET = float(os.getenv("AGENT_AGGREGATE_REFRESH_BUDGET", "30"))
+CACHE_WARM_INTERVAL = float(os.getenv("AGENT_CACHE_WARM_INTERVAL", "20"))
+CACHE_WARM_BUDGET = float(os.getenv("AGENT_CACHE_WARM_BUDGET", "10"))
+# Busiest LGAs whose first canister page is kept warm
+CACHE_WARM_LGAS = int(os.getenv("AGENT_CACHE_WARM_LGAS", "5"))
+OUTBREAK_REFRESH_INTERVAL = float(os.getenv("AGENT_OUTBREAK_REFRESH_INTERVAL", "60"))
+OUTBREAK_REFRESH_BUDGET = float(os.getenv("AGENT_OUTBREAK_REFRESH_BUDGET", "30"))
+
 @agent.on_event("startup")
 async def startup(ctx: Context):
     """
@@ -34,15 +54,80 @@ async def startup(ctx: Context):
     # Fund agent if needed (for demo purposes)
     await fund_agent_if_low(agent.wallet.address())
     
+    # Queued incident writes are synced to the ICP canister by the maintenance tasks
+    ctx.logger.info(f"ICP outbox has {len(outbox_worker.outbox)} operations pending")
+    ctx.logger.info(f"Maintenance tasks: {', '.join(maintenance.tasks)}")
+    
     ctx.logger.info("✅ Agent ready to process farmer reports and operator queries")
 
-@agent.on_interval(period=30.0)
+@agent.on_interval(period=MAINTENANCE_TICK_SECONDS)
 async def periodic_check(ctx: Context):
     """
-    Periodic check for any pending tasks or maintenance.
+    Start whichever maintenance tasks are due; they run in the background.
     """
-    # For demo purposes, we'll just log that we're alive
-    ctx.logger.debug("Agent heartbeat - ready to serve")
+    maintenance.tick(ctx)
+
+@maintenance.task("heartbeat", interval=HEARTBEAT_INTERVAL, run_at_start=False)
+async def heartbeat(ctx: Context, deadline: float):
+    ctx.logger.debug(
+        f"Agent heartbeat - ready to serve ({len(report_tasks)} reports in progress, "
+        f"io {io_executor.stats()['in_flight']} in flight, cpu {cpu_executor.stats()['in_flight']} in flight, "
+        f"{len(outbox_worker.outbox)} outbox operations pending)"
+    )
+
+@maintenance.task("drain_outbox", interval=OUTBOX_DRAIN_INTERVAL, budget=OUTBOX_DRAIN_BUDGET)
+async def drain_outbox(ctx: Context, deadline: float) -> int:
+    applied = await outbox_worker.drain(deadline=deadline)
+    if applied:
+        ctx.logger.info(f"Outbox synced {applied} operations to ICP ({len(outbox_worker.outbox)} pending)")
+    return applied
+
+@maintenance.task("compact_outbox", interval=OUTBOX_COMPACT_INTERVAL)
+async def compact_outbox(ctx: Context, deadline: float) -> bool:
+    return await outbox_worker.compact()
+
+@maintenance.task("refresh_aggregates", interval=AGGREGATE_REFRESH_INTERVAL, budget=AGGREGATE_REFRESH_BUDGET)
+async def refresh_aggregates(ctx: Context, deadline: float) -> int:
+    """
+    Recount the per-LGA aggregates from the local store; on the first run,
+    also load the stored incidents into outbreak detection.
+    """
+    incidents = await io_executor.run(load_incidents_from_local)
+    first_load = not aggregates.loaded
+    # A thread, not the CPU pool: a process pool would rebuild a copy of the aggregates
+    await io_executor.run(aggregates.rebuild, incidents)
+    if first_load:
+        # Incidents saved later reach the engine from save_incidents_locally
+        await io_executor.run(outbreak_engine.add_many, incidents)
+    return len(incidents)
+
+@maintenance.task("warm_caches", interval=CACHE_WARM_INTERVAL, budget=CACHE_WARM_BUDGET, run_at_start=False)
+async def warm_caches(ctx: Context, deadline: float) -> int:
+    """Purge expired cache entries and refetch the busiest LGAs' first query page where it expired."""
+    purged = icp_client.purge_expired()
+    if not aggregates.loaded:
+        return purged
+    lgas = aggregates.busiest_lgas(CACHE_WARM_LGAS)
+    # The key operator queries read: first page at the default page size
+    page_size = OperatorQuery.model_fields["page_size"].default
+    await io_executor.run(icp_client.warm_first_pages, lgas, page_size, deadline)
+    return purged
+
+@maintenance.task("detect_outbreaks", interval=OUTBREAK_REFRESH_INTERVAL, budget=OUTBREAK_REFRESH_BUDGET, run_at_start=False)
+async def detect_outbreaks(ctx: Context, deadline: float) -> int:
+    """Re-cluster the crops and categories with new incidents into outbreaks."""
+    # A thread, not the CPU pool: the engine's clusters live in this process, and a process pool would refresh a copy
+    refreshed = await io_executor.run(outbreak_engine.refresh)
+    if refreshed:
+        outbreaks = outbreak_engine.outbreaks()
+        ctx.logger.info(f"Outbreak detection: {len(outbreaks)} active outbreaks")
+        for outbreak in outbreaks[:3]:
+            ctx.logger.info(
+                f"  {outbreak['outbreak_id']}: {outbreak['size']} {outbreak['category']} incidents on "
+                f"{outbreak['crop']} around {', '.join(outbreak['lgas']) or 'unknown LGAs'} "
+                f"({outbreak['growth_per_day']}/day)"
+            )
+    return refreshed
 
 def process_seed_data():
     """
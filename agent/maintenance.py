@@ -0,0 +1,135 @@
+"""
+Background maintenance on the agent's periodic interval.
+
+Housekeeping that would otherwise run on the request path (outbox
+compaction and draining, refreshing aggregates, warming and purging
+caches) is registered here as tasks, each with its own interval and time
+budget. Every tick of the agent's interval starts the tasks that are due
+as background tasks, so a slow task never delays the tick, and a task is
+never started again while its previous run is still going.
+
+A task is a coroutine function taking the agent context of the tick that
+started it and the monotonic `deadline` its run should finish by; tasks
+that loop over work check the deadline and stop early.
+Runs that take longer than their budget are counted as overruns.
+"""
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+MAINTENANCE_TICK_SECONDS = float(os.getenv("AGENT_MAINTENANCE_TICK_SECONDS", "1.0"))
+
+TaskFn = Callable[[Any, float], Awaitable[Any]]
+
+
+class MaintenanceTask:
+    """One housekeeping job and its run history."""
+
+    def __init__(self, name: str, fn: TaskFn, interval: float, budget: float):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.budget = budget
+        self.running = False
+        # Monotonic time of the last start; None runs on the first tick
+        self.last_started: Optional[float] = None
+        self.last_duration = 0.0
+        self.last_result: Any = None
+        self.last_error: Optional[str] = None
+        self.runs = 0
+        self.failures = 0
+        self.overruns = 0
+        self.skipped = 0
+
+    def due(self, now: float) -> bool:
+        return self.last_started is None or now - self.last_started >= self.interval
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "budget": self.budget,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "last_duration": round(self.last_duration, 3),
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+        }
+
+
+class MaintenanceScheduler:
+    """Runs registered tasks when due, one run per task at a time."""
+
+    def __init__(self):
+        self.tasks: Dict[str, MaintenanceTask] = {}
+        self._running: Set[asyncio.Task] = set()
+
+    def add(self, name: str, fn: TaskFn, interval: float, budget: Optional[float] = None,
+            run_at_start: bool = True):
+        """Register `fn` to run every `interval` seconds within `budget` seconds."""
+        task = MaintenanceTask(name, fn, interval, budget if budget is not None else interval)
+        if not run_at_start:
+            task.last_started = time.monotonic()
+        self.tasks[name] = task
+        return task
+
+    def task(self, name: str, interval: float, budget: Optional[float] = None, run_at_start: bool = True):
+        """Decorator form of `add`."""
+        def register(fn: TaskFn) -> TaskFn:
+            self.add(name, fn, interval, budget, run_at_start)
+            return fn
+        return register
+
+    def tick(self, ctx) -> List[str]:
+        """Start every due task that is not already running; returns their names."""
+        now = time.monotonic()
+        started = []
+        for task in self.tasks.values():
+            if not task.due(now):
+                continue
+            if task.running:
+                # Still busy from an earlier tick; never overlap runs
+                task.skipped += 1
+                continue
+            task.running = True
+            task.last_started = now
+            run = asyncio.get_running_loop().create_task(self._run(task, ctx))
+            self._running.add(run)
+            run.add_done_callback(self._running.discard)
+            started.append(task.name)
+        return started
+
+    async def _run(self, task: MaintenanceTask, ctx):
+        started = time.monotonic()
+        try:
+            task.last_result = await task.fn(ctx, started + task.budget)
+            task.last_error = None
+            task.runs += 1
+        except Exception as e:
+            task.failures += 1
+            task.last_error = str(e)
+            ctx.logger.error(f"Maintenance task {task.name} failed: {e}")
+        finally:
+            task.last_duration = time.monotonic() - started
+            task.running = False
+            if task.last_duration > task.budget:
+                task.overruns += 1
+                ctx.logger.warning(
+                    f"Maintenance task {task.name} took {task.last_duration:.1f}s "
+                    f"(budget {task.budget:.1f}s)"
+                )
+
+    async def join(self):
+        """Wait for every running task to finish."""
+        while self._running:
+            await asyncio.gather(*list(self._running), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: task.stats() for name, task in self.tasks.items()}
+
+
+# Global maintenance scheduler
+maintenance = MaintenanceScheduler()
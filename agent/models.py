@@ -32,6 +32,11 @@ class StatusType(str, Enum):
     DISPATCHED = "dispatched"
     CLOSED = "closed"
 
+class QueryMode(str, Enum):
+    SUMMARY = "summary"
+    IDS = "ids"
+    FULL = "full"
+
 class ResourceType(str, Enum):
     AGROCHEMICAL = "agrochemical"
     SEED = "seed"
@@ -82,6 +87,23 @@ class Incident(BaseModel):
     class Config:
         validate_by_name = True
 
+class IncidentPage(BaseModel):
+    incidents: List[Incident]
+    next_cursor: Optional[str] = None
+
+class ReconcileReport(BaseModel):
+    missing_on_chain: List[str] = []
+    missing_locally: List[str] = []
+    mismatched: List[str] = []
+    # Differing incidents left out because outbox operations for them are still pending
+    pending: List[str] = []
+    buckets_compared: int = 0
+    canister_queries: int = 0
+
+    @property
+    def in_sync(self) -> bool:
+        return not (self.missing_on_chain or self.missing_locally or self.mismatched)
+
 # uAgent Message Models
 class FarmerReport(BaseModel):
     farmer_id: str
@@ -92,6 +114,10 @@ class FarmerReport(BaseModel):
     category: CategoryType
     description: str
 
+class FarmerReportBatch(BaseModel):
+    reports: List[FarmerReport]
+    batch_id: str = ""
+
 class EnrichmentResult(BaseModel):
     weather_hint: WeatherHint
     severity_score: int
@@ -103,6 +129,11 @@ class ChainWriteAck(BaseModel):
 
 class OperatorQuery(BaseModel):
     lga: str
+    mode: QueryMode = QueryMode.FULL
+    page_size: int = Field(default=50, ge=1, le=500)
+    cursor: Optional[str] = None
+    # Lets a router pick the shard without looking the LGA up
+    state: Optional[str] = None
 
 class AgentResponse(BaseModel):
     success: bool
@@ -0,0 +1,356 @@
+"""
+Durable outbox for canister writes.
+
+Farmer-facing handlers record the canister operations they need
+(create, add_recommendation, set_status, raise_resource_request) in an
+append-only JSON-lines log and return immediately. A background worker
+drains the log: creates are sent through `create_incidents_batch`, each
+incident's operations are applied strictly in the order they were queued,
+and failed operations are retried with exponential backoff until they
+reach the chain.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+from uuid import uuid4
+
+from models import Incident, Recommendation
+from icp_client import icp_client
+from executor import io_executor
+
+OUTBOX_PATH = os.getenv(
+    "ICP_OUTBOX_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "data", "icp_outbox.jsonl")
+)
+OUTBOX_MAX_PENDING = int(os.getenv("ICP_OUTBOX_MAX_PENDING", "10000"))
+OUTBOX_BATCH_SIZE = int(os.getenv("ICP_OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_DRAIN_INTERVAL = float(os.getenv("ICP_OUTBOX_DRAIN_INTERVAL", "2.0"))
+
+CREATE_INCIDENT = "create_incident"
+ADD_RECOMMENDATION = "add_recommendation"
+SET_STATUS = "set_status"
+RAISE_RESOURCE_REQUEST = "raise_resource_request"
+OPERATION_KINDS = (CREATE_INCIDENT, ADD_RECOMMENDATION, SET_STATUS, RAISE_RESOURCE_REQUEST)
+
+RETRY_BASE_SECONDS = 2.0
+RETRY_MAX_SECONDS = 300.0
+
+
+class OutboxFullError(Exception):
+    """Raised when the outbox is at capacity and the caller cannot wait."""
+
+
+class Outbox:
+    """
+    Persistent queue of pending canister operations.
+
+    Every change is appended to the log as one JSON line ("op", "done" or
+    "retry" records) and fsynced, so a crash loses nothing that was
+    acknowledged. The log is replayed on start and compacted to the pending
+    operations once enough completed records accumulate.
+    """
+
+    def __init__(self, path: str = OUTBOX_PATH, max_pending: int = OUTBOX_MAX_PENDING):
+        self.path = path
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._ops: Dict[str, Dict[str, Any]] = {}
+        # Per-incident FIFO of op ids; dict order is enqueue order of the first op
+        self._queues: "OrderedDict[str, Deque[str]]" = OrderedDict()
+        self._dead_records = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write
+                    continue
+                self._apply(record)
+
+    def _apply(self, record: Dict[str, Any]):
+        record_type = record.pop("type")
+        if record_type == "op":
+            self._ops[record["op_id"]] = record
+            self._queues.setdefault(record["incident_id"], deque()).append(record["op_id"])
+        elif record_type == "done":
+            op = self._ops.pop(record["op_id"], None)
+            self._dead_records += 2
+            if op:
+                queue = self._queues.get(op["incident_id"])
+                if queue:
+                    queue.remove(op["op_id"])
+                    if not queue:
+                        del self._queues[op["incident_id"]]
+        elif record_type == "retry":
+            op = self._ops.get(record["op_id"])
+            self._dead_records += 1
+            if op:
+                op.update(attempts=record["attempts"], next_attempt_at=record["next_attempt_at"],
+                          last_error=record.get("last_error"))
+
+    def _append(self, records: List[Dict[str, Any]]):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def __len__(self) -> int:
+        return len(self._ops)
+
+    def pending_incident_ids(self) -> set:
+        """IDs of the incidents with operations not yet applied on the canister."""
+        with self._lock:
+            return set(self._queues)
+
+    @property
+    def has_capacity(self) -> bool:
+        return len(self._ops) < self.max_pending
+
+    def enqueue(self, kind: str, incident_id: str, payload: Dict[str, Any]) -> str:
+        """Durably queue one operation and return its op id."""
+        return self.enqueue_many([(kind, incident_id, payload)])[0]
+
+    def enqueue_many(self, operations: List[tuple]) -> List[str]:
+        """Durably queue (kind, incident_id, payload) operations in one write."""
+        for kind, _, _ in operations:
+            if kind not in OPERATION_KINDS:
+                raise ValueError(f"Unknown outbox operation: {kind}")
+        with self._lock:
+            if len(self._ops) + len(operations) > self.max_pending:
+                raise OutboxFullError(f"Outbox has {len(self._ops)} pending operations")
+            now = time.time()
+            records = [{
+                "type": "op",
+                "op_id": uuid4().hex,
+                "kind": kind,
+                "incident_id": incident_id,
+                "payload": payload,
+                "enqueued_at": now,
+                "attempts": 0,
+                "next_attempt_at": now,
+            } for kind, incident_id, payload in operations]
+            self._append(records)
+            for record in records:
+                self._apply(dict(record))
+            return [record["op_id"] for record in records]
+
+    def ready(self, limit: int, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Return up to `limit` operations that may run now: the head of each
+        incident's queue, provided its backoff has expired.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            heads = []
+            for queue in self._queues.values():
+                op = self._ops[queue[0]]
+                if op["next_attempt_at"] <= now:
+                    heads.append(dict(op))
+                    if len(heads) >= limit:
+                        break
+            return heads
+
+    def complete(self, op_ids: List[str]):
+        """Mark operations as applied on the canister."""
+        self.settle(op_ids, {})
+
+    def fail(self, op_ids: List[str], error: str):
+        """Schedule operations for retry with exponential backoff."""
+        self.settle([], {op_id: error for op_id in op_ids})
+
+    def settle(self, completed: List[str], failed: Dict[str, str]):
+        """
+        Mark `completed` operations as applied and schedule the `failed`
+        ones (op id -> error) for retry with exponential backoff, in a
+        single log append.
+        """
+        if not completed and not failed:
+            return
+        with self._lock:
+            now = time.time()
+            records = [{"type": "done", "op_id": op_id} for op_id in completed]
+            for op_id, error in failed.items():
+                op = self._ops.get(op_id)
+                if not op:
+                    continue
+                attempts = op["attempts"] + 1
+                delay = min(RETRY_BASE_SECONDS * (2 ** (attempts - 1)), RETRY_MAX_SECONDS)
+                records.append({
+                    "type": "retry",
+                    "op_id": op_id,
+                    "attempts": attempts,
+                    "next_attempt_at": now + delay,
+                    "last_error": error,
+                })
+            if not records:
+                return
+            self._append(records)
+            for record in records:
+                self._apply(record)
+
+    def needs_compaction(self) -> bool:
+        return self._dead_records > max(1000, 2 * len(self._ops))
+
+    def compact(self):
+        """Rewrite the log so it holds only the pending operations."""
+        with self._lock:
+            tmp_path = self.path + ".tmp"
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                for queue in self._queues.values():
+                    for op_id in queue:
+                        f.write(json.dumps({"type": "op", **self._ops[op_id]}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._dead_records = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            oldest = min((op["enqueued_at"] for op in self._ops.values()), default=None)
+            return {
+                "pending": len(self._ops),
+                "incidents": len(self._queues),
+                "retrying": sum(1 for op in self._ops.values() if op["attempts"]),
+                "oldest_age_seconds": round(time.time() - oldest, 1) if oldest else 0.0,
+            }
+
+
+class OutboxWorker:
+    """Drains an Outbox into the ICP canister."""
+
+    def __init__(self, outbox: Outbox, client, batch_size: int = OUTBOX_BATCH_SIZE,
+                 interval: float = OUTBOX_DRAIN_INTERVAL):
+        self.outbox = outbox
+        self.client = client
+        self.batch_size = batch_size
+        self.interval = interval
+        self._drain_lock = asyncio.Lock()
+        self._progress = asyncio.Event()
+
+    async def submit(self, operations: List[tuple], timeout: float = 5.0) -> List[str]:
+        """
+        Queue operations, waiting up to `timeout` seconds for the worker to
+        free capacity if the outbox is full.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return await io_executor.run(self.outbox.enqueue_many, operations)
+            except OutboxFullError:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise
+                self._progress.clear()
+                try:
+                    await asyncio.wait_for(self._progress.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def drain(self, max_rounds: int = 10, deadline: Optional[float] = None) -> int:
+        """
+        Apply ready operations until nothing more can run right now, or
+        until the monotonic `deadline` passes.
+        Returns the number of operations that reached the canister.
+        """
+        applied = 0
+        async with self._drain_lock:
+            for _ in range(max_rounds):
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                ops = self.outbox.ready(self.batch_size)
+                if not ops:
+                    break
+                done = await self._apply(ops)
+                applied += done
+                if done:
+                    self._progress.set()
+                else:
+                    break
+        return applied
+
+    async def compact(self) -> bool:
+        """Rewrite the outbox log if enough of it is dead; returns whether it did."""
+        if not self.outbox.needs_compaction():
+            return False
+        async with self._drain_lock:
+            await io_executor.run(self.outbox.compact)
+        return True
+
+    async def _apply(self, ops: List[Dict[str, Any]]) -> int:
+        creates = [op for op in ops if op["kind"] == CREATE_INCIDENT]
+        others = [op for op in ops if op["kind"] != CREATE_INCIDENT]
+        completed: List[str] = []
+        failed: Dict[str, str] = {}
+
+        if creates:
+            incidents = [Incident.model_validate(op["payload"]) for op in creates]
+            results = await io_executor.run(self.client.create_incidents_batch, incidents)
+            for op, result in zip(creates, results):
+                if result:
+                    completed.append(op["op_id"])
+                else:
+                    failed[op["op_id"]] = "create_incidents_batch failed"
+
+        # Different incidents are independent, so their heads run concurrently
+        outcomes = await asyncio.gather(*(io_executor.run(self._call, op) for op in others))
+        for op, ok in zip(others, outcomes):
+            if ok:
+                completed.append(op["op_id"])
+            else:
+                failed[op["op_id"]] = f"{op['kind']} failed"
+
+        # One fsynced append for the whole round, off the event loop
+        await io_executor.run(self.outbox.settle, completed, failed)
+        return len(completed)
+
+    def _call(self, op: Dict[str, Any]) -> bool:
+        payload = op["payload"]
+        incident_id = op["incident_id"]
+        if op["kind"] == ADD_RECOMMENDATION:
+            return bool(self.client.add_recommendation(incident_id, Recommendation(**payload)))
+        if op["kind"] == SET_STATUS:
+            return bool(self.client.set_status(incident_id, payload["status"]))
+        if op["kind"] == RAISE_RESOURCE_REQUEST:
+            return bool(self.client.raise_resource_request(
+                incident_id, payload["request_type"], payload["notes"]
+            ))
+        return False
+
+    async def run(self, logger=None):
+        """Drain forever; intended to be started as a background task."""
+        while True:
+            try:
+                applied = await self.drain()
+                await self.compact()
+                if applied and logger:
+                    logger.info(f"Outbox synced {applied} operations to ICP ({len(self.outbox)} pending)")
+            except Exception as e:
+                if logger:
+                    logger.error(f"Outbox drain failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+def new_incident_id() -> str:
+    """Mint a locally unique incident ID; the canister keeps IDs it is given."""
+    return f"inc-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{uuid4().hex[:6]}"
+
+
+# Global outbox and worker instances
+outbox = Outbox()
+outbox_worker = OutboxWorker(outbox, icp_client)
@@ -0,0 +1,307 @@
+"""
+Spatio-temporal outbreak clustering.
+
+Recent incidents are grouped by category and crop (so a cluster of
+`fall_armyworm` reports is pest on maize) and clustered DBSCAN-style:
+two incidents are neighbours when they are within OUTBREAK_EPS_KM of each
+other and reported within OUTBREAK_EPS_DAYS, an incident with at least
+OUTBREAK_MIN_INCIDENTS - 1 neighbours is a core point, and clusters are
+the connected core points plus the incidents next to them.
+
+Neighbours are found on a grid whose cells are one neighbourhood wide in
+space and time, so each incident is compared only with the incidents in
+adjacent cells, and distances and cluster labels are computed with NumPy
+over whole cells at a time. New or changed incidents only mark their
+group dirty; dirty groups are re-clustered on the next refresh, and
+clusters keep their outbreak ID from one refresh to the next by member
+overlap.
+"""
+import math
+import os
+import threading
+from datetime import datetime, timedelta
+from itertools import product
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import uuid4
+
+import numpy as np
+
+from geo_index import KM_PER_DEGREE_LAT, haversine_km
+
+OUTBREAK_EPS_KM = float(os.getenv("OUTBREAK_EPS_KM", "10"))
+OUTBREAK_EPS_DAYS = float(os.getenv("OUTBREAK_EPS_DAYS", "7"))
+OUTBREAK_MIN_INCIDENTS = int(os.getenv("OUTBREAK_MIN_INCIDENTS", "3"))
+# Incidents older than this are no longer part of any outbreak
+OUTBREAK_WINDOW_DAYS = float(os.getenv("OUTBREAK_WINDOW_DAYS", "30"))
+# Growth compares the last this-many days with the same span before it
+OUTBREAK_GROWTH_DAYS = float(os.getenv("OUTBREAK_GROWTH_DAYS", "3"))
+
+# Half of the 27 neighbouring cells (plus the cell itself): each pair of cells is visited once
+_HALF_NEIGHBOURHOOD = [offset for offset in product((-1, 0, 1), repeat=3) if offset >= (0, 0, 0)]
+
+
+def parse_reported_at(value: str) -> Optional[datetime]:
+    """Naive UTC datetime of an incident's `reported_at`, to the second."""
+    try:
+        return datetime.fromisoformat((value or "")[:19])
+    except ValueError:
+        return None
+
+
+def dbscan_labels(lat: np.ndarray, lon: np.ndarray, days: np.ndarray,
+                  eps_km: float = OUTBREAK_EPS_KM, eps_days: float = OUTBREAK_EPS_DAYS,
+                  min_samples: int = OUTBREAK_MIN_INCIDENTS) -> np.ndarray:
+    """
+    DBSCAN cluster labels (-1 for noise) for points in space and time,
+    with a grid of eps-sized cells limiting comparisons to adjacent cells.
+    """
+    count = len(lat)
+    labels = np.full(count, -1, dtype=np.int64)
+    if count == 0:
+        return labels
+
+    # Scale so a neighbourhood is the unit distance in space and in time
+    cos_lat = math.cos(math.radians(float(np.mean(lat))))
+    x = lon * cos_lat * KM_PER_DEGREE_LAT / eps_km
+    y = lat * KM_PER_DEGREE_LAT / eps_km
+    t = days / eps_days
+    cells = np.stack([np.floor(x), np.floor(y), np.floor(t)], axis=1).astype(np.int64)
+    members: Dict[Tuple[int, int, int], np.ndarray] = {}
+    order = np.lexsort(cells.T[::-1])
+    keys, starts = np.unique(cells[order], axis=0, return_index=True)
+    for key, chunk in zip(map(tuple, keys), np.split(order, starts[1:])):
+        members[key] = chunk
+
+    # Neighbouring pairs (i < j), found cell pair by cell pair
+    left, right = [], []
+    for key, here in members.items():
+        for offset in _HALF_NEIGHBOURHOOD:
+            other = members.get((key[0] + offset[0], key[1] + offset[1], key[2] + offset[2]))
+            if other is None:
+                continue
+            close = ((x[here, None] - x[other]) ** 2 + (y[here, None] - y[other]) ** 2 <= 1.0) \
+                & (np.abs(t[here, None] - t[other]) <= 1.0)
+            i, j = np.nonzero(close)
+            i, j = here[i], other[j]
+            keep = i < j if offset == (0, 0, 0) else i != j
+            left.append(i[keep])
+            right.append(j[keep])
+    left = np.concatenate(left) if left else np.empty(0, dtype=np.int64)
+    right = np.concatenate(right) if right else np.empty(0, dtype=np.int64)
+
+    # Core points have enough neighbours, counting themselves
+    degree = np.bincount(left, minlength=count) + np.bincount(right, minlength=count) + 1
+    core = degree >= min_samples
+    if not core.any():
+        return labels
+
+    # Connected components of core points by repeated min-label propagation
+    both = core[left] & core[right]
+    a, b = left[both], right[both]
+    component = np.arange(count)
+    while True:
+        previous = component.copy()
+        np.minimum.at(component, a, component[b])
+        np.minimum.at(component, b, component[a])
+        # Pointer jumping speeds up long chains
+        component = component[component]
+        if np.array_equal(component, previous):
+            break
+    labels[core] = component[core]
+
+    # Border points join the cluster of a neighbouring core point
+    border = np.full(count, np.iinfo(np.int64).max)
+    to_left = core[right] & ~core[left]
+    np.minimum.at(border, left[to_left], component[right[to_left]])
+    to_right = core[left] & ~core[right]
+    np.minimum.at(border, right[to_right], component[left[to_right]])
+    attached = ~core & (border != np.iinfo(np.int64).max)
+    labels[attached] = border[attached]
+    return labels
+
+
+class _Group:
+    """Recent incidents of one category and crop, and their current clusters."""
+
+    def __init__(self):
+        self.incidents: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        # outbreak_id -> member incident IDs from the last refresh
+        self.clusters: Dict[str, Set[str]] = {}
+        self.detected_at: Dict[str, str] = {}
+        self.summaries: List[Dict[str, Any]] = []
+
+
+class OutbreakEngine:
+    """Incrementally fed, lazily re-clustered outbreak detector."""
+
+    def __init__(self, eps_km: float = OUTBREAK_EPS_KM, eps_days: float = OUTBREAK_EPS_DAYS,
+                 min_incidents: int = OUTBREAK_MIN_INCIDENTS, window_days: float = OUTBREAK_WINDOW_DAYS,
+                 growth_days: float = OUTBREAK_GROWTH_DAYS):
+        self.eps_km = eps_km
+        self.eps_days = eps_days
+        self.min_incidents = min_incidents
+        self.window_days = window_days
+        self.growth_days = growth_days
+        self._lock = threading.Lock()
+        # Serializes re-clustering, which runs outside the lock taken by add_many
+        self._refresh_lock = threading.Lock()
+        self._groups: Dict[Tuple[str, str], _Group] = {}
+        # incident_id -> (group key, last record seen)
+        self._seen: Dict[str, Tuple[Tuple[str, str], Dict[str, Any]]] = {}
+
+    def add_many(self, incidents: Iterable[Dict[str, Any]]) -> int:
+        """
+        Queue new incidents, and changed records of known ones, for
+        clustering; returns how many were new or changed.
+        """
+        added = 0
+        with self._lock:
+            for incident in incidents:
+                incident_id = incident.get("incident_id")
+                geo = incident.get("geo") or {}
+                if (not incident_id or geo.get("lat") is None
+                        or parse_reported_at(incident.get("reported_at")) is None):
+                    continue
+                key = (incident.get("category", ""), incident.get("crop", ""))
+                previous = self._seen.get(incident_id)
+                if previous is not None:
+                    if previous[1] == incident:
+                        continue
+                    old_group = self._groups[previous[0]]
+                    if old_group.incidents.pop(incident_id, None) is not None:
+                        old_group.dirty = True
+                self._seen[incident_id] = (key, incident)
+                group = self._groups.setdefault(key, _Group())
+                group.incidents[incident_id] = incident
+                group.dirty = True
+                added += 1
+        return added
+
+    def refresh(self, now: Optional[datetime] = None) -> int:
+        """
+        Re-cluster the groups with new incidents or with members ageing out
+        of the window. Returns how many groups were re-clustered.
+        """
+        now = now or datetime.utcnow()
+        with self._lock:
+            groups = list(self._groups.items())
+        refreshed = 0
+        with self._refresh_lock:
+            for key, group in groups:
+                refreshed += self._refresh_group(key, group, now)
+        return refreshed
+
+    def _refresh_group(self, key: Tuple[str, str], group: _Group, now: datetime) -> int:
+        with self._lock:
+            stale = any(summary["expires_at"] <= now for summary in group.summaries)
+            if not (group.dirty or stale):
+                return 0
+            group.dirty = False
+            incidents = list(group.incidents.values())
+        summaries = self._cluster(key, group, incidents, now)
+        with self._lock:
+            group.summaries = summaries
+        return 1
+
+    def _cluster(self, key: Tuple[str, str], group: _Group, incidents: List[Dict[str, Any]],
+                 now: datetime) -> List[Dict[str, Any]]:
+        cutoff = now - timedelta(days=self.window_days)
+        recent = []
+        for incident in incidents:
+            reported = parse_reported_at(incident["reported_at"])
+            if reported >= cutoff:
+                recent.append((reported, incident))
+            else:
+                # Aged out for good
+                with self._lock:
+                    group.incidents.pop(incident["incident_id"], None)
+        if not recent:
+            group.clusters = {}
+            return []
+
+        epoch = datetime(1970, 1, 1)
+        lat = np.array([incident["geo"]["lat"] for _, incident in recent], dtype=np.float64)
+        lon = np.array([incident["geo"]["lon"] for _, incident in recent], dtype=np.float64)
+        days = np.array([(reported - epoch).total_seconds() / 86400 for reported, _ in recent])
+        labels = dbscan_labels(lat, lon, days, self.eps_km, self.eps_days, self.min_incidents)
+
+        previous = group.clusters
+        clusters: Dict[str, Set[str]] = {}
+        summaries = []
+        clustered = np.nonzero(labels >= 0)[0]
+        clustered = clustered[np.argsort(labels[clustered], kind="stable")]
+        _, starts = np.unique(labels[clustered], return_index=True)
+        for positions in np.split(clustered, starts[1:]) if len(clustered) else []:
+            member_ids = {recent[i][1]["incident_id"] for i in positions}
+            # Keep the ID of the previous cluster sharing the most members
+            outbreak_id = max(
+                (candidate for candidate in previous if candidate not in clusters and previous[candidate] & member_ids),
+                key=lambda candidate: len(previous[candidate] & member_ids), default=None
+            ) or f"outbreak-{uuid4().hex[:8]}"
+            clusters[outbreak_id] = member_ids
+            if outbreak_id not in group.detected_at:
+                group.detected_at[outbreak_id] = now.isoformat() + "Z"
+            summaries.append(self._summary(outbreak_id, key, [recent[i] for i in positions], group, now))
+        group.clusters = clusters
+        group.detected_at = {outbreak_id: group.detected_at[outbreak_id] for outbreak_id in clusters}
+        return summaries
+
+    def _summary(self, outbreak_id: str, key: Tuple[str, str], members: List[Tuple[datetime, Dict[str, Any]]],
+                 group: _Group, now: datetime) -> Dict[str, Any]:
+        members.sort(key=lambda member: member[0])
+        incidents = [incident for _, incident in members]
+        lat = np.array([incident["geo"]["lat"] for incident in incidents])
+        lon = np.array([incident["geo"]["lon"] for incident in incidents])
+        centroid_lat, centroid_lon = float(lat.mean()), float(lon.mean())
+        recent_start = now - timedelta(days=self.growth_days)
+        prior_start = recent_start - timedelta(days=self.growth_days)
+        recent = sum(1 for reported, _ in members if reported >= recent_start)
+        prior = sum(1 for reported, _ in members if prior_start <= reported < recent_start)
+        tags: Dict[str, int] = {}
+        for incident in incidents:
+            for tag in (incident.get("enriched") or {}).get("tags", []):
+                tags[tag] = tags.get(tag, 0) + 1
+        return {
+            "outbreak_id": outbreak_id,
+            "category": key[0],
+            "crop": key[1],
+            "tags": sorted(tags, key=lambda tag: (-tags[tag], tag)),
+            "size": len(incidents),
+            "incident_ids": [incident["incident_id"] for incident in incidents],
+            "lgas": sorted({incident.get("lga", "") for incident in incidents} - {""}),
+            "centroid": {"lat": round(centroid_lat, 6), "lon": round(centroid_lon, 6)},
+            "extent": {
+                "min_lat": float(lat.min()), "min_lon": float(lon.min()),
+                "max_lat": float(lat.max()), "max_lon": float(lon.max()),
+                "radius_km": round(max(haversine_km(centroid_lat, centroid_lon, a, b) for a, b in zip(lat, lon)), 3),
+            },
+            "mean_severity": round(float(np.mean([
+                (incident.get("enriched") or {}).get("severity_score", 0) for incident in incidents
+            ])), 1),
+            "first_reported_at": incidents[0].get("reported_at"),
+            "last_reported_at": incidents[-1].get("reported_at"),
+            "detected_at": group.detected_at[outbreak_id],
+            # New incidents per day over the last OUTBREAK_GROWTH_DAYS, and relative to the span before
+            "growth_per_day": round(recent / self.growth_days, 3),
+            "growth_ratio": round(recent / prior, 3) if prior else None,
+            # When the oldest member leaves the window and the cluster must be recomputed
+            "expires_at": members[0][0] + timedelta(days=self.window_days),
+        }
+
+    def outbreaks(self, category: Optional[str] = None, crop: Optional[str] = None,
+                  min_size: int = 0) -> List[Dict[str, Any]]:
+        """Current outbreaks as of the last refresh, largest first."""
+        with self._lock:
+            summaries = [
+                summary for (group_category, group_crop), group in self._groups.items()
+                if (category is None or group_category == category) and (crop is None or group_crop == crop)
+                for summary in group.summaries
+                if summary["size"] >= min_size
+            ]
+        summaries.sort(key=lambda summary: (-summary["size"], summary["outbreak_id"]))
+        return [{k: v for k, v in summary.items() if k != "expires_at"} for summary in summaries]
+
+
+# Global outbreak engine
+outbreak_engine = OutbreakEngine()
@@ -1,6 +1,9 @@
 from uagents import Protocol
 from uagents.setup import fund_agent_if_low
-from models import FarmerReport, EnrichmentResult, ChainWriteAck, OperatorQuery, AgentResponse
+from models import (
+    FarmerReport, EnrichmentResult, ChainWriteAck, OperatorQuery, AgentResponse, Incident,
+    Recommendation, CategoryType, CropType, FarmerReportBatch, QueryMode, IncidentPage
+)
 from utils import (
     enrich_incident, generate_recommendation, should_raise_resource_request,
     get_resource_request_type, create_audit_event, load_seed_data,
@@ -9,8 +12,33 @@ from utils import (
 from datetime import datetime
 import json
 import os
-from typing import Dict, Any
-from icp_client import icp_client
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from icp_client import icp_client, ICPCallError
+from outbox import (
+    outbox_worker, OutboxFullError, new_incident_id,
+    CREATE_INCIDENT, ADD_RECOMMENDATION, RAISE_RESOURCE_REQUEST, SET_STATUS
+)
+from executor import io_executor, cpu_executor, report_tasks
+from aggregates import aggregates
+from outbreaks import outbreak_engine
+from geocode import canonical_location
+from intents import intent_router
+
+# Local incident store; each shard of a sharded deployment uses its own
+INCIDENTS_PATH = os.getenv(
+    "AGENT_INCIDENTS_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "data", "incidents.json")
+)
+
+# Guards the local incidents file against concurrent rewrites
+_storage_lock = threading.Lock()
+
+# Marks operator query cursors that page through local storage
+LOCAL_CURSOR_PREFIX = "local:"
+
+# Largest FarmerReportBatch accepted in one message
+MAX_BATCH_REPORTS = int(os.getenv("AGENT_MAX_BATCH_REPORTS", "500"))
 
 # Create protocol for agricultural extension
 agri_protocol = Protocol()
@@ -19,125 +47,45 @@ agri_protocol = Protocol()
 async def handle_farmer_report(ctx, sender: str, msg: FarmerReport):
     """
     Handle incoming farmer reports, enrich them, and store on-chain.
+    
+    Reports are processed as background tasks so many farmers are served
+    concurrently; the handler only waits once MAX_CONCURRENT_REPORTS are
+    already in progress.
+    """
+    await report_tasks.start(process_farmer_report(ctx, sender, msg))
+
+async def process_farmer_report(ctx, sender: str, msg: FarmerReport):
+    """
+    Enrich a farmer report, store it locally, queue it for the canister and
+    reply to the farmer. Blocking stages run on the worker pools.
     """
     try:
         ctx.logger.info(f"Received farmer report from {msg.farmer_id} in {msg.lga}")
         
-        # Step 1: Enrich the incident
-        enrichment = enrich_incident(
-            msg.category, msg.crop, msg.geo.lat, msg.geo.lon, msg.description
+        # Step 1: Enrich the incident and pick the recommendation off the event loop
+        enrichment, recommendation, resource_type = await cpu_executor.run(
+            assess_report, msg.category, msg.crop, msg.geo.lat, msg.geo.lon, msg.description
         )
         
         ctx.logger.info(f"Enriched incident - Weather: {enrichment.weather_hint}, Severity: {enrichment.severity_score}")
-        
-        # Step 2: Create incident object
-        now = datetime.utcnow().isoformat() + "Z"
-        
-        incident_data = {
-            "incident_id": "",  # Will be assigned by canister
-            "farmer_id": msg.farmer_id,
-            "lga": msg.lga,
-            "state": msg.state,
-            "geo": {"lat": msg.geo.lat, "lon": msg.geo.lon},
-            "crop": msg.crop.value,
-            "category": msg.category.value,
-            "description": msg.description,
-            "reported_at": now,
-            "enriched": {
-                "weather_hint": enrichment.weather_hint.value,
-                "severity_score": enrichment.severity_score,
-                "tags": enrichment.tags
-            },
-            "status": "received",
-            "recommendations": [],
-            "resource_request": {
-                "requested": False,
-                "type": "none",
-                "notes": "",
-                "created_at": None
-            },
-            "audit": []
-        }
-        
-        # Step 3: Store on-chain using ICP canister
-        try:
-            # Create Incident object for canister
-            from models import Incident, Geo, Enriched, StatusType, ResourceRequest, Audit
-            
-            incident_obj = Incident(
-                incident_id="",  # Will be assigned by canister
-                farmer_id=msg.farmer_id,
-                lga=msg.lga,
-                state=msg.state,
-                geo=Geo(lat=msg.geo.lat, lon=msg.geo.lon),
-                crop=msg.crop,
-                category=msg.category,
-                description=msg.description,
-                reported_at=now,
-                enriched=enrichment,
-                status=StatusType.RECEIVED,
-                recommendations=[],
-                resource_request=ResourceRequest(),
-                audit=[]
-            )
-            
-            # Store on ICP canister
-            incident_id = icp_client.create_incident(incident_obj)
-            if incident_id:
-                incident_data["incident_id"] = incident_id
-                ctx.logger.info(f"Stored incident on ICP canister: {incident_id}")
-            else:
-                # Fallback to local storage if canister fails
-                incident_id = f"inc-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-                incident_data["incident_id"] = incident_id
-                ctx.logger.warning(f"ICP canister failed, using local storage: {incident_id}")
-        except Exception as e:
-            # Fallback to local storage
-            incident_id = f"inc-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            incident_data["incident_id"] = incident_id
-            ctx.logger.error(f"Error storing on ICP canister: {e}, using local storage: {incident_id}")
-        
-        # Step 4: Generate recommendation
-        recommendation = generate_recommendation(
-            msg.category, msg.crop, enrichment.severity_score
-        )
-        
-        incident_data["recommendations"].append({
-            "step": recommendation.step,
-            "source": recommendation.source,
-            "created_at": recommendation.created_at
-        })
-        
-        # Step 5: Check if resource request needed
-        if should_raise_resource_request(enrichment.severity_score, msg.category):
-            resource_type = get_resource_request_type(msg.category, msg.crop)
-            incident_data["resource_request"] = {
-                "requested": True,
-                "type": resource_type,
-                "notes": f"High severity {msg.category.value} incident requiring {resource_type}",
-                "created_at": now
-            }
+        if resource_type:
             ctx.logger.info(f"Raised resource request: {resource_type}")
         
-        # Step 6: Update status
-        incident_data["status"] = "recommended"
-        
-        # Step 7: Add audit events
-        incident_data["audit"] = [
-            {"event": "created", "at": now},
-            {"event": "enriched", "at": now},
-            {"event": "recommendation_added", "at": now}
-        ]
-        
-        if incident_data["resource_request"]["requested"]:
-            incident_data["audit"].append({"event": "resource_requested", "at": now})
+        # Step 2: Build the incident record
+        incident_data = build_incident(msg, enrichment, recommendation, resource_type)
+        incident_id = incident_data["incident_id"]
         
-        incident_data["audit"].append({"event": "status_updated_to_recommended", "at": now})
+        # Step 3: Save to local storage for demo
+        await io_executor.run(save_incident_locally, incident_data)
         
-        # Step 8: Save to local storage for demo
-        save_incident_locally(incident_data)
+        # Step 4: Queue the canister writes; the outbox worker applies them in order
+        try:
+            await outbox_worker.submit(chain_operations(incident_data, recommendation))
+            ctx.logger.info(f"Queued incident {incident_id} for ICP sync ({len(outbox_worker.outbox)} pending)")
+        except OutboxFullError as e:
+            ctx.logger.error(f"ICP outbox full, incident {incident_id} stored locally only: {e}")
         
-        # Step 9: Send response to farmer
+        # Step 5: Send response to farmer
         response_message = f"Thank you for your report. Your incident has been recorded (ID: {incident_id}). "
         response_message += f"Severity level: {enrichment.severity_score}/100. "
         response_message += f"Recommendation: {recommendation.step}"
@@ -158,107 +106,128 @@ async def handle_farmer_report(ctx, sender: str, msg: FarmerReport):
             message=f"Error processing your report: {str(e)}"
         ))
 
+@agri_protocol.on_message(model=FarmerReportBatch, replies={AgentResponse})
+async def handle_farmer_report_batch(ctx, sender: str, msg: FarmerReportBatch):
+    """
+    Handle a batch of farmer reports relayed by a field aggregator.
+    
+    The batch is enriched in one worker job, saved in one write to local
+    storage and queued for the canister in one outbox append, and answered
+    with a single compact AgentResponse whose `data` lists the incident IDs,
+    severities and resource request types in report order.
+    """
+    await report_tasks.start(process_farmer_report_batch(ctx, sender, msg))
+
+async def process_farmer_report_batch(ctx, sender: str, msg: FarmerReportBatch):
+    """Process every report in a batch together and send one response."""
+    try:
+        reports = msg.reports
+        ctx.logger.info(f"Received batch {msg.batch_id or '(unnamed)'} of {len(reports)} farmer reports from {sender}")
+        
+        if len(reports) > MAX_BATCH_REPORTS:
+            await ctx.send(sender, AgentResponse(
+                success=False,
+                message=f"Batch has {len(reports)} reports; the limit is {MAX_BATCH_REPORTS}. Please split it."
+            ))
+            return
+        
+        # Step 1: Enrich all reports in one worker job
+        assessments = await cpu_executor.run(assess_reports, [
+            (report.category, report.crop, report.geo.lat, report.geo.lon, report.description)
+            for report in reports
+        ])
+        
+        # Step 2: Build the incident records
+        incidents = [
+            build_incident(report, enrichment, recommendation, resource_type)
+            for report, (enrichment, recommendation, resource_type) in zip(reports, assessments)
+        ]
+        
+        # Step 3: Save the whole batch to local storage in one write
+        await io_executor.run(save_incidents_locally, incidents)
+        
+        # Step 4: Queue every report's canister writes in one outbox append
+        operations = []
+        for incident_data, (_, recommendation, _) in zip(incidents, assessments):
+            operations.extend(chain_operations(incident_data, recommendation))
+        try:
+            await outbox_worker.submit(operations)
+            ctx.logger.info(f"Queued {len(incidents)} incidents for ICP sync ({len(outbox_worker.outbox)} pending)")
+        except OutboxFullError as e:
+            ctx.logger.error(f"ICP outbox full, batch of {len(incidents)} incidents stored locally only: {e}")
+        
+        # Step 5: Send one response for the batch
+        resource_requests = sum(1 for _, _, resource_type in assessments if resource_type)
+        response_message = f"Recorded {len(incidents)} reports"
+        if msg.batch_id:
+            response_message += f" from batch {msg.batch_id}"
+        response_message += f". {resource_requests} resource requests raised."
+        
+        await ctx.send(sender, AgentResponse(
+            success=True,
+            message=response_message,
+            data={
+                "batch_id": msg.batch_id,
+                "incident_ids": [incident["incident_id"] for incident in incidents],
+                "severities": [enrichment.severity_score for enrichment, _, _ in assessments],
+                "resource_requests": [resource_type or "none" for _, _, resource_type in assessments],
+            }
+        ))
+        
+    except Exception as e:
+        ctx.logger.error(f"Error processing farmer report batch: {e}")
+        await ctx.send(sender, AgentResponse(
+            success=False,
+            message=f"Error processing your batch of reports: {str(e)}"
+        ))
+
 @agri_protocol.on_message(model=OperatorQuery, replies={AgentResponse})
 async def handle_operator_query(ctx, sender: str, msg: OperatorQuery):
     """
     Handle operator queries for incidents by LGA.
+    
+    The summary comes from the precomputed per-LGA aggregates. In "ids" and
+    "full" mode one page of at most `page_size` incidents (ordered by ID,
+    starting after `cursor`) is attached, with `next_cursor` for the next
+    page, so the response stays small however large the LGA grows.
     """
     try:
-        ctx.logger.info(f"Operator query for LGA: {msg.lga}")
+        ctx.logger.info(f"Operator query for LGA: {msg.lga} (mode: {msg.mode.value}, cursor: {msg.cursor})")
         
-        # Try to load incidents from ICP canister first
-        try:
-            icp_incidents = icp_client.list_incidents_by_lga(msg.lga)
-            if icp_incidents:
-                # Convert to dict format for compatibility
-                incidents = []
-                for incident in icp_incidents:
-                    incidents.append({
-                        "incident_id": incident.incident_id,
-                        "farmer_id": incident.farmer_id,
-                        "lga": incident.lga,
-                        "state": incident.state,
-                        "geo": {"lat": incident.geo.lat, "lon": incident.geo.lon},
-                        "crop": incident.crop.value,
-                        "category": incident.category.value,
-                        "description": incident.description,
-                        "reported_at": incident.reported_at,
-                        "enriched": {
-                            "weather_hint": incident.enriched.weather_hint.value,
-                            "severity_score": incident.enriched.severity_score,
-                            "tags": incident.enriched.tags
-                        },
-                        "status": incident.status.value,
-                        "recommendations": [
-                            {
-                                "step": rec.step,
-                                "source": rec.source,
-                                "created_at": rec.created_at
-                            } for rec in incident.recommendations
-                        ],
-                        "resource_request": {
-                            "requested": incident.resource_request.requested,
-                            "type": incident.resource_request.type_,
-                            "notes": incident.resource_request.notes,
-                            "created_at": incident.resource_request.created_at
-                        },
-                        "audit": [
-                            {
-                                "event": audit.event,
-                                "at": audit.at
-                            } for audit in incident.audit
-                        ]
-                    })
-                ctx.logger.info(f"Loaded {len(incidents)} incidents from ICP canister")
-            else:
-                # Fallback to local storage
-                incidents = load_incidents_from_local()
-                ctx.logger.info("No incidents found in ICP canister, using local storage")
-        except Exception as e:
-            # Fallback to local storage
-            incidents = load_incidents_from_local()
-            ctx.logger.error(f"Error loading from ICP canister: {e}, using local storage")
+        # Step 1: Summary from the materialized aggregates
+        if not aggregates.loaded:
+            aggregates.rebuild(await io_executor.run(load_incidents_from_local))
+        summary = aggregates.summary(msg.lga) or {"lga": msg.lga, "total_incidents": 0}
+        data = {"summary": summary}
         
-        # Filter by LGA (in case we're using local storage)
-        lga_incidents = [inc for inc in incidents if inc["lga"] == msg.lga]
+        # Step 2: One page of incidents, from the ICP canister with local fallback
+        page = []
+        if msg.mode != QueryMode.SUMMARY:
+            page, data["next_cursor"] = await load_incident_page(ctx, msg.lga, msg.cursor, msg.page_size)
+            if msg.mode == QueryMode.IDS:
+                data["incident_ids"] = [incident["incident_id"] for incident in page]
+            else:
+                data["incidents"] = page
         
-        if not lga_incidents:
+        if not summary["total_incidents"] and not page:
             await ctx.send(sender, AgentResponse(
                 success=True,
                 message=f"No incidents found for {msg.lga}",
-                data={"incidents": [], "summary": {}}
+                data=data
             ))
             return
         
-        # Group by category
-        category_counts = group_incidents_by_category(lga_incidents)
-        
-        # Get top 3 high severity incidents
-        high_severity = sorted(
-            [inc for inc in lga_incidents if inc["enriched"]["severity_score"] >= 70],
-            key=lambda x: x["enriched"]["severity_score"],
-            reverse=True
-        )[:3]
-        
-        # Format response
-        summary = {
-            "lga": msg.lga,
-            "total_incidents": len(lga_incidents),
-            "category_breakdown": category_counts,
-            "high_severity_count": len([inc for inc in lga_incidents if inc["enriched"]["severity_score"] >= 70]),
-            "top_high_severity": [format_incident_summary(inc) for inc in high_severity]
-        }
-        
-        response_message = f"Found {len(lga_incidents)} incidents in {msg.lga}. "
+        category_counts = summary.get("category_breakdown", {})
+        response_message = f"Found {summary['total_incidents']} incidents in {msg.lga}. "
         response_message += f"Categories: {', '.join([f'{cat}: {count}' for cat, count in category_counts.items()])}. "
         
-        if high_severity:
-            response_message += f"High severity incidents: {len(high_severity)} requiring immediate attention."
+        if summary.get("top_high_severity"):
+            response_message += f"High severity incidents: {summary['high_severity_count']} requiring immediate attention."
         
         await ctx.send(sender, AgentResponse(
             success=True,
             message=response_message,
-            data={"incidents": lga_incidents, "summary": summary}
+            data=data
         ))
         
     except Exception as e:
@@ -268,35 +237,188 @@ async def handle_operator_query(ctx, sender: str, msg: OperatorQuery):
             message=f"Error processing query: {str(e)}"
         ))
 
+async def load_incident_page(ctx, lga: str, cursor: Optional[str],
+                             page_size: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of an LGA's incidents and the cursor for the next page, both
+    ordered by incident ID. Reads the ICP canister and falls back to local
+    storage when it has nothing; local cursors carry a "local:" prefix so
+    later pages keep coming from the same source.
+    """
+    if not (cursor or "").startswith(LOCAL_CURSOR_PREFIX):
+        try:
+            page = await io_executor.run(icp_client.list_incidents_page, lga, cursor, page_size)
+        except ICPCallError as e:
+            # Mid-listing failures propagate; only a fresh listing may switch source
+            if cursor:
+                raise
+            ctx.logger.warning(f"ICP canister unavailable ({e}), using local storage")
+            page = IncidentPage(incidents=[])
+        if page.incidents or cursor:
+            ctx.logger.info(f"Loaded {len(page.incidents)} incidents from ICP canister")
+            return [incident.model_dump(mode="json", by_alias=True) for incident in page.incidents], page.next_cursor
+        ctx.logger.info("No incidents found in ICP canister, using local storage")
+        cursor = None
+    else:
+        cursor = cursor[len(LOCAL_CURSOR_PREFIX):]
+    
+    # A repeated incident_id counts once, last record wins, as in the aggregates
+    incidents = await io_executor.run(load_incidents_from_local)
+    latest = {inc["incident_id"]: inc for inc in incidents}
+    remaining = sorted(
+        incident_id for incident_id, inc in latest.items()
+        if inc["lga"] == lga and (cursor is None or incident_id > cursor)
+    )
+    page_ids = remaining[:page_size]
+    next_cursor = LOCAL_CURSOR_PREFIX + page_ids[-1] if len(remaining) > page_size else None
+    return [latest[incident_id] for incident_id in page_ids], next_cursor
+
+def assess_report(category: CategoryType, crop: CropType, lat: float, lon: float,
+                  description: str) -> Tuple[EnrichmentResult, Recommendation, Optional[str]]:
+    """
+    Enrichment, recommendation and resource request type (None when no
+    request is needed) for one report; runs on the CPU executor.
+    """
+    enrichment = enrich_incident(category, crop, lat, lon, description)
+    recommendation = generate_recommendation(category, crop, enrichment.severity_score)
+    resource_type = None
+    if should_raise_resource_request(enrichment.severity_score, category):
+        resource_type = get_resource_request_type(category, crop)
+    return enrichment, recommendation, resource_type
+
+def assess_reports(reports: List[tuple]) -> List[Tuple[EnrichmentResult, Recommendation, Optional[str]]]:
+    """`assess_report` over many (category, crop, lat, lon, description) tuples in one job."""
+    return [assess_report(*report) for report in reports]
+
+def build_incident(msg: FarmerReport, enrichment: EnrichmentResult, recommendation: Recommendation,
+                   resource_type: Optional[str]) -> Dict[str, Any]:
+    """
+    Build the local incident record for an assessed report, as it stands
+    once the recommendation has been made.
+    """
+    now = datetime.utcnow().isoformat() + "Z"
+    # Record the LGA whose boundary contains the report, whatever was typed
+    location = canonical_location(msg.lga, msg.state, msg.geo.lat, msg.geo.lon)
+    
+    # Assign the incident ID locally; the canister keeps IDs it is given,
+    # so the write can be queued instead of waiting for consensus
+    incident_data = {
+        "incident_id": new_incident_id(),
+        "farmer_id": msg.farmer_id,
+        "lga": location.lga,
+        "state": location.state,
+        "geo": {"lat": msg.geo.lat, "lon": msg.geo.lon},
+        "crop": msg.crop.value,
+        "category": msg.category.value,
+        "description": msg.description,
+        "reported_at": now,
+        "enriched": {
+            "weather_hint": enrichment.weather_hint.value,
+            "severity_score": enrichment.severity_score,
+            "tags": enrichment.tags
+        },
+        "status": "recommended",
+        "recommendations": [{
+            "step": recommendation.step,
+            "source": recommendation.source,
+            "created_at": recommendation.created_at
+        }],
+        "resource_request": {
+            "requested": False,
+            "type": "none",
+            "notes": "",
+            "created_at": None
+        },
+        "audit": [
+            {"event": "created", "at": now},
+            {"event": "enriched", "at": now},
+            {"event": "recommendation_added", "at": now}
+        ]
+    }
+    
+    if resource_type:
+        incident_data["resource_request"] = {
+            "requested": True,
+            "type": resource_type,
+            "notes": f"High severity {msg.category.value} incident requiring {resource_type}",
+            "created_at": now
+        }
+        incident_data["audit"].append({"event": "resource_requested", "at": now})
+    
+    incident_data["audit"].append({"event": "status_updated_to_recommended", "at": now})
+    return incident_data
+
+def chain_operations(incident_data: Dict[str, Any], recommendation: Recommendation) -> list:
+    """
+    Canister operations that mirror the local processing of an incident,
+    in the order they must be applied.
+    """
+    incident_id = incident_data["incident_id"]
+    created = Incident.model_validate({
+        **incident_data,
+        "status": "received",
+        "recommendations": [],
+        "resource_request": {"requested": False, "type": "none", "notes": "", "created_at": None},
+        "audit": [],
+    })
+    operations = [
+        (CREATE_INCIDENT, incident_id, created.model_dump(mode="json", by_alias=True)),
+        (ADD_RECOMMENDATION, incident_id, recommendation.model_dump(mode="json")),
+    ]
+    resource_request = incident_data["resource_request"]
+    if resource_request["requested"]:
+        operations.append((RAISE_RESOURCE_REQUEST, incident_id, {
+            "request_type": resource_request["type"],
+            "notes": resource_request["notes"],
+        }))
+    operations.append((SET_STATUS, incident_id, {"status": incident_data["status"]}))
+    return operations
+
 def save_incident_locally(incident_data: Dict[str, Any]):
     """
     Save incident to local JSON file for demo purposes.
     In production, this would be handled by the ICP canister.
     """
-    storage_file = os.path.join(os.path.dirname(__file__), "..", "data", "incidents.json")
-    
-    # Load existing incidents
-    incidents = []
-    if os.path.exists(storage_file):
-        try:
-            with open(storage_file, 'r') as f:
-                incidents = json.load(f)
-        except:
-            incidents = []
+    save_incidents_locally([incident_data])
+
+def save_incidents_locally(new_incidents: List[Dict[str, Any]]):
+    """
+    Append several incidents to the local JSON file in a single rewrite,
+    so a batch is stored all together or not at all.
+    """
+    storage_file = INCIDENTS_PATH
     
-    # Add new incident
-    incidents.append(incident_data)
+    # Reports are saved from worker threads; serialise the read-modify-write
+    with _storage_lock:
+        # Load existing incidents
+        incidents = []
+        if os.path.exists(storage_file):
+            try:
+                with open(storage_file, 'r') as f:
+                    incidents = json.load(f)
+            except:
+                incidents = []
+        
+        # Add new incidents
+        incidents.extend(new_incidents)
+        
+        # Save back to file; write then rename so readers never see a partial batch
+        os.makedirs(os.path.dirname(storage_file), exist_ok=True)
+        tmp_file = storage_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(incidents, f, indent=2)
+        os.replace(tmp_file, storage_file)
     
-    # Save back to file
-    os.makedirs(os.path.dirname(storage_file), exist_ok=True)
-    with open(storage_file, 'w') as f:
-        json.dump(incidents, f, indent=2)
+    if aggregates.loaded:
+        aggregates.add_many(new_incidents)
+    outbreak_engine.add_many(new_incidents)
+    intent_router.add_lgas(incident["lga"] for incident in new_incidents)
 
 def load_incidents_from_local() -> list:
     """
     Load incidents from local JSON file for demo purposes.
     """
-    storage_file = os.path.join(os.path.dirname(__file__), "..", "data", "incidents.json")
+    storage_file = INCIDENTS_PATH
     
     if os.path.exists(storage_file):
         try:
@@ -0,0 +1,170 @@
+"""
+Merkle reconciliation between the local incident store and the ICP canister.
+
+Both sides bucket incidents by the first MERKLE_DEPTH hex digits of
+sha256(incident_id) and hash each bucket as the XOR of its incidents'
+digests; internal nodes hash their 16 children. The reconciler compares
+the trees top-down, one canister query per level, descending only into
+nodes whose hashes differ, and finally fetches per-incident digests for
+the differing leaf buckets. A check therefore moves O(diff * log N) data
+instead of a full dump of either side.
+"""
+import hashlib
+import struct
+from typing import Any, Collection, Dict, Iterable, List, Tuple
+
+from models import Incident, ReconcileReport
+from outbox import CREATE_INCIDENT
+
+# Must match MERKLE_DEPTH in icp/src/types.rs
+MERKLE_DEPTH = 3
+HEX_DIGITS = "0123456789abcdef"
+EMPTY_HASH = bytes(32)
+# Prefixes sent per canister query, keeping replies well under message limits
+MAX_PREFIXES_PER_QUERY = 1024
+
+
+def incident_digest(incident: Dict[str, Any]) -> bytes:
+    """
+    Digest of a local incident record; must match incident_digest() in
+    icp/src/types.rs.
+    """
+    canonical = "\x1f".join([
+        incident["incident_id"],
+        incident["farmer_id"],
+        incident["lga"],
+        incident["state"],
+        struct.pack(">d", float(incident["geo"]["lat"])).hex(),
+        struct.pack(">d", float(incident["geo"]["lon"])).hex(),
+        incident["crop"],
+        incident["category"],
+        incident["description"],
+        incident["reported_at"],
+        incident["status"],
+        str(incident["enriched"]["severity_score"]),
+    ])
+    return hashlib.sha256(canonical.encode("utf-8")).digest()
+
+
+def bucket_of(incident_id: str) -> str:
+    return hashlib.sha256(incident_id.encode("utf-8")).hexdigest()[:MERKLE_DEPTH]
+
+
+def _xor(a: bytes, b: bytes) -> bytes:
+    return (int.from_bytes(a, "big") ^ int.from_bytes(b, "big")).to_bytes(32, "big")
+
+
+class DigestTree:
+    """In-memory reconciliation tree over (incident_id, digest) pairs."""
+
+    def __init__(self, digests: Iterable[Tuple[str, bytes]]):
+        self.leaves: Dict[str, bytes] = {}
+        self.members: Dict[str, Dict[str, bytes]] = {}
+        # A repeated incident_id replaces the earlier record, as on the canister
+        for incident_id, digest in dict(digests).items():
+            bucket = bucket_of(incident_id)
+            self.leaves[bucket] = _xor(self.leaves.get(bucket, EMPTY_HASH), digest)
+            self.members.setdefault(bucket, {})[incident_id] = digest
+        self._nodes: Dict[str, bytes] = {}
+
+    @classmethod
+    def from_incidents(cls, incidents: Iterable[Dict[str, Any]]) -> "DigestTree":
+        return cls((incident["incident_id"], incident_digest(incident)) for incident in incidents)
+
+    def node(self, prefix: str) -> bytes:
+        if len(prefix) >= MERKLE_DEPTH:
+            return self.leaves.get(prefix, EMPTY_HASH)
+        cached = self._nodes.get(prefix)
+        if cached is None:
+            hasher = hashlib.sha256()
+            for digit in HEX_DIGITS:
+                hasher.update(self.node(prefix + digit))
+            cached = self._nodes[prefix] = hasher.digest()
+        return cached
+
+    def bucket(self, prefix: str) -> Dict[str, bytes]:
+        return self.members.get(prefix, {})
+
+
+class ReconcileError(Exception):
+    """Raised when the canister cannot be read during reconciliation."""
+
+
+def _chunks(items: List[str], size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def reconcile(local_incidents: List[Dict[str, Any]], client,
+              pending_ids: Collection[str] = ()) -> ReconcileReport:
+    """
+    Compare local incidents with the canister and report the differences.
+
+    Incidents in `pending_ids` (those with outbox operations not yet
+    drained) are expected to differ; they are listed under `pending`
+    instead of as drift, so a repair does not replay their writes.
+    """
+    local = DigestTree.from_incidents(
+        incident for incident in local_incidents if incident.get("incident_id")
+    )
+    report = ReconcileReport()
+
+    frontier = [""]
+    while frontier:
+        remote_hashes: List[bytes] = []
+        for chunk in _chunks(frontier, MAX_PREFIXES_PER_QUERY):
+            hashes = client.merkle_nodes(chunk)
+            report.canister_queries += 1
+            if hashes is None or len(hashes) != len(chunk):
+                raise ReconcileError("Could not read reconciliation tree from canister")
+            remote_hashes.extend(hashes)
+
+        differing = [
+            prefix for prefix, remote_hash in zip(frontier, remote_hashes)
+            if remote_hash != local.node(prefix)
+        ]
+        if not differing or len(differing[0]) >= MERKLE_DEPTH:
+            break
+        frontier = [prefix + digit for prefix in differing for digit in HEX_DIGITS]
+
+    for chunk in _chunks(differing, MAX_PREFIXES_PER_QUERY):
+        remote = client.merkle_buckets(chunk)
+        report.canister_queries += 1
+        if remote is None:
+            raise ReconcileError("Could not read reconciliation buckets from canister")
+        report.buckets_compared += len(chunk)
+        for prefix in chunk:
+            local_bucket = local.bucket(prefix)
+            remote_bucket = {
+                incident_id: digest for incident_id, digest in remote.items()
+                if bucket_of(incident_id) == prefix
+            }
+            for incident_id, digest in local_bucket.items():
+                if remote_bucket.get(incident_id) == digest:
+                    continue
+                if incident_id in pending_ids:
+                    report.pending.append(incident_id)
+                elif incident_id not in remote_bucket:
+                    report.missing_on_chain.append(incident_id)
+                else:
+                    report.mismatched.append(incident_id)
+            report.missing_locally.extend(
+                incident_id for incident_id in remote_bucket if incident_id not in local_bucket
+            )
+
+    return report
+
+
+def repair_operations(report: ReconcileReport,
+                      local_incidents: List[Dict[str, Any]]) -> List[tuple]:
+    """
+    Outbox operations that write the local record of every incident missing
+    on-chain or mismatched to the canister. Creates replace an existing
+    incident with the same ID, so one full upsert fixes any differing field.
+    """
+    by_id = {incident["incident_id"]: incident for incident in local_incidents}
+    operations = []
+    for incident_id in report.missing_on_chain + report.mismatched:
+        incident = Incident.model_validate(by_id[incident_id])
+        operations.append((CREATE_INCIDENT, incident_id, incident.model_dump(mode="json", by_alias=True)))
+    return operations
@@ -0,0 +1,139 @@
+"""
+Time-bucketed incident rollups for trend queries.
+
+Every incident is counted, as it is stored, into an hourly, a daily and a
+weekly (ISO weeks, from Monday) bucket under each combination of its LGA,
+crop and category, with the dimension also rolled up to "any". A trend
+query such as "weekly pest reports in Kano" is then one lookup per bucket
+in the requested range, whatever the number of incidents. A changed
+record is taken out of its old buckets before it is counted again.
+"""
+import threading
+from datetime import datetime, timedelta
+from itertools import product
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+GRANULARITIES = ("hour", "day", "week")
+EPOCH = datetime(1970, 1, 1)
+# Weeks start on Monday; 1970-01-05 was the first Monday after the epoch
+WEEK_EPOCH = datetime(1970, 1, 5)
+
+
+def bucket_index(granularity: str, when: datetime) -> int:
+    """Number of the hour, day or week containing `when` since the epoch."""
+    if granularity == "hour":
+        return int((when - EPOCH).total_seconds() // 3600)
+    if granularity == "day":
+        return (when - EPOCH).days
+    if granularity == "week":
+        return (when - WEEK_EPOCH).days // 7
+    raise ValueError(f"Unknown granularity {granularity!r}; expected one of {', '.join(GRANULARITIES)}")
+
+
+def bucket_start(granularity: str, index: int) -> datetime:
+    """Start of bucket `index`."""
+    if granularity == "hour":
+        return EPOCH + timedelta(hours=index)
+    if granularity == "day":
+        return EPOCH + timedelta(days=index)
+    return WEEK_EPOCH + timedelta(weeks=index)
+
+
+class Rollups:
+    """Thread-safe hourly, daily and weekly counts and severity totals per LGA, crop and category."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # granularity -> (bucket, lga, crop, category) -> [count, severity total, high severity count];
+        # None in a dimension is the rollup over all its values
+        self._buckets: Dict[str, Dict[Tuple[int, Optional[str], Optional[str], Optional[str]], List[int]]] = {
+            granularity: {} for granularity in GRANULARITIES
+        }
+        # incident_id -> (report time, dimensions, severity, high severity, counted record)
+        self._counted: Dict[str, Tuple[datetime, List[Tuple[Optional[str], ...]], int, bool, Dict[str, Any]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._counted)
+
+    def add_many(self, incidents: Iterable[Dict[str, Any]], high_severity: int = 70) -> int:
+        """
+        Count incidents not seen before into their buckets, recounting ones
+        whose record changed; returns how many were added or replaced.
+        """
+        added = 0
+        with self._lock:
+            for incident in incidents:
+                incident_id = incident.get("incident_id")
+                try:
+                    reported = datetime.fromisoformat((incident.get("reported_at") or "")[:19])
+                except ValueError:
+                    continue
+                if not incident_id:
+                    continue
+                previous = self._counted.get(incident_id)
+                if previous is not None:
+                    if previous[4] == incident:
+                        continue
+                    self._count(*previous[:4], sign=-1)
+                severity = int((incident.get("enriched") or {}).get("severity_score", 0))
+                dimensions = list(product(
+                    (incident.get("lga"), None), (incident.get("crop"), None), (incident.get("category"), None)
+                ))
+                high = severity >= high_severity
+                self._count(reported, dimensions, severity, high)
+                self._counted[incident_id] = (reported, dimensions, severity, high, incident)
+                added += 1
+        return added
+
+    def _count(self, reported: datetime, dimensions: List[Tuple[Optional[str], ...]], severity: int,
+               high: bool, sign: int = 1):
+        """Add (or with sign -1, remove) one incident in every granularity and dimension combination."""
+        for granularity, buckets in self._buckets.items():
+            index = bucket_index(granularity, reported)
+            for lga, crop, category in dimensions:
+                key = (index, lga, crop, category)
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = [0, 0, 0]
+                bucket[0] += sign
+                bucket[1] += sign * severity
+                bucket[2] += sign * high
+                if bucket[0] <= 0:
+                    del buckets[key]
+
+    def trend(self, granularity: str, start: datetime, end: datetime, lga: Optional[str] = None,
+              crop: Optional[str] = None, category: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Per-bucket counts from the bucket containing `start` to the one
+        containing `end`, empty buckets included, and their merged totals.
+        """
+        first, last = bucket_index(granularity, start), bucket_index(granularity, end)
+        buckets = self._buckets[granularity]
+        series = []
+        total = severity_total = high_severity = 0
+        with self._lock:
+            for index in range(first, last + 1):
+                count, severity, high = buckets.get((index, lga, crop, category), (0, 0, 0))
+                series.append({
+                    "bucket_start": bucket_start(granularity, index).isoformat() + "Z",
+                    "count": count,
+                    "mean_severity": round(severity / count, 1) if count else None,
+                    "high_severity_count": high,
+                })
+                total += count
+                severity_total += severity
+                high_severity += high
+        return {
+            "granularity": granularity,
+            "lga": lga,
+            "crop": crop,
+            "category": category,
+            "total": total,
+            "mean_severity": round(severity_total / total, 1) if total else None,
+            "high_severity_count": high_severity,
+            "buckets": series,
+        }
+
+
+# Global trend rollups
+rollups = Rollups()
@@ -0,0 +1,127 @@
+"""
+Consistent-hash partitioning of states across Zyra agent shards.
+
+Each shard is an ordinary Zyra agent (main.py) with its own incident store
+and ICP outbox. The router agent (router_agent.py) uses a HashRing to send
+every report and query for a state to the shard that owns it. Each shard
+gets many virtual nodes on the ring, so adding or removing a shard moves
+only about 1/N of the states.
+
+Shards are configured as `name=address` pairs, either comma-separated in
+ZYRA_SHARDS or as a JSON object in the file named by ZYRA_SHARDS_FILE.
+"""
+import bisect
+import csv
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SHARDS = os.getenv("ZYRA_SHARDS", "")
+SHARDS_FILE = os.getenv("ZYRA_SHARDS_FILE", "")
+VIRTUAL_NODES = int(os.getenv("ZYRA_RING_VNODES", "64"))
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "big")
+
+
+def normalize_state(state: str) -> str:
+    """Ring key for a state name: "Kano", " kano " and "KANO" land on the same shard."""
+    return " ".join(state.split()).lower()
+
+
+class HashRing:
+    """Consistent-hash ring mapping keys to shard names."""
+
+    def __init__(self, shards: Iterable[str] = (), vnodes: int = VIRTUAL_NODES):
+        self.vnodes = vnodes
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        self.shards: List[str] = []
+        for shard in shards:
+            self.add(shard)
+
+    def add(self, shard: str):
+        if shard in self.shards:
+            return
+        self.shards.append(shard)
+        for replica in range(self.vnodes):
+            point = _hash(f"{shard}#{replica}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, shard)
+
+    def remove(self, shard: str):
+        if shard not in self.shards:
+            return
+        self.shards.remove(shard)
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != shard]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def lookup(self, key: str) -> str:
+        """The shard owning `key`: the first ring point clockwise from its hash."""
+        if not self._points:
+            raise LookupError("Hash ring has no shards")
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+    def shard_for_state(self, state: str) -> str:
+        return self.lookup(normalize_state(state))
+
+
+def load_shards() -> Dict[str, str]:
+    """Shard name -> agent address from ZYRA_SHARDS_FILE or ZYRA_SHARDS."""
+    if SHARDS_FILE:
+        with open(SHARDS_FILE, "r") as f:
+            return dict(json.load(f))
+    shards = {}
+    for entry in SHARDS.split(","):
+        if "=" in entry:
+            name, address = entry.split("=", 1)
+            shards[name.strip()] = address.strip()
+    return shards
+
+
+class LgaDirectory:
+    """
+    LGA -> state lookup, so operator queries that only name an LGA can be
+    routed. Seeded from the farmer registry and local data, and extended
+    with every farmer report the router forwards.
+    """
+
+    def __init__(self):
+        self._states: Dict[str, str] = {}
+
+    def learn(self, lga: str, state: str):
+        if lga and state:
+            self._states[lga.lower()] = state
+
+    def state_of(self, lga: str) -> Optional[str]:
+        return self._states.get(lga.lower())
+
+    def load(self):
+        try:
+            with open(os.path.join(DATA_DIR, "farmers.csv"), "r") as f:
+                for row in csv.DictReader(f):
+                    self.learn(row.get("lga", ""), row.get("state", ""))
+        except OSError:
+            pass
+        for filename in ("seed_incidents.json", "incidents.json"):
+            try:
+                with open(os.path.join(DATA_DIR, filename), "r") as f:
+                    for incident in json.load(f):
+                        self.learn(incident.get("lga", ""), incident.get("state", ""))
+            except (OSError, ValueError, TypeError, AttributeError):
+                pass
+        return self
+
+
+def partition(items: Iterable, key, ring: HashRing) -> Dict[str, List[Tuple[int, object]]]:
+    """Group items by owning shard as (original position, item) pairs."""
+    groups: Dict[str, List[Tuple[int, object]]] = {}
+    for position, item in enumerate(items):
+        groups.setdefault(ring.shard_for_state(key(item)), []).append((position, item))
+    return groups
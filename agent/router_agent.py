@@ -0,0 +1,152 @@
+import asyncio
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from uagents import Agent, Context, Protocol
+
+from models import FarmerReport, FarmerReportBatch, OperatorQuery, AgentResponse
+from router import HashRing, LgaDirectory, load_shards, partition
+from executor import TaskLimiter
+from geocode import canonical_lga_name, canonical_location
+
+# Load environment variables
+load_dotenv()
+
+# Seconds to wait for a shard's reply before answering with an error
+FORWARD_TIMEOUT = float(os.getenv("ROUTER_FORWARD_TIMEOUT", "30"))
+# Messages being forwarded at once
+ROUTER_MAX_IN_FLIGHT = int(os.getenv("ROUTER_MAX_IN_FLIGHT", "256"))
+ROUTER_PORT = int(os.getenv("ROUTER_PORT", "8010"))
+
+shards = load_shards()
+ring = HashRing(shards)
+lga_directory = LgaDirectory().load()
+forward_tasks = TaskLimiter(ROUTER_MAX_IN_FLIGHT)
+
+# Create the routing agent
+router = Agent(
+    name=os.getenv("ROUTER_NAME", "zyra_router_agent"),
+    seed=os.getenv("ROUTER_SEED", "zyra_router_seed_123"),
+    port=ROUTER_PORT,
+    endpoint=[os.getenv("ROUTER_ENDPOINT", f"http://127.0.0.1:{ROUTER_PORT}/submit")],
+)
+
+routing_protocol = Protocol()
+
+async def forward(ctx: Context, shard: str, msg) -> AgentResponse:
+    """Send `msg` to a shard and wait for its AgentResponse."""
+    try:
+        response, status = await ctx.send_and_receive(
+            shards[shard], msg, response_type=AgentResponse, timeout=FORWARD_TIMEOUT
+        )
+    except Exception as e:
+        ctx.logger.error(f"Forwarding to shard {shard} failed: {e}")
+        response = None
+    if response is None:
+        return AgentResponse(success=False, message=f"Shard {shard} did not respond; please retry.")
+    return response
+
+@routing_protocol.on_message(model=FarmerReport, replies={AgentResponse})
+async def route_farmer_report(ctx: Context, sender: str, msg: FarmerReport):
+    """Forward a farmer report to the shard owning its state."""
+    # Route by the state the shard will record, not the reported spelling
+    location = canonical_location(msg.lga, msg.state, msg.geo.lat, msg.geo.lon)
+    lga_directory.learn(location.lga, location.state)
+    shard = ring.shard_for_state(location.state)
+    ctx.logger.info(f"Routing report from {msg.farmer_id} ({location.state}) to shard {shard}")
+
+    async def relay():
+        await ctx.send(sender, await forward(ctx, shard, msg))
+    await forward_tasks.start(relay())
+
+@routing_protocol.on_message(model=FarmerReportBatch, replies={AgentResponse})
+async def route_farmer_report_batch(ctx: Context, sender: str, msg: FarmerReportBatch):
+    """
+    Split a batch by owning shard, forward the parts concurrently and reply
+    with one response whose per-report lists are in the original order.
+    """
+    located = [
+        (report, canonical_location(report.lga, report.state, report.geo.lat, report.geo.lon))
+        for report in msg.reports
+    ]
+    for _, location in located:
+        lga_directory.learn(location.lga, location.state)
+    groups = partition(located, lambda pair: pair[1].state, ring)
+    ctx.logger.info(f"Routing batch of {len(msg.reports)} reports to {len(groups)} shards")
+
+    async def relay():
+        responses = await asyncio.gather(*(
+            forward(ctx, shard, FarmerReportBatch(
+                reports=[report for _, (report, _) in group], batch_id=msg.batch_id
+            ))
+            for shard, group in groups.items()
+        ))
+        await ctx.send(sender, merge_batch_responses(msg, list(groups.values()), responses))
+    await forward_tasks.start(relay())
+
+def merge_batch_responses(msg: FarmerReportBatch, groups: List[List[Tuple[int, Any]]],
+                          responses: List[AgentResponse]) -> AgentResponse:
+    """Reassemble per-shard batch responses in the order of the original batch."""
+    count = len(msg.reports)
+    merged: Dict[str, List[Any]] = {
+        "incident_ids": [None] * count, "severities": [None] * count, "resource_requests": [None] * count
+    }
+    failures = []
+    for group, response in zip(groups, responses):
+        if not response.success or not response.data:
+            failures.append(response.message)
+            continue
+        for key, values in merged.items():
+            for (position, _), value in zip(group, response.data.get(key, [])):
+                values[position] = value
+
+    recorded = sum(1 for incident_id in merged["incident_ids"] if incident_id)
+    message = f"Recorded {recorded} of {count} reports"
+    if msg.batch_id:
+        message += f" from batch {msg.batch_id}"
+    message += "."
+    if failures:
+        message += f" {len(failures)} shard(s) failed: {'; '.join(failures)}"
+    return AgentResponse(
+        success=not failures,
+        message=message,
+        data={"batch_id": msg.batch_id, **merged}
+    )
+
+@routing_protocol.on_message(model=OperatorQuery, replies={AgentResponse})
+async def route_operator_query(ctx: Context, sender: str, msg: OperatorQuery):
+    """
+    Forward an operator query to the shard owning the LGA's state. When the
+    state is neither given nor known, ask every shard and relay the answer
+    from the one holding incidents for the LGA.
+    """
+    state = msg.state or lga_directory.state_of(canonical_lga_name(msg.lga))
+
+    async def relay():
+        if state:
+            response = await forward(ctx, ring.shard_for_state(state), msg)
+        else:
+            ctx.logger.info(f"State of {msg.lga} unknown; querying all {len(shards)} shards")
+            responses = await asyncio.gather(*(forward(ctx, shard, msg) for shard in ring.shards))
+            response = max(responses, key=query_total, default=AgentResponse(
+                success=False, message="No shards configured"
+            ))
+        await ctx.send(sender, response)
+    await forward_tasks.start(relay())
+
+def query_total(response: AgentResponse) -> Tuple[bool, int]:
+    summary = (response.data or {}).get("summary") or {}
+    return response.success, summary.get("total_incidents", 0)
+
+router.include(routing_protocol)
+
+@router.on_event("startup")
+async def startup(ctx: Context):
+    ctx.logger.info(f"🧭 Zyra router starting with {len(shards)} shards: {', '.join(shards) or 'none'}")
+    ctx.logger.info(f"Router address: {router.address}")
+    if not shards:
+        ctx.logger.warning("No shards configured; set ZYRA_SHARDS or ZYRA_SHARDS_FILE")
+
+if __name__ == "__main__":
+    router.run()
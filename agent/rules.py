@@ -0,0 +1,248 @@
+"""
+Data-driven enrichment rules.
+
+The weather hints, severity scoring, tags, recommendations and resource
+request types used by utils.py come from a versioned JSON table
+(data/enrichment_rules.json, or AGENT_RULES_PATH). The table is compiled
+once into lookup dicts keyed by category and crop plus one keyword
+automaton over every description keyword and its local-language
+translations, so enriching an incident is one scan of the description
+and a few dict lookups.
+
+The file is checked for changes at most every AGENT_RULES_RELOAD_SECONDS
+and recompiled when it changes, so agronomists can adjust rules without a
+deploy. A table that fails to load is reported and the previous rules
+stay in effect.
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from models import CategoryType, CropType, WeatherHint
+from keywords import KeywordAutomaton, normalize_text
+
+RULES_PATH = os.getenv(
+    "AGENT_RULES_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "data", "enrichment_rules.json")
+)
+RULES_RELOAD_SECONDS = float(os.getenv("AGENT_RULES_RELOAD_SECONDS", "5"))
+# Rules table layout this module understands
+RULES_SCHEMA = 1
+
+# Integer codes used by batch enrichment: the position in these tuples
+CATEGORIES = tuple(CategoryType)
+CROPS = tuple(CropType)
+WEATHER_HINTS = tuple(WeatherHint)
+
+
+class RulesError(ValueError):
+    """Raised when a rules table is malformed."""
+
+
+class CompiledRules:
+    """
+    A rules table compiled into lookup structures.
+
+    Lookups are keyed by category, crop and hint values; the str-valued
+    enums from models.py hash and compare equal to their values, so enum
+    members and plain strings can be passed interchangeably.
+    """
+
+    def __init__(self, table: Dict[str, Any], mtime: float = 0.0):
+        if table.get("schema") != RULES_SCHEMA:
+            raise RulesError(f"Unsupported rules schema {table.get('schema')!r}; expected {RULES_SCHEMA}")
+        self.version = str(table.get("version", ""))
+        self.mtime = mtime
+        try:
+            self._compile(table)
+        except (KeyError, TypeError, ValueError) as e:
+            raise RulesError(f"Invalid rules table: {e!r}") from e
+
+    def _compile(self, table: Dict[str, Any]):
+        categories = [category.value for category in CategoryType]
+        crops = [crop.value for crop in CropType]
+        keywords: List[str] = []
+
+        def keyword_set(values: List[str]) -> FrozenSet[str]:
+            keywords.extend(values)
+            return frozenset(normalize_text(value) for value in values)
+
+        # Weather hints: first matching rule wins
+        self.weather_rules: List[Tuple[WeatherHint, FrozenSet[str], Optional[float], Optional[float]]] = [
+            (WeatherHint(rule["hint"]), keyword_set(rule["keywords"]), rule.get("lat_min"), rule.get("lat_max"))
+            for rule in table["weather_hints"]
+        ]
+        self.default_weather_hint = WeatherHint(table.get("default_weather_hint", WeatherHint.UNKNOWN.value))
+
+        # Severity
+        severity = table["severity"]
+        priority_crops = set(severity.get("priority_crops", []))
+        priority_bonus = int(severity.get("priority_crop_bonus", 0))
+        self.severity_base: Dict[Tuple[str, str], int] = {
+            (category, crop): int(severity["category_base"].get(category, severity["default_base"]))
+            + (priority_bonus if crop in priority_crops else 0)
+            for category in categories for crop in crops
+        }
+        self.weather_bonus: Dict[Tuple[str, str], int] = {
+            (WeatherHint(rule["hint"]).value, rule["category"]): int(rule["points"])
+            for rule in severity.get("weather_bonus", [])
+        }
+        self.description_bonus: List[Tuple[FrozenSet[str], int]] = [
+            (keyword_set(rule["keywords"]), int(rule["points"])) for rule in severity.get("description_bonus", [])
+        ]
+        self.max_score = int(severity.get("max_score", 100))
+
+        # Tags
+        tags = table["tags"]
+        self.tags: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+        for category in categories:
+            rule = tags["category"].get(category)
+            for crop in crops:
+                category_tags = []
+                if rule:
+                    category_tags.append(rule.get("crops", {}).get(crop, rule["default"]))
+                category_tags.append(tags["crop_template"].format(crop=crop))
+                self.tags[(category, crop)] = tuple(category_tags)
+
+        # Recommendations: (standard step, urgent step) per category and crop
+        recommendations = table["recommendations"]
+        self.recommendation_source = recommendations["source"]
+        self.urgent_threshold = int(recommendations["urgent_threshold"])
+        self.recommendations: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        for category in categories:
+            for crop in crops:
+                steps = recommendations["steps"].get(category, {}).get(crop)
+                if steps:
+                    self.recommendations[(category, crop)] = (
+                        steps[0], recommendations["urgent_template"].format(step=steps[0])
+                    )
+                else:
+                    text = recommendations["default_template"].format(category=category, crop=crop)
+                    self.recommendations[(category, crop)] = (text, text)
+
+        # Resource requests
+        resource_requests = table["resource_requests"]
+        self.resource_threshold = int(resource_requests["severity_threshold"])
+        self.resource_types: Dict[str, str] = {
+            category: resource_requests["category_type"].get(category, resource_requests["default_type"])
+            for category in categories
+        }
+
+        # Hausa, Yoruba, Igbo and Pidgin terms for the English keywords
+        translations: Dict[str, List[str]] = {}
+        for terms in table.get("keyword_translations", {}).values():
+            for keyword, keyword_terms in terms.items():
+                translations.setdefault(keyword, []).extend(keyword_terms)
+        self.matcher = KeywordAutomaton(keywords, translations)
+        self.arrays = RuleArrays(self)
+
+    def weather_hint(self, lat: float, found: FrozenSet[str]) -> WeatherHint:
+        for hint, keywords, lat_min, lat_max in self.weather_rules:
+            if keywords.isdisjoint(found):
+                continue
+            if lat_min is not None and lat < lat_min:
+                continue
+            if lat_max is not None and lat > lat_max:
+                continue
+            return hint
+        return self.default_weather_hint
+
+    def severity(self, category: str, crop: str, weather_hint: str, found: FrozenSet[str]) -> int:
+        score = self.severity_base[(category, crop)]
+        score += self.weather_bonus.get((weather_hint, category), 0)
+        for keywords, points in self.description_bonus:
+            if not keywords.isdisjoint(found):
+                score += points
+        return min(score, self.max_score)
+
+    def recommendation_step(self, category: str, crop: str, severity_score: int) -> str:
+        standard, urgent = self.recommendations[(category, crop)]
+        return urgent if severity_score >= self.urgent_threshold else standard
+
+
+class RuleArrays:
+    """
+    The same rules as NumPy tables indexed by category, crop and weather
+    hint codes, with keyword rules as column indices into a keyword flag
+    matrix whose columns follow `CompiledRules.matcher.keywords`.
+    """
+
+    def __init__(self, compiled: CompiledRules):
+        column = {keyword: index for index, keyword in enumerate(compiled.matcher.keywords)}
+        hint_code = {hint: code for code, hint in enumerate(WEATHER_HINTS)}
+
+        def columns(keywords: FrozenSet[str]) -> np.ndarray:
+            return np.array(sorted(column[keyword] for keyword in keywords), dtype=np.intp)
+
+        self.weather_rules = [
+            (hint_code[hint], columns(keywords), lat_min, lat_max)
+            for hint, keywords, lat_min, lat_max in compiled.weather_rules
+        ]
+        self.default_weather_hint = hint_code[compiled.default_weather_hint]
+        self.severity_base = np.array(
+            [[compiled.severity_base[(category, crop)] for crop in CROPS] for category in CATEGORIES], dtype=np.int16
+        )
+        self.weather_bonus = np.array(
+            [[compiled.weather_bonus.get((hint, category), 0) for category in CATEGORIES] for hint in WEATHER_HINTS],
+            dtype=np.int16
+        )
+        self.description_bonus = [(columns(keywords), points) for keywords, points in compiled.description_bonus]
+        self.max_score = compiled.max_score
+        self.tags = np.empty((len(CATEGORIES), len(CROPS)), dtype=object)
+        for i, category in enumerate(CATEGORIES):
+            for j, crop in enumerate(CROPS):
+                self.tags[i, j] = compiled.tags[(category, crop)]
+        self.resource_types = np.array([compiled.resource_types[category] for category in CATEGORIES])
+        self.resource_threshold = compiled.resource_threshold
+
+
+class RuleBook:
+    """The current compiled rules, recompiled when the table file changes."""
+
+    def __init__(self, path: str = RULES_PATH, reload_seconds: float = RULES_RELOAD_SECONDS):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._checked_at = time.monotonic()
+        self._failed_mtime: Optional[float] = None
+        self._rules = self._load()
+
+    def _load(self) -> CompiledRules:
+        mtime = os.path.getmtime(self.path)
+        with open(self.path, "r") as f:
+            return CompiledRules(json.load(f), mtime)
+
+    def current(self) -> CompiledRules:
+        """The compiled rules, reloading first if the file changed since the last check."""
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_seconds:
+            with self._lock:
+                if now - self._checked_at >= self.reload_seconds:
+                    self._checked_at = now
+                    self._reload_if_changed()
+        return self._rules
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime in (self._rules.mtime, self._failed_mtime):
+            return
+        try:
+            rules = self._load()
+        except (OSError, ValueError) as e:
+            # Reported once per broken version of the file
+            self._failed_mtime = mtime
+            print(f"Warning: keeping enrichment rules {self._rules.version}; could not reload {self.path}: {e}")
+            return
+        self._rules = rules
+        print(f"Loaded enrichment rules {rules.version} from {self.path}")
+
+
+# Global enrichment rules
+rules = RuleBook()
@@ -0,0 +1,136 @@
+"""
+Per-sender conversation sessions for the chat protocol.
+
+Each sender keeps its last few turns verbatim plus a short extractive
+summary of everything older, so follow-up questions reach the LLM with
+context but without the full history. Sessions live in an LRU that also
+expires them after a period of inactivity, which bounds memory no matter
+how many senders connect.
+"""
+import os
+import re
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from cache import TTLCache, MISSING
+
+SESSION_MAX_SENDERS = int(os.getenv("AGENT_SESSION_MAX", "5000"))
+SESSION_IDLE_SECONDS = float(os.getenv("AGENT_SESSION_IDLE_SECONDS", "1800"))
+# Turns (user message + reply) kept verbatim; older ones are summarised
+SESSION_MAX_TURNS = int(os.getenv("AGENT_SESSION_MAX_TURNS", "6"))
+SESSION_SUMMARY_CHARS = int(os.getenv("AGENT_SESSION_SUMMARY_CHARS", "1200"))
+SESSION_MESSAGE_CHARS = int(os.getenv("AGENT_SESSION_MESSAGE_CHARS", "2000"))
+
+INCIDENT_IDS = re.compile(r"\binc-[A-Za-z0-9][A-Za-z0-9-]*")
+# Facts remembered per session, newest last
+MAX_REMEMBERED = 10
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def _first_sentence(text: str, limit: int) -> str:
+    sentence = re.split(r"(?<=[.!?])\s", " ".join(text.split()), maxsplit=1)[0]
+    return _clip(sentence, limit)
+
+
+class Session:
+    """One sender's recent turns, summary of older turns and remembered entities."""
+
+    def __init__(self, max_turns: int = SESSION_MAX_TURNS, summary_chars: int = SESSION_SUMMARY_CHARS):
+        self.max_turns = max_turns
+        self.summary_chars = summary_chars
+        self.turns: Deque[Tuple[str, str]] = deque()
+        self.summary = ""
+        self.incident_ids: List[str] = []
+        self.lgas: List[str] = []
+        self.lock = threading.Lock()
+
+    def _remember(self, values: List[str], value: str):
+        if value in values:
+            values.remove(value)
+        values.append(value)
+        del values[:-MAX_REMEMBERED]
+
+    def record(self, user_text: str, reply: str, lga: Optional[str] = None):
+        """Add a completed turn, folding the oldest turns into the summary."""
+        with self.lock:
+            for incident_id in INCIDENT_IDS.findall(user_text + " " + reply):
+                self._remember(self.incident_ids, incident_id)
+            if lga:
+                self._remember(self.lgas, lga)
+            self.turns.append((_clip(user_text, SESSION_MESSAGE_CHARS), _clip(reply, SESSION_MESSAGE_CHARS)))
+            while len(self.turns) > self.max_turns:
+                self._summarise(*self.turns.popleft())
+
+    def _summarise(self, user_text: str, reply: str):
+        line = f"User asked: {_clip(user_text, 160)} Agent: {_first_sentence(reply, 200)}"
+        summary = f"{self.summary}\n{line}" if self.summary else line
+        # Keep the newest lines that fit
+        while len(summary) > self.summary_chars and "\n" in summary:
+            summary = summary.split("\n", 1)[1]
+        self.summary = _clip(summary, self.summary_chars) if len(summary) > self.summary_chars else summary
+
+    def context_messages(self) -> List[Dict[str, Any]]:
+        """Chat messages that give the LLM this session's context."""
+        with self.lock:
+            messages = []
+            facts = []
+            if self.summary:
+                facts.append(f"Earlier in this conversation:\n{self.summary}")
+            if self.incident_ids:
+                facts.append(f"Incidents discussed (most recent last): {', '.join(self.incident_ids)}")
+            if self.lgas:
+                facts.append(f"LGAs discussed (most recent last): {', '.join(self.lgas)}")
+            if facts:
+                messages.append({"role": "system", "content": "\n".join(facts)})
+            for user_text, reply in self.turns:
+                messages.append({"role": "user", "content": user_text})
+                messages.append({"role": "assistant", "content": reply})
+            return messages
+
+
+class SessionStore:
+    """LRU of sessions keyed by sender, each expiring after `idle_seconds` without use."""
+
+    def __init__(self, max_senders: int = SESSION_MAX_SENDERS, idle_seconds: float = SESSION_IDLE_SECONDS,
+                 max_turns: int = SESSION_MAX_TURNS):
+        self.max_turns = max_turns
+        self._sessions = TTLCache(max_senders, idle_seconds)
+        self._lock = threading.Lock()
+
+    def get(self, sender: str) -> Session:
+        """The sender's session, started afresh if it expired or never existed."""
+        with self._lock:
+            session = self._sessions.get(sender)
+            if session is MISSING:
+                session = Session(self.max_turns)
+            # Re-storing restarts the idle clock
+            self._sessions.put(sender, session)
+            return session
+
+    def reset(self, sender: str) -> Session:
+        """Start a new conversation for the sender."""
+        with self._lock:
+            session = Session(self.max_turns)
+            self._sessions.put(sender, session)
+            return session
+
+    def end(self, sender: str):
+        self._sessions.invalidate(sender)
+
+    def purge_expired(self) -> int:
+        return self._sessions.purge_expired()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._sessions.stats()
+
+
+# Global session store
+session_store = SessionStore()
@@ -1,30 +1,28 @@
 import json
 import os
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence
+import numpy as np
 from models import (
     EnrichmentResult, WeatherHint, CategoryType, CropType,
     Recommendation, ResourceRequest, Audit, Incident
 )
+from rules import rules, CATEGORIES, CROPS
+from keywords import normalize_text
+from weather_grid import weather_grid
 
-def get_weather_hint(lat: float, lon: float, description: str) -> WeatherHint:
-    """
-    Stub weather function for demo purposes.
-    In production, this would call a real weather API.
-    """
-    description_lower = description.lower()
-    
-    # Simple rules based on location and description
-    if 6 <= lat <= 14 and "rain" in description_lower:
-        return WeatherHint.RAINY
-    elif "humid" in description_lower or "mold" in description_lower:
-        return WeatherHint.HUMID
-    elif "dry" in description_lower or "drought" in description_lower:
-        return WeatherHint.DRY
-    elif "sunny" in description_lower or "hot" in description_lower:
-        return WeatherHint.SUNNY
-    else:
-        return WeatherHint.UNKNOWN
+def get_weather_hint(lat: float, lon: float, description: str,
+                     when: Optional[datetime] = None) -> WeatherHint:
+    """
+    Weather at (lat, lon) on `when` (default today) from the local weather
+    grid, falling back to hints in the description where the grid has no data.
+    """
+    if weather_grid is not None:
+        hint = weather_grid.lookup(lat, lon, when)
+        if hint is not None:
+            return hint
+    compiled = rules.current()
+    return compiled.weather_hint(lat, compiled.matcher.find(description))
 
 def calculate_severity_score(category: CategoryType, crop: CropType, 
                            weather_hint: WeatherHint, description: str) -> int:
@@ -32,201 +30,130 @@ def calculate_severity_score(category: CategoryType, crop: CropType,
     Calculate severity score based on category, crop, weather, and description.
     Returns a score from 0-100.
     """
-    base_score = 0
-    
-    # Base scores by category
-    if category == CategoryType.PEST:
-        base_score = 50
-    elif category == CategoryType.DISEASE:
-        base_score = 50
-    elif category == CategoryType.FLOOD:
-        base_score = 70
-    elif category == CategoryType.DROUGHT:
-        base_score = 60
-    elif category == CategoryType.INPUT_NEED:
-        base_score = 40
-    else:
-        base_score = 30
-    
-    # Priority crops get +10
-    priority_crops = [CropType.MAIZE, CropType.RICE, CropType.CASSAVA]
-    if crop in priority_crops:
-        base_score += 10
-    
-    # Weather risk factors
-    if weather_hint == WeatherHint.HUMID and category == CategoryType.DISEASE:
-        base_score += 10
-    elif weather_hint == WeatherHint.RAINY and category == CategoryType.FLOOD:
-        base_score += 10
-    elif weather_hint == WeatherHint.DRY and category == CategoryType.DROUGHT:
-        base_score += 10
-    
-    # Description-based adjustments
-    description_lower = description.lower()
-    if "fast spread" in description_lower or "rapid" in description_lower:
-        base_score += 15
-    if "severe" in description_lower or "critical" in description_lower:
-        base_score += 20
-    if "young" in description_lower or "seedling" in description_lower:
-        base_score += 5
-    
-    # Cap at 100
-    return min(base_score, 100)
+    compiled = rules.current()
+    return compiled.severity(category, crop, weather_hint, compiled.matcher.find(description))
 
 def generate_tags(category: CategoryType, crop: CropType) -> List[str]:
     """
     Generate relevant tags based on category and crop.
     """
-    tags = []
-    
-    if category == CategoryType.PEST:
-        if crop == CropType.MAIZE:
-            tags.append("fall_armyworm")
-        else:
-            tags.append("pest_alert")
-    
-    elif category == CategoryType.DISEASE:
-        if crop == CropType.CASSAVA:
-            tags.append("cassava_mosaic")
-        else:
-            tags.append("disease_alert")
-    
-    elif category == CategoryType.FLOOD:
-        tags.append("flood_risk")
-    
-    elif category == CategoryType.DROUGHT:
-        tags.append("drought_alert")
-    
-    elif category == CategoryType.INPUT_NEED:
-        tags.append("input_request")
-    
-    # Add crop-specific tags
-    tags.append(f"{crop.value}_crop")
-    
-    return tags
+    return list(rules.current().tags[(category, crop)])
 
 def enrich_incident(category: CategoryType, crop: CropType, 
-                   lat: float, lon: float, description: str) -> EnrichmentResult:
+                   lat: float, lon: float, description: str,
+                   when: Optional[datetime] = None) -> EnrichmentResult:
     """
     Enrich incident with weather, severity, and tags.
+    `when` is the report date used for gridded weather (default today).
     """
-    weather_hint = get_weather_hint(lat, lon, description)
-    severity_score = calculate_severity_score(category, crop, weather_hint, description)
-    tags = generate_tags(category, crop)
+    compiled = rules.current()
+    # One keyword scan serves both the weather and the severity rules
+    found = compiled.matcher.find(description)
+    weather_hint = weather_grid.lookup(lat, lon, when) if weather_grid is not None else None
+    if weather_hint is None:
+        weather_hint = compiled.weather_hint(lat, found)
     
     return EnrichmentResult(
         weather_hint=weather_hint,
-        severity_score=severity_score,
-        tags=tags
+        severity_score=compiled.severity(category, crop, weather_hint, found),
+        tags=list(compiled.tags[(category, crop)])
     )
 
+def keyword_flags(descriptions: Sequence[str]) -> np.ndarray:
+    """
+    Boolean matrix with one row per description and one column per keyword
+    of the current rules (`rules.current().matcher.keywords`), set where the
+    description mentions the keyword in any of its languages.
+    """
+    matcher = rules.current().matcher
+    normalized = np.array([normalize_text(description) for description in descriptions], dtype=str)
+    flags = np.zeros((len(normalized), len(matcher.keywords)), dtype=bool)
+    for column, keyword in enumerate(matcher.keywords):
+        for term in matcher.terms[keyword]:
+            flags[:, column] |= np.char.find(normalized, term) >= 0
+    return flags
+
+def incident_columns(incidents: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Columnar arrays for `enrich_incidents_batch` from stored incident records:
+    category and crop codes (positions in rules.CATEGORIES and rules.CROPS),
+    lat, lon, keyword flags and the report dates.
+    """
+    category_code = {category.value: code for code, category in enumerate(CATEGORIES)}
+    crop_code = {crop.value: code for code, crop in enumerate(CROPS)}
+    return {
+        "category_codes": np.array([category_code[incident["category"]] for incident in incidents], dtype=np.int8),
+        "crop_codes": np.array([crop_code[incident["crop"]] for incident in incidents], dtype=np.int8),
+        "lat": np.array([incident["geo"]["lat"] for incident in incidents], dtype=np.float64),
+        "lon": np.array([incident["geo"]["lon"] for incident in incidents], dtype=np.float64),
+        "keyword_flags": keyword_flags([incident["description"] for incident in incidents]),
+        "reported_on": np.array(
+            [(incident.get("reported_at") or "NaT")[:10] for incident in incidents], dtype="datetime64[D]"
+        ),
+    }
+
+def enrich_incidents_batch(category_codes: np.ndarray, crop_codes: np.ndarray,
+                           lat: np.ndarray, lon: np.ndarray, keyword_flags: np.ndarray,
+                           reported_on: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Enrich many incidents at once with the same rules as `enrich_incident`.
+    
+    Takes columnar arrays: category and crop codes (positions in
+    rules.CATEGORIES and rules.CROPS), lat, lon, the keyword flag matrix
+    from `keyword_flags` and, for gridded weather, datetime64[D] report
+    dates (default today). Returns arrays of weather hint codes (positions in
+    rules.WEATHER_HINTS), severity scores, tags (a tuple per incident),
+    whether a resource request is due, and the resource request type.
+    """
+    arrays = rules.current().arrays
+    category_codes = np.asarray(category_codes, dtype=np.intp)
+    crop_codes = np.asarray(crop_codes, dtype=np.intp)
+    lat = np.asarray(lat, dtype=np.float64)
+    keyword_flags = np.asarray(keyword_flags, dtype=bool)
+    if keyword_flags.shape != (len(category_codes), len(rules.current().matcher.keywords)):
+        raise ValueError(f"keyword_flags has shape {keyword_flags.shape}; build it with keyword_flags()")
+    
+    # Weather hints: apply rules last to first so the first matching rule wins
+    weather_hint = np.full(len(category_codes), arrays.default_weather_hint, dtype=np.int8)
+    for hint, columns, lat_min, lat_max in reversed(arrays.weather_rules):
+        matched = keyword_flags[:, columns].any(axis=1)
+        # Negated comparisons so a NaN latitude passes, as in the scalar path
+        if lat_min is not None:
+            matched &= ~(lat < lat_min)
+        if lat_max is not None:
+            matched &= ~(lat > lat_max)
+        weather_hint[matched] = hint
+    if weather_grid is not None:
+        if reported_on is None:
+            reported_on = np.full(len(category_codes), np.datetime64(datetime.utcnow().date(), "D"))
+        gridded = weather_grid.lookup_many(lat, lon, reported_on)
+        weather_hint = np.where(gridded >= 0, gridded, weather_hint).astype(np.int8)
+    
+    severity = arrays.severity_base[category_codes, crop_codes].astype(np.int32)
+    severity += arrays.weather_bonus[weather_hint, category_codes]
+    for columns, points in arrays.description_bonus:
+        severity += points * keyword_flags[:, columns].any(axis=1)
+    np.minimum(severity, arrays.max_score, out=severity)
+    
+    return {
+        "weather_hint": weather_hint,
+        "severity_score": severity,
+        "tags": arrays.tags[category_codes, crop_codes],
+        "resource_request": severity >= arrays.resource_threshold,
+        "resource_type": arrays.resource_types[category_codes],
+    }
+
 def generate_recommendation(category: CategoryType, crop: CropType, severity_score: int) -> Recommendation:
     """
     Generate crop-specific recommendation based on category and severity.
+    High-severity incidents get the urgent form of the step.
     """
     now = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
-    
-    # Base recommendations by category and crop
-    recommendations = {
-        (CategoryType.PEST, CropType.MAIZE): [
-            "Scout daily, apply recommended Bt pesticide per label, remove heavily infested plants",
-            "Use pheromone traps, apply neem-based products, rotate crops"
-        ],
-        (CategoryType.PEST, CropType.RICE): [
-            "Apply recommended insecticide, maintain field hygiene, use resistant varieties",
-            "Monitor regularly, apply biological controls, avoid over-fertilization"
-        ],
-        (CategoryType.PEST, CropType.CASSAVA): [
-            "Apply systemic insecticide, remove affected parts, use clean planting material",
-            "Practice crop rotation, maintain field borders, use resistant varieties"
-        ],
-        (CategoryType.PEST, CropType.TOMATO): [
-            "Apply appropriate pesticide, use yellow sticky traps, maintain spacing",
-            "Remove affected plants, apply neem oil, use floating row covers"
-        ],
-        (CategoryType.DISEASE, CropType.MAIZE): [
-            "Remove infected plants, apply fungicide, use resistant varieties",
-            "Practice crop rotation, maintain field hygiene, avoid overhead irrigation"
-        ],
-        (CategoryType.DISEASE, CropType.RICE): [
-            "Apply fungicide, remove infected plants, use certified seeds",
-            "Maintain proper spacing, avoid waterlogging, use resistant varieties"
-        ],
-        (CategoryType.DISEASE, CropType.CASSAVA): [
-            "Use disease-free cuttings, remove infected leaves, consider tolerant varieties",
-            "Practice crop rotation, maintain field hygiene, use resistant varieties"
-        ],
-        (CategoryType.DISEASE, CropType.TOMATO): [
-            "Apply fungicide, remove affected leaves, improve air circulation",
-            "Use resistant varieties, avoid overhead irrigation, maintain spacing"
-        ],
-        (CategoryType.FLOOD, CropType.MAIZE): [
-            "Open drainage channels, delay planting for 48 hours, avoid nitrogen top-dressing",
-            "Improve field drainage, consider raised beds, monitor for diseases"
-        ],
-        (CategoryType.FLOOD, CropType.RICE): [
-            "Open drainage channels, delay new planting for 72 hours, avoid nitrogen top-dressing",
-            "Maintain proper water level, use flood-tolerant varieties, monitor for pests"
-        ],
-        (CategoryType.FLOOD, CropType.CASSAVA): [
-            "Improve drainage, delay harvesting, monitor for root rot",
-            "Consider raised beds, use tolerant varieties, avoid waterlogging"
-        ],
-        (CategoryType.FLOOD, CropType.TOMATO): [
-            "Improve drainage immediately, delay planting, monitor for diseases",
-            "Use raised beds, consider container gardening, avoid waterlogging"
-        ],
-        (CategoryType.DROUGHT, CropType.MAIZE): [
-            "Apply mulch, use drought-tolerant varieties, consider irrigation",
-            "Practice conservation tillage, use organic matter, monitor soil moisture"
-        ],
-        (CategoryType.DROUGHT, CropType.RICE): [
-            "Maintain water level, use drought-tolerant varieties, consider alternate wetting",
-            "Use mulch, practice conservation tillage, monitor water availability"
-        ],
-        (CategoryType.DROUGHT, CropType.CASSAVA): [
-            "Apply mulch, use drought-tolerant varieties, consider irrigation",
-            "Practice conservation tillage, use organic matter, monitor soil moisture"
-        ],
-        (CategoryType.DROUGHT, CropType.TOMATO): [
-            "Apply mulch, use drought-tolerant varieties, consider drip irrigation",
-            "Use shade cloth, practice conservation tillage, monitor soil moisture"
-        ],
-        (CategoryType.INPUT_NEED, CropType.MAIZE): [
-            "Register for input support, recommended seed variety list attached",
-            "Contact extension officer, consider improved varieties, plan for next season"
-        ],
-        (CategoryType.INPUT_NEED, CropType.RICE): [
-            "Register for input support, recommended seed variety list attached",
-            "Contact extension officer, consider improved varieties, plan for next season"
-        ],
-        (CategoryType.INPUT_NEED, CropType.CASSAVA): [
-            "Register for input support, recommended cutting variety list attached",
-            "Contact extension officer, consider improved varieties, plan for next season"
-        ],
-        (CategoryType.INPUT_NEED, CropType.TOMATO): [
-            "Register for input support, recommended seed variety list attached",
-            "Contact extension officer, consider improved varieties, plan for next season"
-        ]
-    }
-    
-    # Get recommendation for this category-crop combination
-    key = (category, crop)
-    if key in recommendations:
-        # Choose recommendation based on severity
-        if severity_score >= 70:
-            # High severity - use urgent recommendation
-            recommendation_text = "URGENT: " + recommendations[key][0] + " (High severity incident - immediate action required)"
-        else:
-            # Lower severity - use standard recommendation
-            recommendation_text = recommendations[key][0]
-    else:
-        # Default recommendation
-        recommendation_text = f"Contact extension officer for {category.value} management in {crop.value}"
+    compiled = rules.current()
     
     return Recommendation(
-        step=recommendation_text,
-        source="extension_manual_stub",
+        step=compiled.recommendation_step(category, crop, severity_score),
+        source=compiled.recommendation_source,
         created_at=now
     )
 
@@ -234,24 +161,13 @@ def should_raise_resource_request(severity_score: int, category: CategoryType) -
     """
     Determine if a resource request should be raised.
     """
-    return severity_score >= 70
+    return severity_score >= rules.current().resource_threshold
 
 def get_resource_request_type(category: CategoryType, crop: CropType) -> str:
     """
     Determine the type of resource request based on category and crop.
     """
-    if category == CategoryType.PEST:
-        return "agrochemical"
-    elif category == CategoryType.DISEASE:
-        return "agrochemical"
-    elif category == CategoryType.FLOOD:
-        return "irrigation"
-    elif category == CategoryType.DROUGHT:
-        return "irrigation"
-    elif category == CategoryType.INPUT_NEED:
-        return "seed"
-    else:
-        return "training"
+    return rules.current().resource_types[category]
 
 def create_audit_event(event: str) -> Audit:
     """Create an audit event with current timestamp."""
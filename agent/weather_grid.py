@@ -0,0 +1,131 @@
+"""
+Gridded local weather for incident enrichment.
+
+A weather or climate dataset is converted offline (scripts/build_weather_grid.py)
+into a compact grid of weather hint codes, one byte per cell and day,
+stored as a .npy array next to a .json header describing the grid. The
+array is memory-mapped, so only the pages that are read are loaded, and a
+lookup is index arithmetic to the nearest cell: no network call and no
+parsing at query time.
+
+A grid is either "daily" (one layer per date from `start`) or
+"climatology" (one layer per day of the year, used for any year). Points
+outside the grid, dates it does not cover and missing cells return no
+hint, as do cells whose conditions were unremarkable ("unknown"), and
+enrichment falls back to the description rules. Without a grid file
+gridded lookups are simply disabled.
+"""
+import json
+import math
+import os
+from datetime import date, datetime
+from typing import Optional, Union
+
+import numpy as np
+
+from models import WeatherHint
+
+WEATHER_GRID_PATH = os.getenv(
+    "AGENT_WEATHER_GRID_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "data", "weather_grid.npy")
+)
+# Cell value for "no data"
+MISSING_CELL = 255
+DAILY = "daily"
+CLIMATOLOGY = "climatology"
+
+HINTS = tuple(WeatherHint)
+
+
+def header_path(grid_path: str) -> str:
+    return os.path.splitext(grid_path)[0] + ".json"
+
+
+class WeatherGrid:
+    """Memory-mapped (day, lat, lon) grid of weather hints."""
+
+    def __init__(self, path: str = WEATHER_GRID_PATH):
+        with open(header_path(path), "r") as f:
+            header = json.load(f)
+        self.path = path
+        self.calendar = header.get("calendar", DAILY)
+        if self.calendar not in (DAILY, CLIMATOLOGY):
+            raise ValueError(f"Unknown weather grid calendar {self.calendar!r}")
+        self.lat_min = float(header["lat_min"])
+        self.lon_min = float(header["lon_min"])
+        self.lat_step = float(header["lat_step"])
+        self.lon_step = float(header["lon_step"])
+        self.start = np.datetime64(header["start"], "D") if self.calendar == DAILY else None
+        self._start_ordinal = self.start.astype(date).toordinal() if self.start is not None else 0
+        self.cells = np.load(path, mmap_mode="r")
+        if self.cells.ndim != 3 or self.cells.dtype != np.uint8:
+            raise ValueError(f"Weather grid {path} must be a 3-D uint8 array, got {self.cells.shape} {self.cells.dtype}")
+        self.days, self.rows, self.cols = self.cells.shape
+        # Plain ndarray view of the same mapping; indexing skips np.memmap's overhead
+        self._cells = self.cells.view(np.ndarray)
+
+        # Grid codes -> WeatherHint, and -> positions in HINTS for batch lookups
+        self.hints = [WeatherHint(name) for name in header["hints"]]
+        self._codes = np.full(256, -1, dtype=np.int8)
+        for code, hint in enumerate(self.hints):
+            if hint != WeatherHint.UNKNOWN:
+                self._codes[code] = HINTS.index(hint)
+
+    def day_index(self, when: Union[date, datetime, None] = None) -> int:
+        """Layer holding `when` (today if None); may be out of range for daily grids."""
+        when = when or datetime.utcnow()
+        if self.calendar == CLIMATOLOGY:
+            return when.timetuple().tm_yday - 1
+        return when.toordinal() - self._start_ordinal
+
+    def lookup(self, lat: float, lon: float, when: Union[date, datetime, None] = None) -> Optional[WeatherHint]:
+        """Weather hint of the cell nearest to (lat, lon) on `when`, or None without data."""
+        if math.isnan(lat) or math.isnan(lon):
+            return None
+        day = self.day_index(when)
+        row = round((lat - self.lat_min) / self.lat_step)
+        col = round((lon - self.lon_min) / self.lon_step)
+        if not (0 <= day < self.days and 0 <= row < self.rows and 0 <= col < self.cols):
+            return None
+        code = int(self._cells[day, row, col])
+        if code >= len(self.hints) or self.hints[code] == WeatherHint.UNKNOWN:
+            return None
+        return self.hints[code]
+
+    def lookup_many(self, lat: np.ndarray, lon: np.ndarray, days: np.ndarray) -> np.ndarray:
+        """
+        Vectorized `lookup`: positions in `HINTS` (rules.WEATHER_HINTS) per
+        point, -1 where the grid has no data. `days` are datetime64[D] values.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        days = np.asarray(days, dtype="datetime64[D]")
+        if self.calendar == CLIMATOLOGY:
+            day = (days - days.astype("datetime64[Y]")).astype(np.int64)
+        else:
+            day = (days - self.start).astype(np.int64)
+        with np.errstate(invalid="ignore"):
+            row = np.rint((lat - self.lat_min) / self.lat_step)
+            col = np.rint((lon - self.lon_min) / self.lon_step)
+        inside = ((day >= 0) & (day < self.days) & (row >= 0) & (row < self.rows)
+                  & (col >= 0) & (col < self.cols) & ~np.isnat(days))
+        codes = np.full(len(lat), -1, dtype=np.int8)
+        if inside.any():
+            cells = self._cells[day[inside], row[inside].astype(np.intp), col[inside].astype(np.intp)]
+            codes[inside] = self._codes[cells]
+        return codes
+
+
+def load_weather_grid(path: str = WEATHER_GRID_PATH) -> Optional[WeatherGrid]:
+    """The grid at `path`, or None (gridded lookups disabled) if there is none or it is unusable."""
+    if not os.path.exists(path):
+        return None
+    try:
+        return WeatherGrid(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Warning: gridded weather disabled; could not load {path}: {e}")
+        return None
+
+
+# Global weather grid, None when no grid is installed
+weather_grid = load_weather_grid()
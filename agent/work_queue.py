@@ -0,0 +1,135 @@
+"""
+Fair, bounded scheduling of chat work across senders.
+
+Every sender has its own FIFO queue and at most one job running, so its
+messages are answered in order. Up to `max_concurrency` jobs run at once
+across all senders, and free slots go round-robin to senders with queued
+work, so one chatty sender cannot starve the rest. Work is refused up
+front (the caller replies "busy") when the queue is full, the sender has
+too much queued, or the estimated wait would exceed `max_wait_seconds`.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Set
+
+CHAT_CONCURRENCY = int(os.getenv("AGENT_CHAT_CONCURRENCY", "8"))
+CHAT_MAX_PENDING = int(os.getenv("AGENT_CHAT_MAX_PENDING", "200"))
+CHAT_MAX_PER_SENDER = int(os.getenv("AGENT_CHAT_MAX_PER_SENDER", "5"))
+CHAT_MAX_WAIT_SECONDS = float(os.getenv("AGENT_CHAT_MAX_WAIT_SECONDS", "30"))
+# Weight of the newest job in the moving average of job duration
+DURATION_SMOOTHING = 0.2
+
+Job = Callable[[], Awaitable[Any]]
+
+
+class FairWorkQueue:
+    """Per-sender FIFO queues drained round-robin under a global concurrency cap."""
+
+    def __init__(self, max_concurrency: int = CHAT_CONCURRENCY, max_pending: int = CHAT_MAX_PENDING,
+                 max_per_sender: int = CHAT_MAX_PER_SENDER, max_wait_seconds: float = CHAT_MAX_WAIT_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.max_per_sender = max_per_sender
+        self.max_wait_seconds = max_wait_seconds
+        self._queues: Dict[str, Deque[Job]] = {}
+        # Senders with queued work and nothing running, in the order they get a slot
+        self._ready: Deque[str] = deque()
+        self._active: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._pending = 0
+        self.avg_duration = 0.0
+        self.accepted = 0
+        self.shed = 0
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def running(self) -> int:
+        return len(self._active)
+
+    def estimated_wait(self) -> float:
+        """Seconds a job queued now would wait before starting, from recent job durations."""
+        ahead = self._pending + max(len(self._active) - self.max_concurrency + 1, 0)
+        return ahead / self.max_concurrency * self.avg_duration
+
+    def submit(self, sender: str, job: Job) -> bool:
+        """
+        Queue `job` (a coroutine function) for `sender`. Returns False, without
+        queueing, when the work should be shed.
+        """
+        queue = self._queues.get(sender)
+        queued_for_sender = (len(queue) if queue else 0) + (1 if sender in self._active else 0)
+        if (self._pending >= self.max_pending
+                or queued_for_sender >= self.max_per_sender
+                or self.estimated_wait() > self.max_wait_seconds):
+            self.shed += 1
+            return False
+
+        if queue is None:
+            queue = self._queues[sender] = deque()
+        queue.append(job)
+        self._pending += 1
+        self.accepted += 1
+        if sender not in self._active and len(queue) == 1:
+            self._ready.append(sender)
+        self._dispatch()
+        return True
+
+    def _dispatch(self):
+        while self._ready and len(self._active) < self.max_concurrency:
+            sender = self._ready.popleft()
+            job = self._queues[sender].popleft()
+            self._pending -= 1
+            self._active.add(sender)
+            task = asyncio.get_running_loop().create_task(self._run(sender, job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, sender: str, job: Job):
+        started = time.monotonic()
+        try:
+            await job()
+            self.completed += 1
+        except Exception:
+            self.failed += 1
+        finally:
+            duration = time.monotonic() - started
+            self.avg_duration = (
+                duration if not self.avg_duration
+                else (1 - DURATION_SMOOTHING) * self.avg_duration + DURATION_SMOOTHING * duration
+            )
+            self._active.discard(sender)
+            if self._queues[sender]:
+                # Back of the line, behind senders that have been waiting
+                self._ready.append(sender)
+            else:
+                del self._queues[sender]
+            self._dispatch()
+
+    async def join(self):
+        """Wait until every queued and running job has finished."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": len(self._active),
+            "pending": self._pending,
+            "senders_waiting": len(self._ready),
+            "avg_duration": round(self.avg_duration, 3),
+            "estimated_wait": round(self.estimated_wait(), 3),
+            "accepted": self.accepted,
+            "shed": self.shed,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+# Global chat work queue
+chat_queue = FairWorkQueue()
@@ -1,19 +1,27 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
+import asyncio
 import json
 import os
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 # Add agent directory to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'agent'))
 
 from models import FarmerReport, OperatorQuery, AgentResponse, Geo, CropType, CategoryType, Incident
 from utils import enrich_incident, generate_recommendation, should_raise_resource_request, get_resource_request_type
+from geocode import canonical_location
+from outbox import new_incident_id
+from geo_index import geo_index
+from outbreaks import outbreak_engine
+from heatmap import heatmap
+from incident_tail import IncidentFileTail
+from rollups import rollups, GRANULARITIES, bucket_start, bucket_index
 from ai_service import ai_service
 
 app = FastAPI(
@@ -31,6 +39,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Longest trend series a single query may return
+MAX_TREND_BUCKETS = int(os.getenv("API_MAX_TREND_BUCKETS", "2000"))
+# Seconds between checks for incidents the agent appended to incidents.json
+INDEX_SYNC_INTERVAL = float(os.getenv("API_INDEX_SYNC_INTERVAL", "5"))
+
 # Mount static files (commented out since web files were removed)
 # app.mount("/web", StaticFiles(directory="../web"), name="web")
 
@@ -82,6 +95,76 @@ class LGAQueryResponse(BaseModel):
     top_high_severity: List[str]
     incidents: List[IncidentResponse]
 
+class NearbyIncidentResponse(IncidentResponse):
+    distance_km: float
+
+class RadiusQueryResponse(BaseModel):
+    total: int
+    incidents: List[NearbyIncidentResponse]
+
+class BoundingBoxQueryResponse(BaseModel):
+    total: int
+    incidents: List[IncidentResponse]
+
+class OutbreakResponse(BaseModel):
+    outbreak_id: str
+    category: str
+    crop: str
+    tags: List[str]
+    size: int
+    incident_ids: List[str]
+    lgas: List[str]
+    centroid: Dict[str, float]
+    extent: Dict[str, float]
+    mean_severity: float
+    first_reported_at: str
+    last_reported_at: str
+    detected_at: str
+    growth_per_day: float
+    growth_ratio: Optional[float]
+
+class OutbreaksResponse(BaseModel):
+    total: int
+    outbreaks: List[OutbreakResponse]
+
+class TrendBucket(BaseModel):
+    bucket_start: str
+    count: int
+    mean_severity: Optional[float]
+    high_severity_count: int
+
+class TrendResponse(BaseModel):
+    granularity: str
+    lga: Optional[str]
+    crop: Optional[str]
+    category: Optional[str]
+    total: int
+    mean_severity: Optional[float]
+    high_severity_count: int
+    buckets: List[TrendBucket]
+
+class HeatmapTileResponse(BaseModel):
+    zoom: int
+    x: int
+    y: int
+    cells_per_side: int
+    # [cell col, cell row, count, mean severity], cell (0, 0) at the tile's north-west corner
+    cells: List[List[float]]
+
+@app.on_event("startup")
+async def load_incident_indexes():
+    """Index the stored incidents once, then follow the agent's appends in the background."""
+    await asyncio.to_thread(sync_incident_indexes)
+    asyncio.create_task(follow_incident_file())
+
+async def follow_incident_file():
+    while True:
+        await asyncio.sleep(INDEX_SYNC_INTERVAL)
+        try:
+            await asyncio.to_thread(sync_incident_indexes)
+        except Exception as e:
+            print(f"Warning: could not sync incident indexes: {e}")
+
 @app.get("/")
 async def root():
     """Root endpoint with API information."""
@@ -215,13 +298,15 @@ async def submit_farmer_report(request: FarmerReportRequest):
         
         # Create incident data
         now = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
-        incident_id = f"inc-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+        incident_id = new_incident_id()
+        
+        location = canonical_location(request.lga, request.state, request.lat, request.lon)
         
         incident_data = {
             "incident_id": incident_id,
             "farmer_id": request.farmer_id,
-            "lga": request.lga,
-            "state": request.state,
+            "lga": location.lga,
+            "state": location.state,
             "geo": {"lat": request.lat, "lon": request.lon},
             "crop": crop.value,
             "category": category.value,
@@ -251,8 +336,9 @@ async def submit_farmer_report(request: FarmerReportRequest):
             ]
         }
         
-        # Save to local storage
+        # Save to local storage and count it into the query indexes
         save_incident_locally(incident_data)
+        index_incidents([incident_data])
         
         # Prepare response
         response_message = f"Thank you for your report. Your incident has been recorded (ID: {incident_id}). "
@@ -316,6 +402,56 @@ async def list_all_incidents():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading incidents: {str(e)}")
 
+# Declared before /api/incidents/{incident_id} so "nearby" and "bbox" are not taken for IDs
+@app.get("/api/incidents/nearby", response_model=RadiusQueryResponse)
+async def query_incidents_nearby(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(25.0, gt=0, le=1000),
+    category: Optional[str] = None,
+    days: Optional[int] = Query(None, ge=1, description="Only incidents reported in the last N days"),
+    limit: int = Query(500, ge=1, le=5000)
+):
+    """
+    Incidents within `radius_km` of a point, nearest first.
+    """
+    try:
+        matches = geo_index.within_radius(
+            lat, lon, radius_km, category=category, since=reported_since(days), limit=limit
+        )
+        return RadiusQueryResponse(
+            total=len(matches),
+            incidents=[NearbyIncidentResponse(**inc, distance_km=round(distance, 3)) for distance, inc in matches]
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error querying nearby incidents: {str(e)}")
+
+@app.get("/api/incidents/bbox", response_model=BoundingBoxQueryResponse)
+async def query_incidents_in_bbox(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    category: Optional[str] = None,
+    days: Optional[int] = Query(None, ge=1, description="Only incidents reported in the last N days"),
+    limit: int = Query(500, ge=1, le=5000)
+):
+    """
+    Incidents inside a bounding box, most recently reported first.
+    """
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=400, detail="min_lat/min_lon must not exceed max_lat/max_lon")
+    try:
+        matches = geo_index.within_bbox(
+            min_lat, min_lon, max_lat, max_lon, category=category, since=reported_since(days), limit=limit
+        )
+        return BoundingBoxQueryResponse(
+            total=len(matches),
+            incidents=[IncidentResponse(**inc) for inc in matches]
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error querying incidents in area: {str(e)}")
+
 @app.get("/api/incidents/{incident_id}", response_model=IncidentResponse)
 async def get_incident(incident_id: str):
     """
@@ -332,6 +468,77 @@ async def get_incident(incident_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving incident: {str(e)}")
 
+@app.get("/api/outbreaks", response_model=OutbreaksResponse)
+async def list_outbreaks(
+    category: Optional[str] = None,
+    crop: Optional[str] = None,
+    min_size: int = Query(0, ge=0, description="Only outbreaks with at least this many incidents")
+):
+    """
+    Active outbreaks: recent incidents of one category and crop clustered
+    in space and time, largest first.
+    """
+    try:
+        outbreak_engine.refresh()
+        outbreaks = outbreak_engine.outbreaks(category=category, crop=crop, min_size=min_size)
+        return OutbreaksResponse(
+            total=len(outbreaks),
+            outbreaks=[OutbreakResponse(**outbreak) for outbreak in outbreaks]
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error detecting outbreaks: {str(e)}")
+
+@app.get("/api/heatmap/{zoom}/{x}/{y}")
+async def get_heatmap_tile(zoom: int, x: int, y: int, category: Optional[str] = None, format: str = "cells"):
+    """
+    Incident counts and mean severity per cell of a Web Mercator map tile,
+    as compact cells or (format=geojson) a GeoJSON FeatureCollection.
+    """
+    if not 0 <= zoom <= heatmap.max_zoom:
+        raise HTTPException(status_code=400, detail=f"zoom must be between 0 and {heatmap.max_zoom}")
+    if not (0 <= x < 2 ** zoom and 0 <= y < 2 ** zoom):
+        raise HTTPException(status_code=400, detail=f"x and y must be between 0 and {2 ** zoom - 1} at zoom {zoom}")
+    if format not in ("cells", "geojson"):
+        raise HTTPException(status_code=400, detail="format must be 'cells' or 'geojson'")
+    try:
+        if format == "geojson":
+            return heatmap.tile_geojson(zoom, x, y, category=category)
+        return HeatmapTileResponse(
+            zoom=zoom, x=x, y=y, cells_per_side=heatmap.tile_cells,
+            cells=[list(cell) for cell in heatmap.tile(zoom, x, y, category=category)]
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error building heatmap tile: {str(e)}")
+
+@app.get("/api/trends", response_model=TrendResponse)
+async def get_trends(
+    granularity: str = "week",
+    lga: Optional[str] = None,
+    crop: Optional[str] = None,
+    category: Optional[str] = None,
+    start: Optional[datetime] = Query(None, description="Start of the range (default: 12 buckets before end)"),
+    end: Optional[datetime] = Query(None, description="End of the range (default: now)")
+):
+    """
+    Incident counts per hour, day or week over a time range, e.g. weekly
+    pest reports in one LGA, from the precomputed rollups.
+    """
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(GRANULARITIES)}")
+    # Compare as naive UTC, like the stored report times
+    end = naive_utc(end) if end else datetime.utcnow()
+    if start is None:
+        start = bucket_start(granularity, bucket_index(granularity, end) - 11)
+    start = naive_utc(start)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if bucket_index(granularity, end) - bucket_index(granularity, start) >= MAX_TREND_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Range spans more than {MAX_TREND_BUCKETS} {granularity} buckets")
+    try:
+        return TrendResponse(**rollups.trend(granularity, start, end, lga=lga, crop=crop, category=category))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error querying trends: {str(e)}")
+
 @app.get("/api/stats")
 async def get_stats():
     """
@@ -401,10 +608,12 @@ def save_incident_locally(incident_data: Dict[str, Any]):
     # Add new incident
     incidents.append(incident_data)
     
-    # Save back to file
+    # Save back to file; write then rename so the index sync never reads a partial file
     os.makedirs(os.path.dirname(storage_file), exist_ok=True)
-    with open(storage_file, 'w') as f:
+    tmp_file = storage_file + ".tmp"
+    with open(tmp_file, 'w') as f:
         json.dump(incidents, f, indent=2)
+    os.replace(tmp_file, storage_file)
 
 def load_incidents_from_local() -> List[Dict[str, Any]]:
     """
@@ -422,6 +631,38 @@ def load_incidents_from_local() -> List[Dict[str, Any]]:
     except:
         return []
 
+# Follows incidents.json, which the agent appends to as well
+incident_tail = IncidentFileTail(os.path.join(os.path.dirname(__file__), "..", "data", "incidents.json"))
+
+def index_incidents(incidents: List[Dict[str, Any]]):
+    """Count incidents into the geo index, the outbreak engine, the heatmap and the rollups."""
+    geo_index.add_many(incidents)
+    outbreak_engine.add_many(incidents)
+    heatmap.add_many(incidents)
+    rollups.add_many(incidents)
+
+def sync_incident_indexes() -> int:
+    """
+    Index the incidents appended to incidents.json since the last sync,
+    all of them on the first; returns how many were read. Blocking, so
+    it runs off the event loop.
+    """
+    incidents = incident_tail.read_new()
+    index_incidents(incidents)
+    return len(incidents)
+
+def naive_utc(value: datetime) -> datetime:
+    """`value` as a naive UTC datetime; naive values are taken to be UTC already."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def reported_since(days: Optional[int]) -> Optional[str]:
+    """ISO timestamp `days` days ago, comparable with incidents' `reported_at`."""
+    if not days:
+        return None
+    return (datetime.utcnow() - timedelta(days=days)).isoformat() + "Z"
+
 def group_incidents_by_category(incidents: List[Dict[str, Any]]) -> Dict[str, int]:
     """
     Group incidents by category and return counts.
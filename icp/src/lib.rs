@@ -27,7 +27,25 @@ fn init() {
 #[update]
 fn create_incident(incident: Incident) -> String {
     let storage = get_storage();
-    
+    let incident_id = insert_incident(storage, incident);
+    ic_cdk::println!("Created incident: {}", incident_id);
+    incident_id
+}
+
+// Bulk variant of create_incident: one consensus round for many incidents.
+// Returned IDs are in the same order as the input vector.
+#[update]
+fn create_incidents_batch(incidents: Vec<Incident>) -> Vec<String> {
+    let storage = get_storage();
+    let incident_ids: Vec<String> = incidents
+        .into_iter()
+        .map(|incident| insert_incident(storage, incident))
+        .collect();
+    ic_cdk::println!("Created {} incidents in batch", incident_ids.len());
+    incident_ids
+}
+
+fn insert_incident(storage: &mut Storage, incident: Incident) -> String {
     // Generate incident ID if not provided
     let mut incident = incident;
     if incident.incident_id.is_empty() {
@@ -46,9 +64,7 @@ fn create_incident(incident: Incident) -> String {
         incident.status = "received".to_string();
     }
     
-    let incident_id = storage.add_incident(incident);
-    ic_cdk::println!("Created incident: {}", incident_id);
-    incident_id
+    storage.add_incident(incident)
 }
 
 #[query]
@@ -67,6 +83,40 @@ fn list_incidents_by_lga(lga: String) -> Vec<Incident> {
         .collect()
 }
 
+#[query]
+fn list_incidents_page(query: IncidentPageQuery) -> IncidentPage {
+    let storage = get_storage();
+    storage.get_incident_page(&query)
+}
+
+// Totals for an LGA without transferring its incidents
+#[query]
+fn lga_summary(lga: String, high_severity: u16) -> LgaSummary {
+    let storage = get_storage();
+    storage.get_lga_summary(&lga, high_severity)
+}
+
+// Reconciliation: hashes of tree nodes identified by hex prefix ("" is
+// the root). Callers descend only into nodes whose hashes differ.
+#[query]
+fn merkle_nodes(prefixes: Vec<String>) -> Vec<Vec<u8>> {
+    let storage = get_storage();
+    prefixes
+        .iter()
+        .map(|prefix| storage.merkle_node(prefix).to_vec())
+        .collect()
+}
+
+// Reconciliation: per-incident digests in the given leaf buckets
+#[query]
+fn merkle_buckets(prefixes: Vec<String>) -> Vec<IncidentDigest> {
+    let storage = get_storage();
+    prefixes
+        .iter()
+        .flat_map(|prefix| storage.merkle_bucket_digests(prefix))
+        .collect()
+}
+
 #[update]
 fn add_recommendation(incident_id: String, recommendation: Recommendation) {
     let storage = get_storage();
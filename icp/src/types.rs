@@ -1,6 +1,9 @@
 use candid::{CandidType, Deserialize};
 use serde::{Deserialize as SerdeDeserialize, Serialize as SerdeSerialize};
-use std::collections::HashMap;
+use std::collections::{BTreeMap, BTreeSet, HashMap};
+use std::ops::Bound;
+
+use sha2::{Digest, Sha256};
 
 #[derive(CandidType, Deserialize, Clone, SerdeSerialize)]
 pub struct Geo {
@@ -54,11 +57,135 @@ pub struct Incident {
     pub audit: Vec<Audit>,
 }
 
+// Paginated LGA listing: incidents are returned in incident_id order,
+// starting after `cursor`. Optional fields are filters.
+#[derive(CandidType, Deserialize, Clone)]
+pub struct IncidentPageQuery {
+    pub lga: String,
+    pub cursor: Option<String>,
+    pub limit: u32,
+    pub min_severity: Option<u16>,
+    pub status: Option<String>,
+    pub reported_after: Option<String>,
+    pub reported_before: Option<String>,
+}
+
+#[derive(CandidType, Deserialize, Clone)]
+pub struct IncidentPage {
+    pub incidents: Vec<Incident>,
+    // None once the listing is exhausted
+    pub next_cursor: Option<String>,
+}
+
+// Counts for an LGA, so operator summaries need not page through its incidents
+#[derive(CandidType, Deserialize, Clone)]
+pub struct CategoryCount {
+    pub category: String,
+    pub count: u64,
+}
+
+#[derive(CandidType, Deserialize, Clone)]
+pub struct LgaSummary {
+    pub lga: String,
+    pub total: u64,
+    // Incidents with severity_score >= the requested threshold
+    pub high_severity: u64,
+    pub by_category: Vec<CategoryCount>,
+}
+
+impl IncidentPageQuery {
+    pub fn matches(&self, incident: &Incident) -> bool {
+        if let Some(min_severity) = self.min_severity {
+            if incident.enriched.severity_score < min_severity {
+                return false;
+            }
+        }
+        if let Some(status) = &self.status {
+            if &incident.status != status {
+                return false;
+            }
+        }
+        // reported_at is an ISO-8601 timestamp, so string order is time order
+        if let Some(after) = &self.reported_after {
+            if &incident.reported_at < after {
+                return false;
+            }
+        }
+        if let Some(before) = &self.reported_before {
+            if &incident.reported_at >= before {
+                return false;
+            }
+        }
+        true
+    }
+}
+
+#[derive(CandidType, Deserialize, Clone)]
+pub struct IncidentDigest {
+    pub incident_id: String,
+    pub digest: Vec<u8>,
+}
+
+// Depth of the reconciliation hash tree. Incidents are bucketed by the
+// first MERKLE_DEPTH hex digits of sha256(incident_id), giving 16^depth
+// leaves. Must match MERKLE_DEPTH in agent/reconcile.py.
+pub const MERKLE_DEPTH: usize = 3;
+const HEX_DIGITS: &[u8; 16] = b"0123456789abcdef";
+
+// sha256 over the fields both the agent's local store and the canister
+// hold, separated by 0x1f; coordinates are hashed by their IEEE-754 bits
+// so float formatting cannot differ. Must match incident_digest() in
+// agent/reconcile.py.
+pub fn incident_digest(incident: &Incident) -> [u8; 32] {
+    let canonical = [
+        incident.incident_id.clone(),
+        incident.farmer_id.clone(),
+        incident.lga.clone(),
+        incident.state.clone(),
+        format!("{:016x}", incident.geo.lat.to_bits()),
+        format!("{:016x}", incident.geo.lon.to_bits()),
+        incident.crop.clone(),
+        incident.category.clone(),
+        incident.description.clone(),
+        incident.reported_at.clone(),
+        incident.status.clone(),
+        incident.enriched.severity_score.to_string(),
+    ]
+    .join("\u{1f}");
+    Sha256::digest(canonical.as_bytes()).into()
+}
+
+pub fn merkle_bucket(incident_id: &str) -> String {
+    let hash = Sha256::digest(incident_id.as_bytes());
+    hash.iter()
+        .flat_map(|byte| [HEX_DIGITS[(byte >> 4) as usize], HEX_DIGITS[(byte & 0x0f) as usize]])
+        .take(MERKLE_DEPTH)
+        .map(|digit| digit as char)
+        .collect()
+}
+
+fn xor_into(target: &mut [u8; 32], digest: &[u8; 32]) {
+    for (t, d) in target.iter_mut().zip(digest.iter()) {
+        *t ^= d;
+    }
+}
+
+pub const MAX_PAGE_LIMIT: u32 = 500;
+// Upper bound on index entries inspected per page, so sparse filters
+// cannot make a single query walk an entire LGA
+pub const MAX_PAGE_SCAN: usize = 5000;
+
 // Storage structure
 #[derive(Default)]
 pub struct Storage {
     pub incidents: HashMap<String, Incident>,
     pub next_id: u64,
+    // lga -> incident ids, ordered for cursor pagination
+    pub lga_index: HashMap<String, BTreeSet<String>>,
+    // Reconciliation tree leaves: XOR of the digests in each bucket, kept
+    // up to date on every write, plus the ids in each bucket
+    pub merkle_leaves: HashMap<String, [u8; 32]>,
+    pub merkle_members: HashMap<String, BTreeSet<String>>,
 }
 
 impl Storage {
@@ -66,6 +193,9 @@ impl Storage {
         Self {
             incidents: HashMap::new(),
             next_id: 1,
+            lga_index: HashMap::new(),
+            merkle_leaves: HashMap::new(),
+            merkle_members: HashMap::new(),
         }
     }
 
@@ -77,24 +207,142 @@ impl Storage {
 
     pub fn add_incident(&mut self, incident: Incident) -> String {
         let incident_id = incident.incident_id.clone();
+        let bucket = merkle_bucket(&incident_id);
+        if let Some(previous) = self.incidents.get(&incident_id) {
+            let previous_lga = previous.lga.clone();
+            let previous_digest = incident_digest(previous);
+            self.unindex(&previous_lga, &incident_id);
+            xor_into(self.merkle_leaves.entry(bucket.clone()).or_insert([0u8; 32]), &previous_digest);
+        }
+        self.lga_index
+            .entry(incident.lga.clone())
+            .or_default()
+            .insert(incident_id.clone());
+        xor_into(
+            self.merkle_leaves.entry(bucket.clone()).or_insert([0u8; 32]),
+            &incident_digest(&incident),
+        );
+        self.merkle_members
+            .entry(bucket)
+            .or_default()
+            .insert(incident_id.clone());
         self.incidents.insert(incident_id.clone(), incident);
         incident_id
     }
 
+    // Hash of the tree node for `prefix`: the bucket XOR at leaf depth,
+    // otherwise sha256 of the 16 child hashes in hex-digit order.
+    pub fn merkle_node(&self, prefix: &str) -> [u8; 32] {
+        if prefix.len() >= MERKLE_DEPTH {
+            return self.merkle_leaves.get(prefix).copied().unwrap_or([0u8; 32]);
+        }
+        let mut hasher = Sha256::new();
+        for digit in HEX_DIGITS.iter() {
+            let child = format!("{}{}", prefix, *digit as char);
+            hasher.update(self.merkle_node(&child));
+        }
+        hasher.finalize().into()
+    }
+
+    pub fn merkle_bucket_digests(&self, prefix: &str) -> Vec<IncidentDigest> {
+        match self.merkle_members.get(prefix) {
+            Some(ids) => ids
+                .iter()
+                .filter_map(|id| self.incidents.get(id))
+                .map(|incident| IncidentDigest {
+                    incident_id: incident.incident_id.clone(),
+                    digest: incident_digest(incident).to_vec(),
+                })
+                .collect(),
+            None => Vec::new(),
+        }
+    }
+
+    fn unindex(&mut self, lga: &str, incident_id: &str) {
+        if let Some(ids) = self.lga_index.get_mut(lga) {
+            ids.remove(incident_id);
+            if ids.is_empty() {
+                self.lga_index.remove(lga);
+            }
+        }
+    }
+
     pub fn get_incident(&self, incident_id: &str) -> Option<&Incident> {
         self.incidents.get(incident_id)
     }
 
     pub fn get_incidents_by_lga(&self, lga: &str) -> Vec<&Incident> {
-        self.incidents
-            .values()
-            .filter(|incident| incident.lga == lga)
-            .collect()
+        match self.lga_index.get(lga) {
+            Some(ids) => ids.iter().filter_map(|id| self.incidents.get(id)).collect(),
+            None => Vec::new(),
+        }
+    }
+
+    pub fn get_incident_page(&self, query: &IncidentPageQuery) -> IncidentPage {
+        let limit = query.limit.clamp(1, MAX_PAGE_LIMIT) as usize;
+        let ids = match self.lga_index.get(&query.lga) {
+            Some(ids) => ids,
+            None => {
+                return IncidentPage {
+                    incidents: Vec::new(),
+                    next_cursor: None,
+                }
+            }
+        };
+        let start = match &query.cursor {
+            Some(cursor) => Bound::Excluded(cursor.clone()),
+            None => Bound::Unbounded,
+        };
+
+        let mut incidents = Vec::new();
+        let mut last_seen: Option<&String> = None;
+        let mut scanned = 0;
+        let mut exhausted = true;
+        for id in ids.range((start, Bound::Unbounded)) {
+            if incidents.len() >= limit || scanned >= MAX_PAGE_SCAN {
+                exhausted = false;
+                break;
+            }
+            scanned += 1;
+            last_seen = Some(id);
+            if let Some(incident) = self.incidents.get(id) {
+                if query.matches(incident) {
+                    incidents.push(incident.clone());
+                }
+            }
+        }
+
+        IncidentPage {
+            incidents,
+            next_cursor: if exhausted { None } else { last_seen.cloned() },
+        }
+    }
+
+    pub fn get_lga_summary(&self, lga: &str, high_severity: u16) -> LgaSummary {
+        let mut by_category: BTreeMap<String, u64> = BTreeMap::new();
+        let mut total = 0;
+        let mut high = 0;
+        for incident in self.get_incidents_by_lga(lga) {
+            total += 1;
+            if incident.enriched.severity_score >= high_severity {
+                high += 1;
+            }
+            *by_category.entry(incident.category.clone()).or_insert(0) += 1;
+        }
+        LgaSummary {
+            lga: lga.to_string(),
+            total,
+            high_severity: high,
+            by_category: by_category
+                .into_iter()
+                .map(|(category, count)| CategoryCount { category, count })
+                .collect(),
+        }
     }
 
     pub fn update_incident(&mut self, incident_id: &str, incident: Incident) -> bool {
         if self.incidents.contains_key(incident_id) {
-            self.incidents.insert(incident_id.to_string(), incident);
+            self.add_incident(incident);
             true
         } else {
             false
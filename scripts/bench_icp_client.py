@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Benchmark ICPClient against the fake dfx (scripts/fake_dfx.py)
+
+Runs reproducible scenarios (single vs batched creates, cached reads, paged
+LGA listings, outbox draining under injected faults) against a fresh fake
+canister, so changes to the client can be measured without a replica.
+With --replay, re-issues the calls recorded in a FAKE_DFX_RECORD file.
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime
+
+# Add agent directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'agent'))
+
+FAKE_DFX = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_dfx.py")
+LGAS = [("Ikeja", "Lagos"), ("Kano Municipal", "Kano"), ("Ibadan North", "Oyo"), ("Gboko", "Benue")]
+CROPS = ["maize", "rice", "cassava", "tomato", "sorghum"]
+CATEGORIES = ["pest", "disease", "flood", "drought", "input_need"]
+
+def make_incidents(count, seed=7):
+    """Deterministic synthetic incidents spread over a few LGAs."""
+    from models import Incident
+    rng = random.Random(seed)
+    incidents = []
+    for i in range(count):
+        lga, state = LGAS[i % len(LGAS)]
+        incidents.append(Incident(
+            incident_id=f"inc-bench-{i:06d}",
+            farmer_id=f"farmer-{rng.randint(1, 500):03d}",
+            lga=lga,
+            state=state,
+            geo={"lat": round(rng.uniform(4.0, 13.0), 5), "lon": round(rng.uniform(3.0, 14.0), 5)},
+            crop=rng.choice(CROPS),
+            category=rng.choice(CATEGORIES),
+            description="Leaves turning yellow with spots after heavy rain",
+            reported_at=datetime(2025, 8, 1 + i % 28, i % 24).isoformat() + "Z",
+            enriched={"weather_hint": "rainy", "severity_score": rng.randint(10, 95), "tags": ["bench"]},
+        ))
+    return incidents
+
+def timed(label, fn, calls):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    per_call = f"  ({calls} calls, {elapsed * 1000 / calls:.1f} ms/call)" if calls else ""
+    print(f"⏱️  {label:<34} {elapsed * 1000:9.1f} ms{per_call}")
+    return result
+
+def run_scenarios(args):
+    from icp_client import ICPClient
+    import outbox
+    from outbox import Outbox, OutboxWorker, CREATE_INCIDENT, SET_STATUS
+
+    client = ICPClient(canister_id="uxrrr-q7777-77774-qaaaq-cai")
+    incidents = make_incidents(args.incidents)
+    print(f"🚀 Benchmarking ICPClient against fake dfx ({args.incidents} incidents)")
+    print("=" * 50)
+
+    singles = incidents[:args.singles]
+    timed("create_incident x N", lambda: [client.create_incident(i) for i in singles], len(singles))
+
+    results = timed("create_incidents_batch", lambda: client.create_incidents_batch(incidents),
+                    -(-len(incidents) // 500))
+    assert all(results), "batched create lost incidents"
+
+    ids = [incident.incident_id for incident in incidents[:args.reads]]
+    timed("get_incident (cold)", lambda: [client.get_incident(i) for i in ids], len(ids))
+    timed("get_incident (cached)", lambda: [client.get_incident(i) for i in ids], 0)
+    print(f"📊 Incident cache: {client.cache_stats()['incidents']}")
+
+    async def iterate(lga):
+        return [incident async for incident in client.iter_incidents_by_lga(lga, page_size=args.page_size)]
+    lga = LGAS[0][0]
+    expected = sum(1 for incident in incidents if incident.lga == lga)
+    listed = timed(f"iter_incidents_by_lga ({lga})", lambda: asyncio.run(iterate(lga)),
+                   -(-expected // args.page_size))
+    assert len(listed) == expected, f"paging returned {len(listed)} of {expected}"
+    summary = timed(f"lga_summary ({lga})", lambda: client.lga_summary(lga), 1)
+    assert summary["total_incidents"] == expected, f"summary counted {summary['total_incidents']} of {expected}"
+
+    # Outbox drain with faults injected into every call
+    os.environ["FAKE_DFX_FAULT_RATE"] = str(args.fault_rate)
+    outbox.RETRY_BASE_SECONDS = 0  # retry immediately instead of backing off
+    outbox_path = os.path.join(tempfile.mkdtemp(prefix="zyra_bench_"), "outbox.jsonl")
+    worker = OutboxWorker(Outbox(path=outbox_path), client, batch_size=args.page_size)
+    fresh = make_incidents(args.incidents // 4, seed=11)
+    operations = []
+    for incident in fresh:
+        incident.incident_id = incident.incident_id.replace("bench", "outbox")
+        operations.append((CREATE_INCIDENT, incident.incident_id, incident.model_dump(mode="json", by_alias=True)))
+        operations.append((SET_STATUS, incident.incident_id, {"status": "recommended"}))
+    worker.outbox.enqueue_many(operations)
+
+    async def drain_all():
+        rounds = 0
+        while len(worker.outbox) and rounds < 50:
+            rounds += 1
+            await worker.drain()
+        return rounds
+    rounds = timed(f"outbox drain (fault rate {args.fault_rate})", lambda: asyncio.run(drain_all()), 0)
+    os.environ["FAKE_DFX_FAULT_RATE"] = "0"
+    print(f"📦 Outbox: {len(operations)} operations in {rounds} drain passes, {len(worker.outbox)} left pending")
+
+    print("\n✅ Benchmark complete")
+
+def replay(path):
+    """Re-issue recorded calls and compare latencies with the recording."""
+    from icp_client import ICPClient, ICPCallError
+    from fake_dfx import METHODS
+
+    client = ICPClient(canister_id="uxrrr-q7777-77774-qaaaq-cai")
+    with open(path, "r") as f:
+        calls = [json.loads(line) for line in f if line.strip()]
+    print(f"🔁 Replaying {len(calls)} recorded calls from {path}")
+    print("=" * 50)
+
+    by_method = {}
+    for call in calls:
+        started = time.perf_counter()
+        returns = METHODS[call["method"]][1]
+        try:
+            client._call_raw(call["method"], bytes.fromhex(call["argument"]), returns, call["update"])
+            ok = True
+        except ICPCallError:
+            ok = False
+        stats = by_method.setdefault(call["method"], {"calls": 0, "failed": 0, "recorded_ms": 0.0, "replayed_ms": 0.0})
+        stats["calls"] += 1
+        stats["failed"] += 0 if ok else 1
+        stats["recorded_ms"] += call["latency_ms"]
+        stats["replayed_ms"] += (time.perf_counter() - started) * 1000
+
+    for method, stats in sorted(by_method.items()):
+        print(f"📞 {method:<24} {stats['calls']:5d} calls  {stats['failed']:4d} failed  "
+              f"recorded {stats['recorded_ms'] / stats['calls']:7.1f} ms  "
+              f"replayed {stats['replayed_ms'] / stats['calls']:7.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ICPClient against a fake dfx")
+    parser.add_argument("--incidents", type=int, default=400, help="Incidents created in the batch scenario")
+    parser.add_argument("--singles", type=int, default=20, help="Incidents created one call at a time")
+    parser.add_argument("--reads", type=int, default=20, help="Incidents read back by ID")
+    parser.add_argument("--page-size", type=int, default=100, help="Page size for LGA listings")
+    parser.add_argument("--fault-rate", type=float, default=0.2, help="Fault probability during the outbox scenario")
+    parser.add_argument("--query-latency", type=float, default=0, help="Injected query latency in ms")
+    parser.add_argument("--update-latency", type=float, default=0, help="Injected update latency in ms")
+    parser.add_argument("--record", help="Record all calls to this JSON-lines file")
+    parser.add_argument("--replay", help="Replay calls recorded in this JSON-lines file instead")
+    args = parser.parse_args()
+
+    os.environ["ICP_DFX_PATH"] = FAKE_DFX
+    os.environ.setdefault("FAKE_DFX_STATE", os.path.join(tempfile.mkdtemp(prefix="zyra_fake_dfx_"), "state.json"))
+    os.environ["FAKE_DFX_QUERY_LATENCY_MS"] = str(args.query_latency)
+    os.environ["FAKE_DFX_UPDATE_LATENCY_MS"] = str(args.update_latency)
+    if args.record:
+        os.environ["FAKE_DFX_RECORD"] = os.path.abspath(args.record)
+
+    if args.replay:
+        replay(args.replay)
+    else:
+        run_scenarios(args)
+
+if __name__ == "__main__":
+    main()
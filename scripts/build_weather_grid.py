@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Convert a gridded weather or climate dataset into the compact grid used
+for incident enrichment (agent/weather_grid.py)
+
+Input is a CSV with one row per grid cell and day:
+
+    lat,lon,date,precip_mm,humidity_pct,tmax_c
+
+where `date` is YYYY-MM-DD, or a day of the year (1-366) with --climatology.
+A `hint` column (sunny, rainy, humid, dry) may be given instead of the
+measurements. NetCDF files can be read too if xarray is installed; name
+their variables with --precip-var, --humidity-var and --tmax-var.
+
+Each cell and day is classified into a weather hint with the thresholds
+below and written as one byte to a .npy array plus a .json header.
+"""
+
+import sys
+import os
+import csv
+import json
+import argparse
+
+import numpy as np
+
+# Add agent directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'agent'))
+
+from models import WeatherHint
+from weather_grid import WEATHER_GRID_PATH, MISSING_CELL, DAILY, CLIMATOLOGY, header_path
+
+# Grid codes, in header order
+HINTS = [WeatherHint.SUNNY, WeatherHint.RAINY, WeatherHint.HUMID, WeatherHint.DRY, WeatherHint.UNKNOWN]
+HINT_CODES = {hint.value: code for code, hint in enumerate(HINTS)}
+
+def classify(precip, humidity, tmax, args):
+    """Weather hint codes from daily measurements; earlier rules win."""
+    codes = np.full(precip.shape, HINT_CODES["unknown"], dtype=np.uint8)
+    # Apply last to first so the first matching rule wins
+    codes[tmax >= args.hot_c] = HINT_CODES["sunny"]
+    codes[(precip < args.dry_mm) & (humidity < args.dry_humidity)] = HINT_CODES["dry"]
+    codes[humidity >= args.humid_pct] = HINT_CODES["humid"]
+    codes[precip >= args.rain_mm] = HINT_CODES["rainy"]
+    # Cells with no measurements at all
+    codes[np.isnan(precip) & np.isnan(humidity) & np.isnan(tmax)] = MISSING_CELL
+    return codes
+
+def read_csv(path, climatology):
+    """Columns of the input CSV as arrays; days as day numbers or datetime64."""
+    lats, lons, days, precip, humidity, tmax, hints = [], [], [], [], [], [], []
+    with open(path, "r") as f:
+        for row in csv.DictReader(f):
+            lats.append(float(row["lat"]))
+            lons.append(float(row["lon"]))
+            days.append(int(row["date"]) - 1 if climatology else row["date"][:10])
+            if row.get("hint"):
+                hints.append(HINT_CODES[WeatherHint(row["hint"].strip().lower()).value])
+            else:
+                precip.append(float(row.get("precip_mm") or "nan"))
+                humidity.append(float(row.get("humidity_pct") or "nan"))
+                tmax.append(float(row.get("tmax_c") or "nan"))
+    if hints and precip:
+        raise ValueError("Give either a hint column or measurements for every row, not a mix")
+    columns = {
+        "lat": np.array(lats), "lon": np.array(lons),
+        "day": np.array(days, dtype=np.int64 if climatology else "datetime64[D]"),
+    }
+    if hints:
+        columns["hint"] = np.array(hints, dtype=np.uint8)
+    else:
+        columns.update(precip=np.array(precip), humidity=np.array(humidity), tmax=np.array(tmax))
+    return columns
+
+def read_netcdf(path, args):
+    """Columns from a NetCDF file with time, lat and lon dimensions."""
+    try:
+        import xarray
+    except ImportError:
+        raise SystemExit("❌ Reading NetCDF needs xarray (pip install xarray netCDF4), or convert to CSV first")
+    dataset = xarray.open_dataset(path)
+    frame = dataset[[args.precip_var, args.humidity_var, args.tmax_var]].to_dataframe().reset_index()
+    days = frame["time"].values.astype("datetime64[D]")
+    if args.climatology:
+        days = (days - days.astype("datetime64[Y]")).astype(np.int64)
+    return {
+        "lat": frame["lat"].to_numpy(float), "lon": frame["lon"].to_numpy(float), "day": days,
+        "precip": frame[args.precip_var].to_numpy(float),
+        "humidity": frame[args.humidity_var].to_numpy(float),
+        "tmax": frame[args.tmax_var].to_numpy(float),
+    }
+
+def axis(values, step):
+    """Origin, step and size of a regular axis through the given coordinates."""
+    unique = np.unique(values)
+    if step is None:
+        gaps = np.diff(unique)
+        step = float(gaps.min()) if len(gaps) else 1.0
+    return float(unique[0]), step, int(round((unique[-1] - unique[0]) / step)) + 1
+
+def build_grid(columns, args):
+    lat_min, lat_step, rows = axis(columns["lat"], args.step)
+    lon_min, lon_step, cols = axis(columns["lon"], args.step)
+    if args.climatology:
+        start, days, day = None, 366, columns["day"]
+    else:
+        start = columns["day"].min()
+        day = (columns["day"] - start).astype(np.int64)
+        days = int(day.max()) + 1
+
+    if "hint" in columns:
+        codes = columns["hint"]
+    else:
+        codes = classify(columns["precip"], columns["humidity"], columns["tmax"], args)
+
+    grid = np.full((days, rows, cols), MISSING_CELL, dtype=np.uint8)
+    row = np.rint((columns["lat"] - lat_min) / lat_step).astype(np.intp)
+    col = np.rint((columns["lon"] - lon_min) / lon_step).astype(np.intp)
+    grid[day, row, col] = codes
+
+    header = {
+        "calendar": CLIMATOLOGY if args.climatology else DAILY,
+        "lat_min": lat_min, "lon_min": lon_min,
+        "lat_step": lat_step, "lon_step": lon_step,
+        "hints": [hint.value for hint in HINTS],
+        "source": os.path.basename(args.input),
+    }
+    if start is not None:
+        header["start"] = str(start)
+    return grid, header
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the memory-mapped weather grid used for enrichment")
+    parser.add_argument("input", help="CSV (or NetCDF with xarray installed) weather dataset")
+    parser.add_argument("--output", default=WEATHER_GRID_PATH, help="Grid .npy path; the header is written next to it")
+    parser.add_argument("--climatology", action="store_true",
+                        help="Input holds day-of-year normals rather than dated observations")
+    parser.add_argument("--step", type=float, help="Cell size in degrees (default: inferred from the data)")
+    parser.add_argument("--rain-mm", type=float, default=5.0, help="Daily rainfall counted as rainy")
+    parser.add_argument("--humid-pct", type=float, default=80.0, help="Relative humidity counted as humid")
+    parser.add_argument("--dry-mm", type=float, default=0.5, help="Rainfall below which a day may be dry")
+    parser.add_argument("--dry-humidity", type=float, default=40.0, help="Humidity below which a day may be dry")
+    parser.add_argument("--hot-c", type=float, default=33.0, help="Maximum temperature counted as sunny and hot")
+    parser.add_argument("--precip-var", default="precip", help="NetCDF rainfall variable (mm/day)")
+    parser.add_argument("--humidity-var", default="rh", help="NetCDF relative humidity variable (%%)")
+    parser.add_argument("--tmax-var", default="tmax", help="NetCDF maximum temperature variable (°C)")
+    args = parser.parse_args()
+
+    print(f"🌦️  Reading {args.input}")
+    if args.input.endswith((".nc", ".nc4", ".netcdf")):
+        columns = read_netcdf(args.input, args)
+    else:
+        columns = read_csv(args.input, args.climatology)
+    if not len(columns["lat"]):
+        print("❌ No rows found")
+        sys.exit(1)
+
+    grid, header = build_grid(columns, args)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    np.save(args.output, grid)
+    with open(header_path(args.output), "w") as f:
+        json.dump(header, f, indent=2)
+
+    filled = int((grid != MISSING_CELL).sum())
+    print(f"✅ Wrote {args.output}: {grid.shape[0]} days x {grid.shape[1]} x {grid.shape[2]} cells, "
+          f"{filled} with data ({grid.nbytes / 1e6:.1f} MB)")
+
+if __name__ == "__main__":
+    main()
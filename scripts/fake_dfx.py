@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+In-memory stand-in for `dfx` and the Zyra canister, for benchmarks and regression tests
+
+Point ICPClient at it with ICP_DFX_PATH=scripts/fake_dfx.py. It implements
+the canister methods from icp/src/candid.did over binary Candid
+(`--type raw --output raw`), keeping canister state in a JSON file so
+successive invocations see each other's writes.
+
+Environment:
+  FAKE_DFX_STATE              state file (default: $TMPDIR/zyra_fake_dfx_state.json)
+  FAKE_DFX_QUERY_LATENCY_MS   added latency for query calls (default 0)
+  FAKE_DFX_UPDATE_LATENCY_MS  added latency for update calls (default 0)
+  FAKE_DFX_JITTER_MS          uniform random jitter added to either (default 0)
+  FAKE_DFX_FAULT_RATE         probability a call fails (default 0)
+  FAKE_DFX_FAULT_METHODS      comma-separated methods eligible for faults (default: all)
+  FAKE_DFX_FAULT_AFTER_APPLY  "1" to fail updates after applying them (ambiguous outcome)
+  FAKE_DFX_RECORD             append every call to this JSON-lines file for replay
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import fcntl
+import argparse
+import tempfile
+
+# Add agent directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'agent'))
+
+from candid_codec import decode_hex, CandidError
+from canister_types import (
+    CREATE_INCIDENT_ARGS, CREATE_INCIDENTS_BATCH_ARGS, ADD_RECOMMENDATION_ARGS,
+    SET_STATUS_ARGS, RESOURCE_REQUEST_ARGS, TEXT_ARG, TEXT_LIST_ARG, INCIDENT_PAGE_ARGS,
+    TEXT_RESULT, TEXT_LIST_RESULT, OPT_INCIDENT_RESULT, INCIDENT_PAGE_RESULT,
+    BLOB_LIST_RESULT, DIGEST_LIST_RESULT, EMPTY_RESULT, INCIDENT_LIST_RESULT,
+    LGA_SUMMARY_ARGS, LGA_SUMMARY_RESULT
+)
+
+FAKE_CANISTER_ID = "uxrrr-q7777-77774-qaaaq-cai"
+STATE_PATH = os.getenv(
+    "FAKE_DFX_STATE", os.path.join(tempfile.gettempdir(), "zyra_fake_dfx_state.json")
+)
+
+# Mirrors MAX_PAGE_LIMIT / MAX_PAGE_SCAN in icp/src/types.rs
+MAX_PAGE_LIMIT = 500
+MAX_PAGE_SCAN = 5000
+
+def _now() -> str:
+    return str(time.time_ns())
+
+# ---------- Canister methods ----------
+
+def _insert(state, incident):
+    if not incident["incident_id"]:
+        incident["incident_id"] = f"inc-{state['next_id']:06d}"
+        state["next_id"] += 1
+    incident["audit"].append({"event": "created", "at": _now()})
+    if not incident["status"]:
+        incident["status"] = "received"
+    state["incidents"][incident["incident_id"]] = incident
+    return incident["incident_id"]
+
+def create_incident(state, incident):
+    return (_insert(state, incident),)
+
+def create_incidents_batch(state, incidents):
+    return ([_insert(state, incident) for incident in incidents],)
+
+def get_incident(state, incident_id):
+    return (state["incidents"].get(incident_id),)
+
+def _lga_ids(state, lga):
+    return sorted(i for i, incident in state["incidents"].items() if incident["lga"] == lga)
+
+def list_incidents_by_lga(state, lga):
+    return ([state["incidents"][i] for i in _lga_ids(state, lga)],)
+
+def _matches(query, incident):
+    if query["min_severity"] is not None and incident["enriched"]["severity_score"] < query["min_severity"]:
+        return False
+    if query["status"] is not None and incident["status"] != query["status"]:
+        return False
+    if query["reported_after"] is not None and incident["reported_at"] < query["reported_after"]:
+        return False
+    if query["reported_before"] is not None and incident["reported_at"] >= query["reported_before"]:
+        return False
+    return True
+
+def list_incidents_page(state, query):
+    limit = min(max(query["limit"], 1), MAX_PAGE_LIMIT)
+    ids = [i for i in _lga_ids(state, query["lga"]) if query["cursor"] is None or i > query["cursor"]]
+    incidents, scanned, last_seen, exhausted = [], 0, None, True
+    for incident_id in ids:
+        if len(incidents) >= limit or scanned >= MAX_PAGE_SCAN:
+            exhausted = False
+            break
+        scanned += 1
+        last_seen = incident_id
+        if _matches(query, state["incidents"][incident_id]):
+            incidents.append(state["incidents"][incident_id])
+    return ({"incidents": incidents, "next_cursor": None if exhausted else last_seen},)
+
+def lga_summary(state, lga, high_severity):
+    incidents = [state["incidents"][i] for i in _lga_ids(state, lga)]
+    by_category = {}
+    for incident in incidents:
+        by_category[incident["category"]] = by_category.get(incident["category"], 0) + 1
+    return ({
+        "lga": lga,
+        "total": len(incidents),
+        "high_severity": sum(1 for incident in incidents if incident["enriched"]["severity_score"] >= high_severity),
+        "by_category": [{"category": category, "count": count} for category, count in sorted(by_category.items())],
+    },)
+
+def add_recommendation(state, incident_id, recommendation):
+    incident = state["incidents"].get(incident_id)
+    if incident:
+        incident["recommendations"].append(recommendation)
+        incident["audit"].append({"event": "recommendation_added", "at": _now()})
+    return ()
+
+def set_status(state, incident_id, status):
+    incident = state["incidents"].get(incident_id)
+    if incident:
+        incident["status"] = status
+        incident["audit"].append({"event": f"status_updated_to_{status}", "at": _now()})
+    return ()
+
+def raise_resource_request(state, incident_id, request_type, notes):
+    incident = state["incidents"].get(incident_id)
+    if incident:
+        now = _now()
+        incident["resource_request"] = {
+            "requested": True, "type_": request_type, "notes": notes, "created_at": now
+        }
+        incident["audit"].append({"event": "resource_requested", "at": now})
+    return ()
+
+def _digest_tree(state):
+    from reconcile import DigestTree
+    return DigestTree.from_incidents(state["incidents"].values())
+
+def merkle_nodes(state, prefixes):
+    tree = _digest_tree(state)
+    return ([tree.node(prefix) for prefix in prefixes],)
+
+def merkle_buckets(state, prefixes):
+    tree = _digest_tree(state)
+    return ([
+        {"incident_id": incident_id, "digest": digest}
+        for prefix in prefixes for incident_id, digest in tree.bucket(prefix).items()
+    ],)
+
+# name -> (argument signature, result signature, handler, is_update)
+METHODS = {
+    "create_incident": (CREATE_INCIDENT_ARGS, TEXT_RESULT, create_incident, True),
+    "create_incidents_batch": (CREATE_INCIDENTS_BATCH_ARGS, TEXT_LIST_RESULT, create_incidents_batch, True),
+    "get_incident": (TEXT_ARG, OPT_INCIDENT_RESULT, get_incident, False),
+    "list_incidents_by_lga": (TEXT_ARG, INCIDENT_LIST_RESULT, list_incidents_by_lga, False),
+    "list_incidents_page": (INCIDENT_PAGE_ARGS, INCIDENT_PAGE_RESULT, list_incidents_page, False),
+    "lga_summary": (LGA_SUMMARY_ARGS, LGA_SUMMARY_RESULT, lga_summary, False),
+    "merkle_nodes": (TEXT_LIST_ARG, BLOB_LIST_RESULT, merkle_nodes, False),
+    "merkle_buckets": (TEXT_LIST_ARG, DIGEST_LIST_RESULT, merkle_buckets, False),
+    "add_recommendation": (ADD_RECOMMENDATION_ARGS, EMPTY_RESULT, add_recommendation, True),
+    "set_status": (SET_STATUS_ARGS, EMPTY_RESULT, set_status, True),
+    "raise_resource_request": (RESOURCE_REQUEST_ARGS, EMPTY_RESULT, raise_resource_request, True),
+}
+
+# ---------- State, latency, faults and recording ----------
+
+class StateFile:
+    """JSON state guarded by an exclusive lock for the life of one call."""
+
+    def __enter__(self):
+        self.lock = open(STATE_PATH + ".lock", "w")
+        fcntl.flock(self.lock, fcntl.LOCK_EX)
+        try:
+            with open(STATE_PATH, "r") as f:
+                self.state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.state = {"next_id": 1, "incidents": {}}
+        return self.state
+
+    def save(self):
+        tmp_path = STATE_PATH + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, STATE_PATH)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.lock, fcntl.LOCK_UN)
+        self.lock.close()
+
+def _env_float(name: str) -> float:
+    return float(os.getenv(name, "0") or 0)
+
+def _inject_latency(update: bool):
+    latency = _env_float("FAKE_DFX_UPDATE_LATENCY_MS" if update else "FAKE_DFX_QUERY_LATENCY_MS")
+    latency += random.uniform(0, _env_float("FAKE_DFX_JITTER_MS"))
+    if latency > 0:
+        time.sleep(latency / 1000.0)
+
+def _should_fault(method: str) -> bool:
+    methods = [m for m in os.getenv("FAKE_DFX_FAULT_METHODS", "").split(",") if m]
+    if methods and method not in methods:
+        return False
+    return random.random() < _env_float("FAKE_DFX_FAULT_RATE")
+
+def _record(method: str, update: bool, argument: str, ok: bool, started: float):
+    path = os.getenv("FAKE_DFX_RECORD")
+    if not path:
+        return
+    entry = {
+        "at": time.time(),
+        "method": method,
+        "update": update,
+        "argument": argument,
+        "ok": ok,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.write(json.dumps(entry) + "\n")
+
+def canister_call(args) -> int:
+    started = time.perf_counter()
+    if args.type != "raw" or args.output != "raw":
+        print("Error: fake dfx only supports --type raw --output raw", file=sys.stderr)
+        return 2
+    if args.method not in METHODS:
+        print(f"Error: Canister has no method '{args.method}'", file=sys.stderr)
+        return 255
+
+    argument = args.argument
+    if args.argument_file == "-":
+        argument = sys.stdin.read()
+    elif args.argument_file:
+        with open(args.argument_file, "r") as f:
+            argument = f.read()
+    argument = (argument or "").strip()
+
+    arg_signature, result_signature, handler, is_update = METHODS[args.method]
+    update = is_update or args.update
+    try:
+        values = decode_hex(arg_signature, argument)
+    except (CandidError, ValueError) as e:
+        print(f"Error: Failed to decode argument: {e}", file=sys.stderr)
+        _record(args.method, update, argument, False, started)
+        return 255
+
+    _inject_latency(update)
+    fault = _should_fault(args.method)
+    fault_after_apply = fault and update and os.getenv("FAKE_DFX_FAULT_AFTER_APPLY") == "1"
+    if fault and not fault_after_apply:
+        print(f"Error: Injected fault: replica rejected {args.method}", file=sys.stderr)
+        _record(args.method, update, argument, False, started)
+        return 255
+
+    state_file = StateFile()
+    with state_file as state:
+        result = handler(state, *values)
+        if update:
+            state_file.save()
+
+    if fault_after_apply:
+        print(f"Error: Injected fault after applying {args.method}", file=sys.stderr)
+        _record(args.method, update, argument, False, started)
+        return 255
+
+    print(result_signature.encode(*result).hex())
+    _record(args.method, update, argument, True, started)
+    return 0
+
+def main() -> int:
+    argv = sys.argv[1:]
+    if argv[:1] in (["ping"], ["start"], ["stop"]):
+        print('{"replica_health_status": "healthy"}' if argv[0] == "ping" else f"fake dfx: {argv[0]}")
+        return 0
+    if argv[:1] == ["deploy"]:
+        print(f"Deployed canisters.\n  agriassist canister_id: {FAKE_CANISTER_ID}")
+        return 0
+    if argv[:2] == ["canister", "id"]:
+        print(FAKE_CANISTER_ID)
+        return 0
+    if argv[:2] != ["canister", "call"]:
+        print(f"Error: fake dfx does not implement: {' '.join(argv)}", file=sys.stderr)
+        return 2
+
+    parser = argparse.ArgumentParser(prog="dfx canister call")
+    parser.add_argument("canister")
+    parser.add_argument("method")
+    parser.add_argument("argument", nargs="?")
+    parser.add_argument("--network", default="local")
+    parser.add_argument("--update", action="store_true")
+    parser.add_argument("--query", action="store_true")
+    parser.add_argument("--type", default="idl")
+    parser.add_argument("--output", default="idl")
+    parser.add_argument("--argument-file", dest="argument_file")
+    return canister_call(parser.parse_args(argv[2:]))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Check the local incident store against the ICP canister and optionally repair drift
+"""
+
+import sys
+import os
+import json
+import asyncio
+import argparse
+
+# Add agent directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'agent'))
+
+from icp_client import icp_client
+from outbox import outbox_worker
+from reconcile import reconcile, repair_operations, ReconcileError
+
+def load_local_incidents():
+    """Load incidents from the local JSON store."""
+    storage_file = os.path.join(os.path.dirname(__file__), "..", "data", "incidents.json")
+    try:
+        with open(storage_file, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile local incidents with the ICP canister")
+    parser.add_argument("--repair", action="store_true",
+                        help="Queue the local records of missing and mismatched incidents in the ICP outbox and sync them")
+    args = parser.parse_args()
+
+    print("🔄 Reconciling local incidents with ICP canister")
+    print("=" * 50)
+
+    incidents = load_local_incidents()
+    try:
+        report = reconcile(incidents, icp_client, outbox_worker.outbox.pending_incident_ids())
+    except ReconcileError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"📊 Local incidents: {len(incidents)}")
+    print(f"🔍 Buckets compared: {report.buckets_compared} ({report.canister_queries} canister queries)")
+
+    if report.pending:
+        print(f"⏳ Awaiting outbox sync: {len(report.pending)} (not counted as drift)")
+
+    if report.in_sync:
+        print("✅ Local store and canister are in sync")
+        return
+
+    print(f"⚠️  Missing on chain: {len(report.missing_on_chain)}")
+    for incident_id in report.missing_on_chain:
+        print(f"   - {incident_id}")
+    print(f"⚠️  Missing locally: {len(report.missing_locally)}")
+    for incident_id in report.missing_locally:
+        print(f"   - {incident_id}")
+    print(f"⚠️  Mismatched: {len(report.mismatched)}")
+    for incident_id in report.mismatched:
+        print(f"   - {incident_id}")
+
+    if args.repair:
+        operations = repair_operations(report, incidents)
+        outbox_worker.outbox.enqueue_many(operations)
+        applied = asyncio.run(outbox_worker.drain())
+        print(f"🔧 Queued {len(operations)} repair operations, {applied} applied ({len(outbox_worker.outbox)} pending)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Re-score stored incidents with the current enrichment rules
+
+Runs the vectorized batch enrichment over every incident in the local
+store and reports the incidents whose weather hint, severity score or tags
+would change, e.g. after editing data/enrichment_rules.json or installing a
+weather grid. With --write the new values replace the stored ones; stop
+the agent first, as it rewrites the same file. Changed incidents then
+differ from the canister until `reconcile.py --repair` is run.
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+
+# Add agent directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'agent'))
+
+from rules import WEATHER_HINTS
+from utils import enrich_incidents_batch, incident_columns
+
+INCIDENTS_PATH = os.getenv(
+    "AGENT_INCIDENTS_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "data", "incidents.json")
+)
+
+def rescore(incidents):
+    """
+    Recompute the `enriched` fields of `incidents` in place; returns
+    (incident_id, old enriched, new enriched) for each one that changed.
+    """
+    if not incidents:
+        return []
+    result = enrich_incidents_batch(**incident_columns(incidents))
+    changes = []
+    for row, incident in enumerate(incidents):
+        enriched = {
+            "weather_hint": WEATHER_HINTS[result["weather_hint"][row]].value,
+            "severity_score": int(result["severity_score"][row]),
+            "tags": list(result["tags"][row]),
+        }
+        if enriched != incident["enriched"]:
+            changes.append((incident["incident_id"], incident["enriched"], enriched))
+            incident["enriched"] = enriched
+    return changes
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score stored incidents with the current enrichment rules")
+    parser.add_argument("--path", default=INCIDENTS_PATH, help="Incident store (default: %(default)s)")
+    parser.add_argument("--write", action="store_true", help="Store the new scores (stop the agent first)")
+    parser.add_argument("--show", type=int, default=10, help="Changed incidents to list (default: %(default)s)")
+    args = parser.parse_args()
+
+    print("🔁 Re-scoring stored incidents")
+    print("=" * 50)
+
+    try:
+        with open(args.path, "r") as f:
+            incidents = json.load(f)
+    except FileNotFoundError:
+        print(f"❌ No incidents found at {args.path}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    changes = rescore(incidents)
+    elapsed = time.perf_counter() - start
+
+    print(f"📊 Incidents: {len(incidents)} re-scored in {elapsed:.2f}s")
+    print(f"✏️  Changed: {len(changes)}")
+    for incident_id, old, new in changes[:args.show]:
+        print(f"   - {incident_id}: severity {old.get('severity_score')} -> {new['severity_score']}, "
+              f"weather {old.get('weather_hint')} -> {new['weather_hint']}")
+
+    if args.write and changes:
+        tmp_path = args.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(incidents, f, indent=2)
+        os.replace(tmp_path, args.path)
+        print(f"💾 Stored the new scores in {args.path}; run reconcile.py --repair to update the canister")
+    elif changes:
+        print("ℹ️  Dry run; pass --write to store the new scores")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Shared fixtures for the agent unit tests.
+
+The agent modules import each other as siblings, so agent/ goes on
+sys.path, ahead of scripts/ (for the fake dfx), whose script names
+overlap some agent modules. Module-level outboxes are pointed at a
+throwaway file before anything imports them.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(ROOT, "agent"))
+sys.path.append(os.path.join(ROOT, "scripts"))
+os.environ.setdefault("ICP_OUTBOX_PATH", os.path.join(tempfile.mkdtemp(prefix="zyra_tests_"), "outbox.jsonl"))
+
+import pytest
+
+
+def incident_record(incident_id: str = "inc-000001", **overrides):
+    """A complete local incident record, as stored in data/incidents.json."""
+    record = {
+        "incident_id": incident_id,
+        "farmer_id": "farmer-1",
+        "lga": "Kano Municipal",
+        "state": "Kano",
+        "geo": {"lat": 12.0022, "lon": 8.592},
+        "crop": "maize",
+        "category": "pest",
+        "description": "Armyworms on the leaves",
+        "reported_at": "2025-08-01T09:30:00Z",
+        "enriched": {"weather_hint": "rainy", "severity_score": 75, "tags": ["fall_armyworm"]},
+        "status": "received",
+        "recommendations": [],
+        "resource_request": {"requested": False, "type": "none", "notes": "", "created_at": None},
+        "audit": [{"event": "created", "at": "2025-08-01T09:30:00Z"}],
+    }
+    record.update(overrides)
+    return record
+
+
+@pytest.fixture
+def make_incident():
+    return incident_record
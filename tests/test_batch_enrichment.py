@@ -0,0 +1,69 @@
+"""The vectorized batch enrichment must agree with the scalar path row for row."""
+import random
+
+import numpy as np
+import pytest
+
+from rules import CATEGORIES, CROPS, WEATHER_HINTS, rules
+from utils import (
+    enrich_incident, enrich_incidents_batch, get_resource_request_type, incident_columns,
+    should_raise_resource_request,
+)
+
+
+def random_descriptions(rng, count):
+    matcher = rules.current().matcher
+    terms = [term for keyword in matcher.keywords for term in matcher.terms[keyword]]
+    filler = ["leaves", "the farm", "since Monday", "Plants", "yellow", "my field"]
+    return [
+        " ".join(rng.sample(terms, rng.randint(0, 3)) + rng.sample(filler, 2)).capitalize()
+        for _ in range(count)
+    ]
+
+
+def test_batch_matches_scalar_enrichment(make_incident):
+    rng = random.Random(43)
+    incidents = [
+        make_incident(
+            f"inc-{n}",
+            category=rng.choice(CATEGORIES).value,
+            crop=rng.choice(CROPS).value,
+            geo={"lat": rng.uniform(4.0, 14.0), "lon": rng.uniform(3.0, 14.0)},
+            description=description,
+        )
+        for n, description in enumerate(random_descriptions(rng, 2000))
+    ]
+
+    batch = enrich_incidents_batch(**incident_columns(incidents))
+
+    for row, incident in enumerate(incidents):
+        category, crop = incident["category"], incident["crop"]
+        expected = enrich_incident(category, crop, incident["geo"]["lat"], incident["geo"]["lon"],
+                                   incident["description"])
+        assert WEATHER_HINTS[batch["weather_hint"][row]] == expected.weather_hint, incident
+        assert batch["severity_score"][row] == expected.severity_score, incident
+        assert list(batch["tags"][row]) == expected.tags
+        assert batch["resource_request"][row] == should_raise_resource_request(expected.severity_score, category)
+        assert batch["resource_type"][row] == get_resource_request_type(category, crop)
+
+
+def test_batch_rejects_mismatched_keyword_flags(make_incident):
+    columns = incident_columns([make_incident()])
+    columns["keyword_flags"] = np.zeros((1, 1), dtype=bool)
+    with pytest.raises(ValueError):
+        enrich_incidents_batch(**columns)
+
+
+def test_rescore_updates_only_changed_incidents(make_incident):
+    from rescore_incidents import rescore
+
+    current = make_incident("inc-a")
+    rescore([current])
+    stale = make_incident("inc-b", enriched={"weather_hint": "unknown", "severity_score": 1, "tags": []})
+
+    changes = rescore([current, stale])
+
+    assert [incident_id for incident_id, _, _ in changes] == ["inc-b"]
+    assert stale["enriched"]["severity_score"] == enrich_incident(
+        stale["category"], stale["crop"], stale["geo"]["lat"], stale["geo"]["lon"], stale["description"]
+    ).severity_score
@@ -0,0 +1,70 @@
+"""Binary Candid encoding against byte strings worked out from the Candid spec."""
+import pytest
+
+from candid_codec import (
+    INT, NAT, NAT16, TEXT, CandidError, Opt, Record, Signature, Vec, encode_item, idl_hash,
+)
+from canister_types import CREATE_INCIDENT_ARGS, INCIDENT, OPT_INCIDENT_RESULT
+from icp_client import ICPClient
+from models import Incident
+
+# (signature, value, DIDL hex) triples
+KNOWN_MESSAGES = [
+    (Signature(TEXT), "hello", "4449444c0001710568656c6c6f"),
+    (Signature(NAT16), 70, "4449444c00017a4600"),
+    (Signature(NAT), 624485, "4449444c00017de58e26"),
+    (Signature(INT), -123456, "4449444c00017cc0bb78"),
+    (Signature(Vec(TEXT)), ["a", "b"], "4449444c016d7101000201610162"),
+    (Signature(Opt(TEXT)), None, "4449444c016e71010000"),
+    (Signature(Opt(TEXT)), "a", "4449444c016e710100010161"),
+    # Fields are laid out by hash ("a" = 97, "b" = 98), not declaration order
+    (Signature(Record([("b", TEXT), ("a", NAT16)])), {"a": 5, "b": "x"},
+     "4449444c016c02617a6271010005000178"),
+]
+
+
+def test_field_hash_matches_spec():
+    assert idl_hash("a") == 97
+    assert idl_hash("foo") == 5097222
+
+
+@pytest.mark.parametrize("signature, value, expected", KNOWN_MESSAGES)
+def test_encode_matches_known_bytes(signature, value, expected):
+    assert signature.encode(value).hex() == expected
+
+
+@pytest.mark.parametrize("signature, value, encoded", KNOWN_MESSAGES)
+def test_decode_known_bytes(signature, value, encoded):
+    assert signature.decode(bytes.fromhex(encoded)) == (value,)
+
+
+def test_decode_ignores_fields_it_does_not_know():
+    wider = Signature(Record([("a", NAT16), ("b", TEXT), ("c", Vec(TEXT))]))
+    narrow = Signature(Record([("a", NAT16), ("b", TEXT)]))
+    assert narrow.decode(wider.encode({"a": 1, "b": "x", "c": ["y"]})) == ({"a": 1, "b": "x"},)
+
+
+def test_truncated_message_is_rejected():
+    with pytest.raises(CandidError):
+        Signature(TEXT).decode(bytes.fromhex("4449444c0001710568656c6c"))
+    with pytest.raises(CandidError):
+        Signature(TEXT).decode(b"JSON")
+
+
+def test_incident_round_trip(make_incident):
+    client = ICPClient()
+    record = client._incident_to_canister_format(Incident.model_validate(make_incident(
+        description="Òjò ń rọ̀, armyworms everywhere",
+        resource_request={"requested": True, "type": "agrochemical", "notes": "", "created_at": "2025-08-01T10:00:00Z"},
+    )))
+    decoded, = CREATE_INCIDENT_ARGS.decode(CREATE_INCIDENT_ARGS.encode(record))
+    assert decoded == record
+    assert OPT_INCIDENT_RESULT.decode(OPT_INCIDENT_RESULT.encode(record)) == (record,)
+
+
+def test_encode_vec_matches_encode(make_incident):
+    client = ICPClient()
+    records = [client._incident_to_canister_format(Incident.model_validate(make_incident(f"inc-{n}")))
+               for n in range(3)]
+    batch = Signature(Vec(INCIDENT))
+    assert batch.encode_vec([encode_item(INCIDENT, record) for record in records]) == batch.encode(records)
@@ -0,0 +1,83 @@
+"""Chunking of create_incidents_batch calls, against the fake dfx."""
+import json
+import os
+
+import pytest
+
+from canister_types import CREATE_INCIDENTS_BATCH_ARGS
+from icp_client import ICPClient
+from models import Incident
+
+FAKE_DFX = os.path.join(os.path.dirname(__file__), "..", "scripts", "fake_dfx.py")
+CANISTER_ID = "uxrrr-q7777-77774-qaaaq-cai"
+
+
+@pytest.fixture
+def fake_dfx(tmp_path, monkeypatch):
+    """An ICPClient talking to the fake dfx; returns (client, recorded calls)."""
+    record = tmp_path / "calls.jsonl"
+    monkeypatch.setenv("ICP_DFX_PATH", FAKE_DFX)
+    monkeypatch.setenv("FAKE_DFX_STATE", str(tmp_path / "state.json"))
+    monkeypatch.setenv("FAKE_DFX_RECORD", str(record))
+    monkeypatch.setenv("FAKE_DFX_FAULT_RATE", "0")
+
+    def calls():
+        if not record.exists():
+            return []
+        with open(record) as f:
+            return [json.loads(line)["method"] for line in f if line.strip()]
+    return ICPClient(canister_id=CANISTER_ID), calls
+
+
+def incidents(make_incident, count, description="Armyworms on the leaves"):
+    return [Incident.model_validate(make_incident(f"inc-{n:04d}", description=description))
+            for n in range(count)]
+
+
+def test_chunks_respect_the_item_limit(make_incident):
+    chunks = list(ICPClient()._batch_chunks(incidents(make_incident, 7), 1 << 20, 3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert [position for chunk in chunks for position, _ in chunk] == list(range(7))
+
+
+def test_chunks_fit_the_byte_limit_and_are_packed(make_incident):
+    client = ICPClient()
+    batch = incidents(make_incident, 20)
+    one = len(CREATE_INCIDENTS_BATCH_ARGS.encode_vec(
+        [item for _, item in next(client._batch_chunks(batch[:1], 1 << 20, 500))]
+    ))
+    max_bytes = 3 * one
+    chunks = list(client._batch_chunks(batch, max_bytes, 500))
+
+    for chunk in chunks:
+        assert len(CREATE_INCIDENTS_BATCH_ARGS.encode_vec([item for _, item in chunk])) <= max_bytes
+    # Greedy packing: no chunk could have taken the first item of the next one
+    for chunk, following in zip(chunks, chunks[1:]):
+        items = [item for _, item in chunk] + [following[0][1]]
+        assert len(CREATE_INCIDENTS_BATCH_ARGS.encode_vec(items)) > max_bytes
+    assert sum(len(chunk) for chunk in chunks) == 20
+
+
+def test_oversized_incident_is_skipped(make_incident):
+    batch = incidents(make_incident, 3)
+    batch[1] = Incident.model_validate(make_incident("inc-huge", description="x" * 5000))
+    chunks = list(ICPClient()._batch_chunks(batch, 4096, 500))
+    assert [position for chunk in chunks for position, _ in chunk] == [0, 2]
+
+
+def test_batch_results_align_with_input(make_incident, fake_dfx):
+    client, calls = fake_dfx
+    batch = incidents(make_incident, 5)
+    batch[2] = Incident.model_validate(make_incident("inc-huge", description="x" * 5000))
+
+    results = client.create_incidents_batch(batch, max_bytes=4096, max_items=2)
+
+    assert results == ["inc-0000", "inc-0001", None, "inc-0003", "inc-0004"]
+    assert calls() == ["create_incidents_batch", "create_incidents_batch"]
+    assert client.get_incident("inc-0004").incident_id == "inc-0004"
+
+
+def test_failed_chunk_leaves_none(make_incident, fake_dfx, monkeypatch):
+    client, _ = fake_dfx
+    monkeypatch.setenv("FAKE_DFX_FAULT_RATE", "1")
+    assert client.create_incidents_batch(incidents(make_incident, 3), max_items=2) == [None, None, None]
@@ -0,0 +1,74 @@
+"""Reading only the incidents appended to the local incidents file."""
+import json
+import os
+
+from incident_tail import IncidentFileTail
+
+
+def store(path, incidents):
+    """Rewrite the file the way the agent and the API do."""
+    tmp = str(path) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(incidents, f, indent=2)
+    os.replace(tmp, path)
+
+
+def bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_reads_only_appended_records(tmp_path, make_incident):
+    path = tmp_path / "incidents.json"
+    tail = IncidentFileTail(str(path))
+    assert tail.read_new() == []
+
+    stored = [make_incident("inc-a"), make_incident("inc-b")]
+    store(path, stored)
+    assert tail.read_new() == stored
+    assert tail.read_new() == []
+
+    stored.append(make_incident("inc-c", description='Leaves "curled", ] and , in text'))
+    store(path, stored)
+    bump_mtime(path)
+    assert tail.read_new() == stored[2:]
+
+    stored.extend([make_incident("inc-d"), make_incident("inc-e")])
+    store(path, stored)
+    bump_mtime(path)
+    assert [incident["incident_id"] for incident in tail.read_new()] == ["inc-d", "inc-e"]
+
+
+def test_first_records_after_an_empty_file(tmp_path, make_incident):
+    path = tmp_path / "incidents.json"
+    store(path, [])
+    tail = IncidentFileTail(str(path))
+    assert tail.read_new() == []
+
+    store(path, [make_incident("inc-a")])
+    bump_mtime(path)
+    assert [incident["incident_id"] for incident in tail.read_new()] == ["inc-a"]
+
+
+def test_rewritten_file_is_read_in_full(tmp_path, make_incident):
+    path = tmp_path / "incidents.json"
+    store(path, [make_incident("inc-a"), make_incident("inc-b")])
+    tail = IncidentFileTail(str(path))
+    tail.read_new()
+
+    with open(path, "w") as f:
+        json.dump([make_incident("inc-x")], f)
+    bump_mtime(path)
+    assert [incident["incident_id"] for incident in tail.read_new()] == ["inc-x"]
+
+
+def test_partial_file_is_retried(tmp_path, make_incident):
+    path = tmp_path / "incidents.json"
+    with open(path, "w") as f:
+        f.write(json.dumps([make_incident("inc-a")], indent=2)[:50])
+    tail = IncidentFileTail(str(path))
+    assert tail.read_new() == []
+
+    store(path, [make_incident("inc-a")])
+    bump_mtime(path)
+    assert [incident["incident_id"] for incident in tail.read_new()] == ["inc-a"]
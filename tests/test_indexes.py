@@ -0,0 +1,71 @@
+"""Incident indexes replace a record when it changes instead of keeping the first one."""
+from datetime import datetime
+
+from geo_index import GeoIndex
+from heatmap import HeatmapTiles
+from outbox import new_incident_id
+from outbreaks import OutbreakEngine
+from rollups import Rollups
+
+
+def test_same_second_ids_are_distinct():
+    assert len({new_incident_id() for _ in range(1000)}) == 1000
+
+
+def test_geo_index_replaces_changed_records(make_incident):
+    index = GeoIndex()
+    assert index.add_many([make_incident("inc-a"), make_incident("inc-b")]) == 2
+    assert index.add_many([make_incident("inc-a")]) == 0
+
+    assert index.add_many([make_incident("inc-a", status="closed")]) == 1
+    found = index.within_radius(12.0022, 8.592, 1.0)
+    assert len(found) == 2 and len(index) == 2
+    assert {incident["incident_id"]: incident["status"] for _, incident in found} == {
+        "inc-a": "closed", "inc-b": "received"
+    }
+
+    # A moved or recategorised incident leaves its old cell
+    index.add_many([make_incident("inc-a", geo={"lat": 9.0, "lon": 7.5}, category="disease")])
+    assert [incident["incident_id"] for incident in index.within_bbox(11.9, 8.5, 12.1, 8.7)] == ["inc-b"]
+    assert [incident["incident_id"] for incident in index.within_bbox(8.9, 7.4, 9.1, 7.6, category="disease")] \
+        == ["inc-a"]
+
+
+def test_heatmap_moves_changed_records(make_incident):
+    tiles = HeatmapTiles(max_zoom=4, tile_cells=4)
+    tiles.add_many([make_incident("inc-a"), make_incident("inc-b")])
+    assert [cell[2:] for cell in tiles.tile(0, 0, 0)] == [(2, 75.0)]
+
+    tiles.add_many([make_incident("inc-a", enriched={"weather_hint": "dry", "severity_score": 25, "tags": []})])
+    assert [cell[2:] for cell in tiles.tile(0, 0, 0)] == [(2, 50.0)]
+
+    tiles.add_many([make_incident("inc-a", category="disease")])
+    assert [cell[2] for cell in tiles.tile(0, 0, 0, category="pest")] == [1]
+    assert [cell[2] for cell in tiles.tile(0, 0, 0, category="disease")] == [1]
+    assert len(tiles) == 2
+
+
+def test_rollups_recount_changed_records(make_incident):
+    rollups = Rollups()
+    rollups.add_many([make_incident("inc-a"), make_incident("inc-b")])
+    day = datetime(2025, 8, 1)
+
+    rollups.add_many([make_incident("inc-a", lga="Nassarawa", reported_at="2025-08-01T11:00:00Z")])
+    assert rollups.trend("day", day, day, lga="Kano Municipal")["total"] == 1
+    assert rollups.trend("day", day, day, lga="Nassarawa")["total"] == 1
+    assert rollups.trend("day", day, day)["total"] == 2
+    hours = rollups.trend("hour", datetime(2025, 8, 1, 9), datetime(2025, 8, 1, 11))["buckets"]
+    assert [bucket["count"] for bucket in hours] == [1, 0, 1]
+
+
+def test_outbreak_engine_regroups_changed_records(make_incident):
+    engine = OutbreakEngine(min_incidents=3)
+    now = datetime(2025, 8, 2)
+    engine.add_many([make_incident(f"inc-{n}") for n in range(3)])
+    engine.refresh(now)
+    assert [outbreak["size"] for outbreak in engine.outbreaks()] == [3]
+
+    assert engine.add_many([make_incident("inc-0")]) == 0
+    engine.add_many([make_incident("inc-0", category="disease")])
+    engine.refresh(now)
+    assert engine.outbreaks() == []
@@ -0,0 +1,64 @@
+"""Which chat queries the rule-based router answers, and which go to the LLM."""
+import pytest
+
+from intents import IntentMatch, IntentRouter, render_reply
+
+
+@pytest.fixture
+def router():
+    return IntentRouter(["Kano Municipal", "Ikeja", "Gboko"])
+
+
+@pytest.mark.parametrize("text, lga", [
+    ("incidents in Kano Municipal", "Kano Municipal"),
+    ("show me all the incidents in ikeja lga?", "Ikeja"),
+    ("what's happening in Gboko", "Gboko"),
+    ("any incidents in Kano Municipal?", "Kano Municipal"),
+])
+def test_known_lga_queries_take_the_fast_path(router, text, lga):
+    assert router.match(text) == IntentMatch("query_incidents_by_lga", {"lga": lga})
+
+
+@pytest.mark.parametrize("text", [
+    "incidents in Ikeja last week",
+    "what are the incidents in Gboko this month",
+    "incidents in Ikeja with high severity",
+    "problems in Kano Municipal yesterday",
+    "issues from farmers",
+    "incidents for today",
+    "any pest incidents in Kano Municipal?",
+    "incidents in Makurdi",
+    "maize problems in Gboko",
+])
+def test_qualified_or_unknown_lga_queries_go_to_the_llm(router, text):
+    assert router.match(text) is None
+
+
+def test_lgas_added_later_take_the_fast_path(router):
+    assert router.match("incidents in Makurdi") is None
+    router.add_lgas(["Makurdi", "Ikeja"])
+    assert router.match("incidents in Makurdi") == IntentMatch("query_incidents_by_lga", {"lga": "Makurdi"})
+    assert router.match("incidents in Kano Municipal") == IntentMatch(
+        "query_incidents_by_lga", {"lga": "Kano Municipal"}
+    )
+
+
+def test_status_change_is_matched(router):
+    assert router.match("close inc-abc please") == IntentMatch(
+        "update_incident_status", {"incident_id": "inc-abc", "status": "closed"}
+    )
+    assert router.match("mark incident inc-abc as dispatched") == IntentMatch(
+        "update_incident_status", {"incident_id": "inc-abc", "status": "dispatched"}
+    )
+
+
+def test_write_words_veto_status_changes(router):
+    assert router.match("close inc-abc and add a recommendation") is None
+    assert router.match("why close inc-abc") is None
+
+
+def test_failed_status_change_is_not_reported_as_done():
+    intent = IntentMatch("update_incident_status", {"incident_id": "inc-abc", "status": "closed"})
+    reply = render_reply(intent, {"success": False, "message": "Could not update the status of incident inc-abc"})
+    assert "now marked" not in reply
+    assert "Could not update" in reply
@@ -0,0 +1,65 @@
+"""Multilingual keyword matching must not change how English reports score."""
+import json
+
+import pytest
+
+from keywords import KeywordAutomaton
+from models import CategoryType, CropType
+from rules import CompiledRules, RULES_PATH
+
+ENGLISH_REPORTS = [
+    "Caterpillars eating young leaves. Fast spread.",
+    "There is no water in the irrigation channel since last week",
+    "The leaves are turning yellow quick quick, the whole field looks dry",
+    "I don kill the weeds but the maize still looks bad",
+    "Heavy rain flooded the lower farm and the seedlings are rotting",
+    "Plants wilting in the hot sun, the dry spell is getting severe",
+    "Mold on the cassava stems after the humid nights",
+    "Rapid spread of the blight across the farm, critical loss expected",
+]
+
+
+@pytest.fixture(scope="module")
+def table():
+    with open(RULES_PATH, "r") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def compiled(table):
+    return CompiledRules(table)
+
+
+@pytest.fixture(scope="module")
+def english_only(compiled):
+    return KeywordAutomaton(compiled.matcher.keywords)
+
+
+@pytest.mark.parametrize("description", ENGLISH_REPORTS)
+def test_translations_do_not_match_english_text(compiled, english_only, description):
+    assert compiled.matcher.find(description) == english_only.find(description)
+
+
+@pytest.mark.parametrize("description", ENGLISH_REPORTS)
+def test_english_severity_is_unchanged_by_translations(table, compiled, description):
+    english_table = dict(table, keyword_translations={})
+    english = CompiledRules(english_table)
+    for category in (CategoryType.PEST, CategoryType.DROUGHT):
+        for crop in (CropType.MAIZE, CropType.CASSAVA):
+            found = compiled.matcher.find(description)
+            hint = compiled.weather_hint(9.0, found)
+            assert hint == english.weather_hint(9.0, english.matcher.find(description))
+            assert compiled.severity(category, crop, hint, found) == \
+                english.severity(category, crop, hint, english.matcher.find(description))
+
+
+@pytest.mark.parametrize("description, keyword", [
+    ("Ruwan sama ya lalata gonar", "rain"),
+    ("Kwari yana yaduwa a gona", "fast spread"),
+    ("Òjò ń rọ̀ púpọ̀", "rain"),
+    ("Ọrịa a na-agbasa ngwa ngwa", "rapid"),
+    ("The worm dey spread sharp sharp", "rapid"),
+    ("Di whole farm don spoil finish", "critical"),
+])
+def test_local_language_terms_map_to_english_keywords(compiled, description, keyword):
+    assert keyword in compiled.matcher.find(description)
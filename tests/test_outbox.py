@@ -0,0 +1,142 @@
+"""Outbox durability across restarts and per-incident ordering of the worker."""
+import asyncio
+import json
+
+from models import Incident
+from outbox import CREATE_INCIDENT, SET_STATUS, Outbox, OutboxWorker
+
+
+class RecordingClient:
+    """Canister writes that log their calls and fail for chosen incidents."""
+
+    def __init__(self, failing=()):
+        self.calls = []
+        self.failing = set(failing)
+
+    def create_incidents_batch(self, incidents):
+        self.calls.extend(("create", incident.incident_id) for incident in incidents)
+        return [None if incident.incident_id in self.failing else incident.incident_id for incident in incidents]
+
+    def set_status(self, incident_id, status):
+        self.calls.append(("set_status", incident_id, status))
+        return incident_id not in self.failing
+
+
+def create_op(make_incident, incident_id):
+    payload = Incident.model_validate(make_incident(incident_id)).model_dump(mode="json", by_alias=True)
+    return (CREATE_INCIDENT, incident_id, payload)
+
+
+def test_pending_operations_survive_a_restart(tmp_path, make_incident):
+    path = str(tmp_path / "outbox.jsonl")
+    outbox = Outbox(path)
+    first, second = outbox.enqueue_many([
+        create_op(make_incident, "inc-a"), (SET_STATUS, "inc-a", {"status": "closed"}),
+    ])
+    outbox.fail([first], "canister unavailable")
+
+    replayed = Outbox(path)
+    assert len(replayed) == 2
+    head = replayed.ready(10, now=float("inf"))
+    assert [op["op_id"] for op in head] == [first]
+    assert head[0]["attempts"] == 1 and head[0]["last_error"] == "canister unavailable"
+
+    replayed.complete([first])
+    assert [op["op_id"] for op in Outbox(path).ready(10)] == [second]
+
+
+def test_torn_final_line_is_ignored(tmp_path):
+    path = str(tmp_path / "outbox.jsonl")
+    outbox = Outbox(path)
+    op_id = outbox.enqueue(SET_STATUS, "inc-a", {"status": "closed"})
+    with open(path, "a") as f:
+        f.write(json.dumps({"type": "done", "op_id": op_id})[:12])
+
+    assert [op["op_id"] for op in Outbox(path).ready(10)] == [op_id]
+
+
+def test_compaction_keeps_pending_operations_in_order(tmp_path):
+    path = str(tmp_path / "outbox.jsonl")
+    outbox = Outbox(path)
+    op_ids = outbox.enqueue_many([(SET_STATUS, "inc-a", {"status": status})
+                                  for status in ("recommended", "dispatched", "closed")])
+    outbox.complete(op_ids[:1])
+    outbox.compact()
+
+    with open(path) as f:
+        assert len(f.readlines()) == 2
+    replayed = Outbox(path)
+    assert [op["op_id"] for op in replayed.ready(10)] == [op_ids[1]]
+    replayed.complete([op_ids[1]])
+    assert [op["op_id"] for op in replayed.ready(10)] == [op_ids[2]]
+
+
+def test_only_the_head_of_each_incident_is_ready(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.jsonl"))
+    a1, a2, b1 = outbox.enqueue_many([
+        (SET_STATUS, "inc-a", {"status": "dispatched"}),
+        (SET_STATUS, "inc-a", {"status": "closed"}),
+        (SET_STATUS, "inc-b", {"status": "closed"}),
+    ])
+    assert [op["op_id"] for op in outbox.ready(10)] == [a1, b1]
+
+    # A failed head blocks the operations queued after it until it is retried
+    outbox.fail([a1], "set_status failed")
+    assert [op["op_id"] for op in outbox.ready(10)] == [b1]
+    assert [op["op_id"] for op in outbox.ready(10, now=float("inf"))] == [a1, b1]
+
+
+def test_worker_applies_each_incidents_operations_in_order(tmp_path, make_incident):
+    outbox = Outbox(str(tmp_path / "outbox.jsonl"))
+    client = RecordingClient()
+    outbox.enqueue_many([
+        create_op(make_incident, "inc-a"),
+        (SET_STATUS, "inc-a", {"status": "dispatched"}),
+        create_op(make_incident, "inc-b"),
+        (SET_STATUS, "inc-a", {"status": "closed"}),
+    ])
+
+    applied = asyncio.run(OutboxWorker(outbox, client).drain())
+
+    assert applied == 4 and len(outbox) == 0
+    calls_for_a = [call for call in client.calls if call[1] == "inc-a"]
+    assert calls_for_a == [("create", "inc-a"), ("set_status", "inc-a", "dispatched"),
+                           ("set_status", "inc-a", "closed")]
+
+
+def test_worker_retries_failures_without_reordering(tmp_path, make_incident):
+    path = str(tmp_path / "outbox.jsonl")
+    outbox = Outbox(path)
+    client = RecordingClient(failing={"inc-a"})
+    outbox.enqueue_many([
+        create_op(make_incident, "inc-a"),
+        (SET_STATUS, "inc-a", {"status": "closed"}),
+        create_op(make_incident, "inc-b"),
+    ])
+
+    assert asyncio.run(OutboxWorker(outbox, client).drain()) == 1
+    assert ("set_status", "inc-a", "closed") not in client.calls
+
+    # After a crash the retry state is replayed and the create still goes first
+    client.failing.clear()
+    replayed = Outbox(path)
+    worker = OutboxWorker(replayed, client)
+    for op in replayed._ops.values():
+        op["next_attempt_at"] = 0
+    assert asyncio.run(worker.drain()) == 2
+    assert client.calls[-2:] == [("create", "inc-a"), ("set_status", "inc-a", "closed")]
+
+
+def test_worker_settles_a_round_in_one_append(tmp_path, make_incident):
+    outbox = Outbox(str(tmp_path / "outbox.jsonl"))
+    outbox.enqueue_many([create_op(make_incident, "inc-a")] + [
+        (SET_STATUS, f"inc-{n}", {"status": "closed"}) for n in range(5)
+    ])
+    appends = []
+    append = outbox._append
+    outbox._append = lambda records: (appends.append(len(records)), append(records))
+
+    asyncio.run(OutboxWorker(outbox, RecordingClient(failing={"inc-1", "inc-3"}))._apply(outbox.ready(10)))
+
+    assert appends == [6]
+    assert len(outbox) == 2
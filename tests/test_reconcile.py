@@ -0,0 +1,91 @@
+"""Reconciliation digests, tree comparison and the repair plan."""
+import hashlib
+
+from models import Incident
+from outbox import CREATE_INCIDENT
+from reconcile import DigestTree, MERKLE_DEPTH, incident_digest, reconcile, repair_operations
+
+
+class TreeCanister:
+    """The canister's reconciliation queries over a dict of incident records."""
+
+    def __init__(self, incidents):
+        self.incidents = {incident["incident_id"]: dict(incident) for incident in incidents}
+
+    def merkle_nodes(self, prefixes):
+        tree = DigestTree.from_incidents(self.incidents.values())
+        return [tree.node(prefix) for prefix in prefixes]
+
+    def merkle_buckets(self, prefixes):
+        tree = DigestTree.from_incidents(self.incidents.values())
+        return {incident_id: digest for prefix in prefixes for incident_id, digest in tree.bucket(prefix).items()}
+
+    def apply(self, operations):
+        """Apply outbox creates the way the canister does: replace by ID."""
+        for kind, incident_id, payload in operations:
+            assert kind == CREATE_INCIDENT
+            self.incidents[incident_id] = payload
+
+
+def test_digest_matches_canonical_layout(make_incident):
+    # Fields joined by 0x1f, coordinates as big-endian IEEE-754 hex, as in icp/src/types.rs
+    canonical = "\x1f".join([
+        "inc-000001", "farmer-1", "Kano Municipal", "Kano", "402801205bc01a37", "40212f1a9fbe76c9",
+        "maize", "pest", "Armyworms on the leaves", "2025-08-01T09:30:00Z", "received", "75",
+    ])
+    assert incident_digest(make_incident()) == hashlib.sha256(canonical.encode("utf-8")).digest()
+
+
+def test_digest_ignores_fields_the_canister_appends_to(make_incident):
+    base = incident_digest(make_incident())
+    assert incident_digest(make_incident(audit=[])) == base
+    assert incident_digest(make_incident(recommendations=[{"step": "x", "source": "y", "created_at": "z"}])) == base
+    assert incident_digest(make_incident(status="closed")) != base
+    assert incident_digest(make_incident(geo={"lat": 12.0022000001, "lon": 8.592})) != base
+
+
+def test_in_sync_stores_take_one_query(make_incident):
+    incidents = [make_incident(f"inc-{i:06d}") for i in range(200)]
+    report = reconcile(incidents, TreeCanister(incidents))
+    assert report.in_sync
+    assert report.canister_queries == 1
+
+
+def test_reports_each_kind_of_drift(make_incident):
+    local = [make_incident(f"inc-{i:06d}") for i in range(50)]
+    remote = TreeCanister(local[:48] + [make_incident("inc-999999")])
+    remote.incidents["inc-000003"]["description"] = "Edited elsewhere"
+    report = reconcile(local, remote)
+    assert sorted(report.missing_on_chain) == ["inc-000048", "inc-000049"]
+    assert report.missing_locally == ["inc-999999"]
+    assert report.mismatched == ["inc-000003"]
+    # One query per tree level, then bucket digests
+    assert report.canister_queries == MERKLE_DEPTH + 2
+
+
+def test_pending_outbox_incidents_are_not_drift(make_incident):
+    local = [make_incident(f"inc-{i:06d}") for i in range(10)]
+    remote = TreeCanister(local[:8])
+    local[2] = make_incident("inc-000002", status="closed")
+    report = reconcile(local, remote, pending_ids={"inc-000002", "inc-000009"})
+    assert report.missing_on_chain == ["inc-000008"]
+    assert report.mismatched == []
+    assert sorted(report.pending) == ["inc-000002", "inc-000009"]
+    assert [incident_id for _, incident_id, _ in repair_operations(report, local)] == ["inc-000008"]
+
+
+def test_repair_plan_upserts_full_local_records(make_incident):
+    local = [make_incident(f"inc-{i:06d}") for i in range(20)]
+    local[5] = make_incident("inc-000005", description="Corrected description", status="closed")
+    remote = TreeCanister([make_incident(f"inc-{i:06d}") for i in range(18)])
+
+    report = reconcile(local, remote)
+    operations = repair_operations(report, local)
+    assert {kind for kind, _, _ in operations} == {CREATE_INCIDENT}
+    assert sorted(incident_id for _, incident_id, _ in operations) == ["inc-000005", "inc-000018", "inc-000019"]
+    # Payloads are whole incidents the outbox worker can send as-is
+    for _, incident_id, payload in operations:
+        assert Incident.model_validate(payload).incident_id == incident_id
+
+    remote.apply(operations)
+    assert reconcile(local, remote).in_sync
@@ -0,0 +1,64 @@
+"""Sessions stay bounded per sender and across senders."""
+import cache
+from sessions import MAX_REMEMBERED, Session, SessionStore
+
+
+def test_old_turns_are_folded_into_a_bounded_summary():
+    session = Session(max_turns=3, summary_chars=300)
+    for n in range(20):
+        session.record(f"What about inc-{n:03d}? " + "details " * 50, f"Incident {n} is pending. More text follows.")
+
+    assert len(session.turns) == 3
+    assert [user_text for user_text, _ in session.turns][0].startswith("What about inc-017?")
+    assert len(session.summary) <= 300
+    # The summary keeps the newest folded turns
+    assert "inc-016" in session.summary and "inc-000" not in session.summary
+    assert session.incident_ids == [f"inc-{n:03d}" for n in range(20 - MAX_REMEMBERED, 20)]
+
+
+def test_remembered_entities_are_deduplicated_newest_last():
+    session = Session(max_turns=2)
+    for lga in ("Ikeja", "Gboko", "Ikeja"):
+        session.record(f"incidents in {lga}", "None found.", lga=lga)
+
+    assert session.lgas == ["Gboko", "Ikeja"]
+    system, *turns = session.context_messages()
+    assert system["role"] == "system" and "Gboko, Ikeja" in system["content"]
+    assert [message["role"] for message in turns] == ["user", "assistant"] * 2
+
+
+def test_least_recently_used_sender_is_evicted():
+    store = SessionStore(max_senders=2, idle_seconds=None)
+    store.get("alice").record("hello", "hi")
+    store.get("bob").record("hello", "hi")
+    # Using alice again makes bob the least recently used
+    store.get("alice")
+    store.get("carol")
+
+    assert len(store) == 2
+    assert store.get("alice").turns
+    assert not store.get("bob").turns
+
+
+def test_idle_sessions_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    store = SessionStore(max_senders=10, idle_seconds=60)
+    store.get("alice").record("hello", "hi")
+    store.get("bob").record("hello", "hi")
+
+    now[0] += 45
+    store.get("alice")
+    now[0] += 30
+    assert store.purge_expired() == 1
+    assert store.get("alice").turns
+    assert not store.get("bob").turns
+
+
+def test_reset_and_end_start_a_new_conversation():
+    store = SessionStore(max_senders=10, idle_seconds=None)
+    store.get("alice").record("hello", "hi")
+    assert not store.reset("alice").turns
+    store.get("alice").record("hello", "hi")
+    store.end("alice")
+    assert len(store) == 0 and not store.get("alice").turns
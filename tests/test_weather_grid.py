@@ -0,0 +1,53 @@
+"""Single-point and vectorized weather grid lookups agree on a grid built by the build script."""
+import argparse
+import json
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from build_weather_grid import build_grid, read_csv
+from weather_grid import HINTS, WeatherGrid, header_path
+
+START = date(2025, 7, 1)
+
+
+def build(tmp_path, climatology):
+    """Write a 5x5-cell, 10-day CSV with a few cells left out and build a grid from it."""
+    rng = np.random.default_rng(7)
+    csv_path = tmp_path / "weather.csv"
+    with open(csv_path, "w") as f:
+        f.write("lat,lon,date,precip_mm,humidity_pct,tmax_c\n")
+        for day in range(10):
+            when = START + timedelta(days=day)
+            for lat in np.arange(9.0, 10.01, 0.25):
+                for lon in np.arange(7.0, 8.01, 0.25):
+                    if rng.random() < 0.1:
+                        continue
+                    f.write(f"{lat},{lon},{when.timetuple().tm_yday if climatology else when.isoformat()},"
+                            f"{rng.uniform(0, 10):.1f},{rng.uniform(20, 95):.0f},{rng.uniform(25, 38):.1f}\n")
+    args = argparse.Namespace(input=str(csv_path), climatology=climatology, step=None, rain_mm=5.0,
+                              humid_pct=80.0, dry_mm=0.5, dry_humidity=40.0, hot_c=33.0)
+    grid, header = build_grid(read_csv(str(csv_path), climatology), args)
+    grid_path = str(tmp_path / "weather_grid.npy")
+    np.save(grid_path, grid)
+    with open(header_path(grid_path), "w") as f:
+        json.dump(header, f)
+    return WeatherGrid(grid_path)
+
+
+@pytest.mark.parametrize("climatology", [False, True])
+def test_vector_lookup_matches_single_points(tmp_path, climatology):
+    grid = build(tmp_path, climatology)
+    rng = np.random.default_rng(11)
+    # Points around and beyond the grid, on dates before, during and after it
+    lat = np.append(rng.uniform(8.6, 10.4, 2000), np.nan)
+    lon = np.append(rng.uniform(6.6, 8.4, 2000), 7.5)
+    days = np.datetime64(START) + rng.integers(-3, 14, len(lat)).astype("timedelta64[D]")
+
+    codes = grid.lookup_many(lat, lon, days)
+
+    expected = [grid.lookup(la, lo, day.astype(date)) for la, lo, day in zip(lat, lon, days)]
+    assert [HINTS[code] if code >= 0 else None for code in codes] == expected
+    # The sample covers cells with hints as well as points without data
+    assert any(hint is not None for hint in expected) and None in expected
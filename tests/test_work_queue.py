@@ -0,0 +1,88 @@
+"""Chat work is shared fairly between senders and shed when the queue is full."""
+import asyncio
+
+from work_queue import FairWorkQueue
+
+
+def recorder(log, name):
+    async def job():
+        log.append(name)
+        await asyncio.sleep(0)
+    return job
+
+
+def test_free_slots_go_round_robin_across_senders():
+    log = []
+
+    async def scenario():
+        queue = FairWorkQueue(max_concurrency=1, max_pending=10, max_per_sender=5, max_wait_seconds=60)
+        for name in ("alice-1", "alice-2", "alice-3", "bob-1", "carol-1"):
+            assert queue.submit(name.split("-")[0], recorder(log, name))
+        await queue.join()
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert log == ["alice-1", "bob-1", "carol-1", "alice-2", "alice-3"]
+    assert queue.completed == 5 and queue.pending == 0 and queue.running == 0
+
+
+def test_a_sender_runs_one_job_at_a_time_in_order():
+    log = []
+    overlaps = []
+
+    def job(name, running):
+        async def run():
+            sender = name.split("-")[0]
+            if sender in running:
+                overlaps.append(name)
+            running.add(sender)
+            await asyncio.sleep(0.001)
+            log.append(name)
+            running.discard(sender)
+        return run
+
+    async def scenario():
+        running = set()
+        queue = FairWorkQueue(max_concurrency=4, max_pending=10, max_per_sender=5, max_wait_seconds=60)
+        for n in range(1, 4):
+            queue.submit("alice", job(f"alice-{n}", running))
+            queue.submit("bob", job(f"bob-{n}", running))
+        await queue.join()
+
+    asyncio.run(scenario())
+    assert not overlaps
+    assert [name for name in log if name.startswith("alice")] == ["alice-1", "alice-2", "alice-3"]
+    assert [name for name in log if name.startswith("bob")] == ["bob-1", "bob-2", "bob-3"]
+
+
+def test_work_is_shed_per_sender_and_when_the_queue_is_full():
+    log = []
+
+    async def scenario():
+        queue = FairWorkQueue(max_concurrency=1, max_pending=3, max_per_sender=2, max_wait_seconds=60)
+        # One running and one queued reaches alice's limit
+        assert queue.submit("alice", recorder(log, "alice-1"))
+        assert queue.submit("alice", recorder(log, "alice-2"))
+        assert not queue.submit("alice", recorder(log, "alice-3"))
+        # Other senders still get in until the shared queue is full
+        assert queue.submit("bob", recorder(log, "bob-1"))
+        assert queue.submit("carol", recorder(log, "carol-1"))
+        assert not queue.submit("dave", recorder(log, "dave-1"))
+        await queue.join()
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert sorted(log) == ["alice-1", "alice-2", "bob-1", "carol-1"]
+    assert queue.accepted == 4 and queue.shed == 2
+
+
+def test_work_is_shed_when_the_estimated_wait_is_too_long():
+    async def scenario():
+        queue = FairWorkQueue(max_concurrency=1, max_pending=100, max_per_sender=100, max_wait_seconds=10)
+        queue.avg_duration = 4.0
+        accepted = [queue.submit(f"sender-{n}", recorder([], f"sender-{n}")) for n in range(5)]
+        await queue.join()
+        return accepted
+
+    # The first starts at once; each job queued behind it adds 4s of waiting
+    assert asyncio.run(scenario()) == [True, True, True, False, False]